@@ -1,9 +1,118 @@
 from django.contrib import admin
-from .models import Cliente, Projeto, Tarefa, MembroProjeto
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from . import busca
+from .models import Cliente, Projeto, Tarefa, MembroProjeto, Trabalho
+
+
+def contagem_estimada(queryset):
+    """
+    Número aproximado de linhas da tabela do queryset, sem COUNT(*): o das
+    estatísticas do ANALYZE (sqlite_stat1) ou, sem elas, o maior ID.
+    """
+    tabela = queryset.model._meta.db_table
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if cursor.fetchone():
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [tabela])
+            estatisticas = [int(stat.split()[0]) for (stat,) in cursor.fetchall()]
+            if estatisticas:
+                return max(estatisticas)
+        cursor.execute(f'SELECT MAX(rowid) FROM {tabela}')
+        return cursor.fetchone()[0] or 0
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginador do admin para tabelas grandes. Conta as linhas só até LIMITE
+    (COUNT(*) de uma subconsulta com LIMIT); acima disso, a lista sem filtros
+    usa a contagem estimada da tabela e a filtrada fica no LIMITE (as páginas
+    seguintes são alcançadas refinando os filtros ou a busca).
+    """
+    LIMITE = 10000
+
+    @cached_property
+    def count(self):
+        contagem = self.object_list.order_by()[:self.LIMITE + 1].count()
+        if contagem <= self.LIMITE:
+            return contagem
+        if not self.object_list.query.where:
+            return max(contagem_estimada(self.object_list), contagem)
+        return self.LIMITE
+
+
+class AdminDeTabelaGrande(admin.ModelAdmin):
+    """Sem o COUNT(*) da tabela inteira que o admin faz a cada listagem."""
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    # Pela chave primária: páginas estáveis também no autocomplete, que não
+    # passa pela ordenação padrão da listagem
+    ordering = ('-id',)
+
+
+class FiltroPorId(admin.SimpleListFilter):
+    """
+    Filtro por uma chave estrangeira (?<parameter_name>=<id>) que não lista
+    todas as opções, como o filtro padrão do admin: mostra só a selecionada.
+    Os links para ele vêm das listagens dos modelos relacionados.
+    """
+    modelo = None
+
+    def lookups(self, request, model_admin):
+        if not self.valor_valido():
+            return []
+        return [(str(obj.pk), str(obj)) for obj in self.modelo.objects.filter(pk=self.value())]
+
+    def queryset(self, request, queryset):
+        if self.valor_valido():
+            return queryset.filter(**{f'{self.parameter_name}_id': self.value()})
+        return queryset
+
+    def valor_valido(self):
+        return self.value() is not None and self.value().isdigit()
+
+
+class FiltroDeProjeto(FiltroPorId):
+    title = 'projeto'
+    parameter_name = 'projeto'
+    modelo = Projeto
+
+
+class FiltroDeCliente(FiltroPorId):
+    title = 'cliente'
+    parameter_name = 'cliente'
+    modelo = Cliente
+
 
 class MembroProjetoInline(admin.TabularInline):
+    """Membros atuais; novos membros entram pelo NovoMembroProjetoInline."""
+    model = MembroProjeto
+    extra = 0
+    fields = ('usuario', 'papel')
+    # Só leitura: um widget de usuário por linha faria uma consulta por membro
+    readonly_fields = ('usuario',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('usuario', 'projeto')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class NovoMembroProjetoInline(admin.TabularInline):
     model = MembroProjeto
     extra = 1
+    fields = ('usuario', 'papel')
+    autocomplete_fields = ('usuario',)
+    verbose_name = "Novo membro"
+    verbose_name_plural = "Novos membros"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).none()
 
 class SubtarefaInline(admin.TabularInline):
     """Permite adicionar subtarefas diretamente na página de uma tarefa pai."""
@@ -12,36 +121,90 @@ class SubtarefaInline(admin.TabularInline):
     extra = 1
     verbose_name = "Subtarefa"
     verbose_name_plural = "Subtarefas"
+    show_change_link = True
     
     # Exclui campos que não fazem sentido para uma subtarefa no formulário inline
     exclude = ('projeto',)
 
+    def get_queryset(self, request):
+        # O __str__ de cada linha lê a tarefa pai
+        return super().get_queryset(request).select_related('tarefa_pai')
+
 
 @admin.register(Tarefa)
-class TarefaAdmin(admin.ModelAdmin):
+class TarefaAdmin(AdminDeTabelaGrande):
     """Configuração da visualização de Tarefas no Admin."""
-    list_display = ('descricao', 'projeto', 'tarefa_pai', 'concluida', 'data_prazo')
-    list_filter = ('concluida', 'data_prazo', 'projeto')
+    list_display = ('descricao', 'projeto', 'subtarefa_de', 'concluida', 'data_prazo')
+    list_filter = ('concluida', 'data_prazo', FiltroDeProjeto)
     search_fields = ('descricao', 'projeto__codigo_tag')
+    autocomplete_fields = ('projeto', 'tarefa_pai')
 
     # Adiciona o formulário de subtarefas na página de edição de uma tarefa
     inlines = [SubtarefaInline]
 
+    def get_queryset(self, request):
+        # O __str__ da tarefa lê o projeto e a tarefa pai
+        return super().get_queryset(request).select_related('projeto', 'tarefa_pai')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Pelo índice FTS5 (api/busca.py) em vez de LIKE '%...%' na tabela
+        # inteira; vale também para o autocomplete de tarefa pai
+        if not search_term.strip():
+            return queryset, False
+        tarefas = busca.correspondentes(Tarefa, search_term)
+        if tarefas is None:
+            return queryset.none(), False
+        projetos = busca.correspondentes(Projeto, search_term)
+        return queryset.filter(Q(pk__in=tarefas) | Q(projeto_id__in=projetos)), False
+
+    @admin.display(description='subtarefa de', ordering='tarefa_pai__descricao')
+    def subtarefa_de(self, obj):
+        # Sem o __str__ da tarefa pai, que leria a tarefa avó
+        return obj.tarefa_pai.descricao[:50] if obj.tarefa_pai else None
+
 
 @admin.register(Projeto)
-class ProjetoAdmin(admin.ModelAdmin):
-    list_display = ('codigo_tag', 'cliente', 'data_criacao')
-    list_filter = ('cliente',)
+class ProjetoAdmin(AdminDeTabelaGrande):
+    list_display = ('codigo_tag', 'cliente', 'data_criacao', 'tarefas')
+    list_select_related = ('cliente',)
+    list_filter = (FiltroDeCliente,)
     search_fields = ('codigo_tag',)
-    inlines = [MembroProjetoInline]
+    autocomplete_fields = ('cliente',)
+    inlines = [MembroProjetoInline, NovoMembroProjetoInline]
+
+    @admin.display(description='tarefas', ordering='total_tarefas')
+    def tarefas(self, obj):
+        return format_html(
+            '<a href="{}?projeto={}">{}</a>', reverse('admin:api_tarefa_changelist'), obj.pk, obj.total_tarefas
+        )
 
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'data_criacao')
+class ClienteAdmin(AdminDeTabelaGrande):
+    list_display = ('nome', 'data_criacao', 'projetos')
     search_fields = ('nome',)
+    autocomplete_fields = ('criado_por',)
+
+    @admin.display(description='projetos')
+    def projetos(self, obj):
+        return format_html('<a href="{}?cliente={}">ver</a>', reverse('admin:api_projeto_changelist'), obj.pk)
+
+
+@admin.register(Trabalho)
+class TrabalhoAdmin(admin.ModelAdmin):
+    """Fila de trabalhos em segundo plano (api/trabalhos.py): só leitura."""
+    list_display = ('id', 'tipo', 'objeto_id', 'usuario', 'status', 'processados', 'total', 'data_criacao', 'data_conclusao')
+    list_select_related = ('usuario',)
+    list_filter = ('status', 'tipo')
+    ordering = ('-id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 # Removemos os registros antigos pois estamos usando o decorador @admin.register
 # admin.site.register(Cliente, ClienteAdmin) # Não é mais necessário
 # admin.site.register(Projeto, ProjetoAdmin) # Não é mais necessário
-# admin.site.register(Tarefa) # Não é mais necessário
\ No newline at end of file
+# admin.site.register(Tarefa) # Não é mais necessário
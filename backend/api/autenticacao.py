@@ -0,0 +1,149 @@
+# backend/api/autenticacao.py
+
+"""
+Autenticação JWT com cache (a classe padrão do DRF, ver settings.py).
+
+O JWTAuthentication do simplejwt valida a assinatura do token e busca o
+usuário no banco a cada requisição. Aqui os dois ficam no cache
+'autenticacao' (LRU limitado por processo; pode ser trocado por um cache
+compartilhado):
+- o token validado, chaveado pelo hash do token recebido, até ele expirar;
+- o usuário (só se ativo), chaveado pelo ID, até ser alterado ou excluído
+  (signals em api/signals.py) ou por AUTENTICACAO_CACHE_TIMEOUT.
+
+Com os dois no cache, autenticar não faz nenhuma consulta ao banco.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import aware_utcnow, get_md5_hash_password
+
+from core.banco import leituras_no_primario
+
+# Tempo máximo que um usuário fica no cache. Alterações e exclusões já o
+# invalidam via signals; o timeout só limita o estrago de escritas que
+# passem por fora deles (ex: queryset.update()).
+AUTENTICACAO_CACHE_TIMEOUT = 300
+
+
+def _cache():
+    return caches['autenticacao']
+
+
+def _chave_token(raw_token):
+    return f'jwt_token:{hashlib.sha256(raw_token).hexdigest()}'
+
+
+def _chave_usuario(usuario_id):
+    return f'jwt_usuario:{usuario_id}'
+
+
+def invalidar_usuario(*usuario_ids):
+    """Descarta do cache os usuários informados (a próxima requisição os busca no banco)."""
+    _cache().delete_many([_chave_usuario(usuario_id) for usuario_id in usuario_ids])
+
+
+def _validade(token):
+    # Segundos até o token expirar: o cache não o guarda por mais que isso
+    return token.payload.get('exp', 0) - time.time()
+
+
+def _conferir_expiracao(token):
+    # O token veio do cache: só a expiração pode ter mudado desde a validação
+    try:
+        token.check_exp(current_time=aware_utcnow())
+    except TokenError as erro:
+        raise InvalidToken({'detail': erro.args[0], 'messages': []})
+
+
+class JWTAuthenticationComCache(JWTAuthentication):
+    """JWTAuthentication com o token validado e o usuário em cache, síncrono e assíncrono (api/views_async.py)."""
+
+    def get_validated_token(self, raw_token):
+        chave = _chave_token(raw_token)
+        token = _cache().get(chave)
+        if token is not None:
+            _conferir_expiracao(token)
+            return token
+        token = super().get_validated_token(raw_token)
+        if _validade(token) > 0:
+            _cache().set(chave, token, _validade(token))
+        return token
+
+    async def aget_validated_token(self, raw_token):
+        chave = _chave_token(raw_token)
+        token = await _cache().aget(chave)
+        if token is not None:
+            _conferir_expiracao(token)
+            return token
+        token = super().get_validated_token(raw_token)
+        if _validade(token) > 0:
+            await _cache().aset(chave, token, _validade(token))
+        return token
+
+    def get_user(self, validated_token):
+        usuario_id = self._usuario_id(validated_token)
+        chave = _chave_usuario(usuario_id)
+        usuario = _cache().get(chave)
+        if usuario is not None:
+            self._verificar_usuario(usuario, validated_token)
+            return usuario
+        usuario = self._buscar_usuario(usuario_id)
+        # Só usuários válidos vão para o cache
+        self._verificar_usuario(usuario, validated_token)
+        _cache().set(chave, usuario, AUTENTICACAO_CACHE_TIMEOUT)
+        return usuario
+
+    async def aget_user(self, validated_token):
+        usuario_id = self._usuario_id(validated_token)
+        chave = _chave_usuario(usuario_id)
+        usuario = await _cache().aget(chave)
+        if usuario is not None:
+            self._verificar_usuario(usuario, validated_token)
+            return usuario
+        try:
+            with leituras_no_primario():
+                usuario = await self.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: usuario_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        self._verificar_usuario(usuario, validated_token)
+        await _cache().aset(chave, usuario, AUTENTICACAO_CACHE_TIMEOUT)
+        return usuario
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = await self.aget_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def _usuario_id(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def _buscar_usuario(self, usuario_id):
+        # Do primário, como tudo o que vai para o cache (core/banco.py)
+        try:
+            with leituras_no_primario():
+                return self.user_model.objects.get(**{jwt_settings.USER_ID_FIELD: usuario_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+    def _verificar_usuario(self, usuario, validated_token):
+        # As verificações do JWTAuthentication.get_user(), também para o usuário do cache
+        if not usuario.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            jwt_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(usuario.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
@@ -0,0 +1,159 @@
+# backend/api/busca.py
+
+"""
+Índice de busca textual de tarefas, projetos e clientes (tabela virtual FTS5
+do SQLite, criada na migração 0007_busca).
+
+Cada objeto ocupa uma linha do índice, cujo rowid codifica o tipo e o ID
+(id * 4 + código do tipo), o que permite atualizar ou remover a linha de um
+objeto sem varrer o índice. O índice é mantido pelos signals
+(api/signals.py); escritas em lote que não passam por eles (bulk_create,
+bulk_update, queryset.update) devem chamar indexar() por conta própria.
+"""
+
+import json
+import re
+
+from django.db import connection, connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Cliente, Projeto, Tarefa
+
+TABELA = 'api_busca'
+
+TIPOS = {'tarefa': 1, 'projeto': 2, 'cliente': 3}
+TIPOS_POR_CODIGO = {codigo: tipo for tipo, codigo in TIPOS.items()}
+
+# Colunas (titulo, detalhe, projeto_id) de cada modelo no índice
+COLUNAS = {
+    Tarefa: ('tarefa', "descricao, '', projeto_id"),
+    Projeto: ('projeto', 'codigo_tag, nome_detalhado, id'),
+    Cliente: ('cliente', "nome, '', NULL"),
+}
+
+# Peso de cada coluna no ranking (bm25): o título vale mais que o detalhe
+PESOS = (2.0, 1.0)
+
+
+def _ids_do_queryset(queryset):
+    return queryset.order_by().values('pk').query.sql_with_params()
+
+
+def indexar(queryset):
+    """(Re)indexa os objetos do queryset com um único INSERT ... SELECT."""
+    tipo, colunas = COLUNAS[queryset.model]
+    sql, params = _ids_do_queryset(queryset)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {TABELA} (rowid, titulo, detalhe, projeto_id) '
+            f'SELECT id * 4 + {TIPOS[tipo]}, {colunas} FROM {queryset.model._meta.db_table} '
+            f'WHERE id IN ({sql})',
+            params,
+        )
+
+
+def remover(queryset):
+    """Remove do índice os objetos do queryset (antes de excluí-los do banco)."""
+    tipo, _ = COLUNAS[queryset.model]
+    sql, params = _ids_do_queryset(queryset)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABELA} WHERE rowid IN ('
+            f'SELECT id * 4 + {TIPOS[tipo]} FROM {queryset.model._meta.db_table} WHERE id IN ({sql}))',
+            params,
+        )
+
+
+def remover_linhas(linhas):
+    """Remove do índice as linhas informadas como pares (modelo, id), de qualquer tipo."""
+    rowids = [id_ * 4 + TIPOS[COLUNAS[modelo][0]] for modelo, id_ in linhas]
+    if not rowids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABELA} WHERE rowid IN (SELECT value FROM json_each(%s))',
+            [json.dumps(rowids)],
+        )
+
+
+def reconstruir():
+    """Apaga e refaz o índice inteiro a partir das tabelas."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA}')
+    for modelo in COLUNAS:
+        indexar(modelo.objects.all())
+
+
+def expressao_de_busca(texto):
+    """
+    Converte o texto digitado em uma consulta FTS5: todas as palavras devem
+    aparecer, e a última vale como prefixo ('relatorio men' encontra
+    'Relatório mensal'). Só a última, porque prefixos curtos expandem para
+    muitos termos e deixam a consulta lenta em tabelas grandes. As palavras
+    vão entre aspas para que operadores (AND, OR, NEAR...) não sejam interpretados.
+    """
+    termos = [f'"{termo}"' for termo in re.findall(r'\w+', texto)]
+    if termos:
+        termos[-1] += '*'
+    return ' '.join(termos)
+
+
+def correspondentes(modelo, texto):
+    """
+    IDs dos objetos do modelo cujo texto indexado corresponde à busca, como
+    subconsulta para filtros (pk__in=...), sem ranking nem restrição de
+    projetos (ex: a busca do admin). None se o texto não tem palavras.
+    """
+    expressao = expressao_de_busca(texto)
+    if not expressao:
+        return None
+    tipo, _ = COLUNAS[modelo]
+    return RawSQL(f'SELECT rowid / 4 FROM {TABELA} WHERE {TABELA} MATCH %s AND rowid %% 4 = {TIPOS[tipo]}', [expressao])
+
+
+class ResultadosDaBusca:
+    """
+    Resultados ordenados por relevância, restritos aos projetos informados
+    (e aos clientes desses projetos). A consulta só é executada ao fatiar,
+    com LIMIT/OFFSET, então pode ser entregue a um paginador.
+    """
+
+    def __init__(self, texto, projetos_ids, tipo=None):
+        self.expressao = expressao_de_busca(texto)
+        self.projetos_ids = json.dumps(list(projetos_ids))
+        self.tipo = tipo
+
+    def __getitem__(self, fatia):
+        if not self.expressao:
+            return []
+        inicio = fatia.start or 0
+        filtro_tipo = f'AND rowid %% 4 = {TIPOS[self.tipo]}' if self.tipo else ''
+        # Leitura: pode ir para a réplica (core/banco.py)
+        with connections[router.db_for_read(Tarefa)].cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid, titulo, detalhe, projeto_id FROM {TABELA}
+                WHERE {TABELA} MATCH %s {filtro_tipo}
+                  AND (
+                    projeto_id IN (SELECT value FROM json_each(%s))
+                    OR (rowid %% 4 = {TIPOS['cliente']} AND rowid / 4 IN (
+                        SELECT cliente_id FROM {Projeto._meta.db_table}
+                        WHERE id IN (SELECT value FROM json_each(%s))
+                    ))
+                  )
+                ORDER BY bm25({TABELA}, {', '.join(map(str, PESOS))}), rowid
+                LIMIT %s OFFSET %s
+                """,
+                [self.expressao, self.projetos_ids, self.projetos_ids, fatia.stop - inicio, inicio],
+            )
+            linhas = cursor.fetchall()
+        return [
+            {
+                'tipo': TIPOS_POR_CODIGO[rowid % 4],
+                'id': rowid // 4,
+                'projeto': projeto_id,
+                'titulo': titulo,
+                'detalhe': detalhe,
+            }
+            for rowid, titulo, detalhe, projeto_id in linhas
+        ]
@@ -0,0 +1,173 @@
+# backend/api/cache_respostas.py
+
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.banco import leituras_no_primario
+
+from .papeis import papeis_da_requisicao
+
+# Por quanto tempo uma resposta fica guardada. Respostas antigas nunca são
+# servidas por engano: qualquer escrita muda a versão e, portanto, a chave.
+RESPOSTAS_CACHE_TIMEOUT = 600
+
+
+def chave_versao(tipo, objeto_id=None):
+    return f'versao:{tipo}' if objeto_id is None else f'versao:{tipo}:{objeto_id}'
+
+
+def _nova_versao():
+    # Baseada no relógio, para nunca repetir uma versão antiga caso o
+    # contador seja descartado pelo cache
+    return time.time_ns()
+
+
+def _incrementar_agora(chaves):
+    for chave in chaves:
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, _nova_versao(), None)
+
+
+def _incrementar(chaves):
+    _incrementar_agora(chaves)
+    # De novo após o commit: uma leitura concorrente, entre a escrita e o
+    # commit, pode ter guardado os dados anteriores sob a versão nova
+    transaction.on_commit(lambda: _incrementar_agora(chaves))
+
+
+def incrementar_versao(tipo, *objeto_ids):
+    """Marca como alterados os objetos informados (ex: 'projeto', 1, 2)."""
+    if objeto_ids:
+        _incrementar([chave_versao(tipo, objeto_id) for objeto_id in objeto_ids])
+
+
+def incrementar_versao_colecao(colecao):
+    """Marca como alterada uma coleção inteira (ex: 'clientes')."""
+    _incrementar([chave_versao(colecao)])
+
+
+def obter_versoes(chaves):
+    """Versões atuais das chaves informadas, criando as que ainda não existem."""
+    versoes = cache.get_many(chaves)
+    faltando = {chave: _nova_versao() for chave in chaves if chave not in versoes}
+    if faltando:
+        cache.set_many(faltando, None)
+        versoes.update(faltando)
+    return [versoes[chave] for chave in chaves]
+
+
+async def aobter_versoes(chaves):
+    """Versão assíncrona do obter_versoes."""
+    versoes = await cache.aget_many(chaves)
+    faltando = {chave: _nova_versao() for chave in chaves if chave not in versoes}
+    if faltando:
+        await cache.aset_many(faltando, None)
+        versoes.update(faltando)
+    return [versoes[chave] for chave in chaves]
+
+
+class RespostaVersionadaMixin:
+    """
+    Cache de respostas GET com ETag para ViewSets.
+
+    O ETag é derivado do usuário, da URL, do seu mapa de papéis e das versões
+    dos projetos (e coleções) dos quais a resposta depende. Se o cliente
+    envia o mesmo ETag em If-None-Match, a resposta é 304 sem consultar o banco
+    nem rodar os serializers; caso contrário, os dados vêm do cache 'respostas'
+    sempre que a versão não mudou. As respostas guardadas são montadas com as
+    leituras no primário, nunca na réplica (core/banco.py).
+    """
+    # Coleções inteiras das quais as respostas do ViewSet também dependem
+    colecoes_versionadas = ()
+
+    def get_chaves_de_versao(self):
+        """Por padrão, a resposta depende de todos os projetos do usuário."""
+        papeis = papeis_da_requisicao(self.request)
+        chaves = [chave_versao('projeto', projeto_id) for projeto_id in sorted(papeis)]
+        return chaves + [chave_versao(colecao) for colecao in self.colecoes_versionadas]
+
+    def get_etag(self):
+        chaves = self.get_chaves_de_versao()
+        if chaves is None:
+            return None
+        return self._calcular_etag(chaves, obter_versoes(chaves))
+
+    async def aget_etag(self):
+        chaves = self.get_chaves_de_versao()
+        if chaves is None:
+            return None
+        return self._calcular_etag(chaves, await aobter_versoes(chaves))
+
+    def _calcular_etag(self, chaves, versoes):
+        papeis = papeis_da_requisicao(self.request)
+        partes = [
+            # A prioridade dos prazos muda com o dia, mesmo sem escritas
+            str(timezone.localdate()),
+            str(self.request.user.pk),
+            self.request.get_full_path(),
+            repr(sorted(papeis.items())),
+            repr(list(zip(chaves, versoes))),
+        ]
+        return quote_etag(hashlib.sha1('|'.join(partes).encode()).hexdigest())
+
+    def resposta_versionada(self, gerar_resposta):
+        etag = self.get_etag()
+        if etag is None:
+            return gerar_resposta()
+
+        if etag in parse_etags(self.request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        respostas = caches['respostas']
+        chave = f'resposta:{etag}'
+        dados = respostas.get(chave)
+        if dados is None:
+            # Do primário: a resposta fica guardada sob as versões atuais
+            with leituras_no_primario():
+                response = gerar_resposta()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            respostas.set(chave, response.data, RESPOSTAS_CACHE_TIMEOUT)
+        else:
+            response = Response(dados)
+        response['ETag'] = etag
+        return response
+
+    async def aresposta_versionada(self, agerar_dados):
+        """
+        Versão assíncrona do resposta_versionada, usada pelas leituras de
+        api/views_async.py. Retorna (dados, etag); dados é None quando o
+        cliente já tem a versão atual (304).
+        """
+        etag = await self.aget_etag()
+        if etag is None:
+            return await agerar_dados(), None
+
+        if etag in parse_etags(self.request.headers.get('If-None-Match', '')):
+            return None, etag
+
+        respostas = caches['respostas']
+        chave = f'resposta:{etag}'
+        dados = await respostas.aget(chave)
+        if dados is None:
+            with leituras_no_primario():
+                dados = await agerar_dados()
+            await respostas.aset(chave, dados, RESPOSTAS_CACHE_TIMEOUT)
+        return dados, etag
+
+    def list(self, request, *args, **kwargs):
+        gerar = super().list
+        return self.resposta_versionada(lambda: gerar(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        gerar = super().retrieve
+        return self.resposta_versionada(lambda: gerar(request, *args, **kwargs))
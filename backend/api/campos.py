@@ -0,0 +1,161 @@
+# backend/api/campos.py
+
+"""
+Seleção de campos (?fields=) e expansão de relações aninhadas (?expand=)
+nos serializers de clientes, projetos e tarefas.
+
+- ?expand=projetos,projetos.tarefas inclui as relações aninhadas pedidas.
+  Sem ele, relações (projetos do cliente, tarefas e membros do projeto,
+  subtarefas da tarefa) não aparecem na resposta.
+- ?fields=id,nome,projetos.codigo_tag limita os campos de cada nível. Um
+  campo de uma relação (projetos.codigo_tag) já a expande.
+
+Os ViewSets usam a mesma seleção para montar o queryset: relações não
+pedidas não são pré-carregadas e, nas leituras, só as colunas usadas são
+buscadas (only()).
+"""
+
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def _nomes(valor):
+    return [nome.strip() for nome in (valor or '').split(',') if nome.strip()]
+
+
+class Selecao:
+    """Campos e relações pedidos para um nível da resposta (e, recursivamente, para os aninhados)."""
+
+    def __init__(self, prefixo=''):
+        self.prefixo = prefixo
+        # None = os campos padrão do serializer
+        self.campos = None
+        self.expandir = {}
+
+    @classmethod
+    def da_requisicao(cls, request):
+        raiz = cls()
+        for caminho in _nomes(request.query_params.get('expand')):
+            raiz._no(caminho.split('.'))
+        for caminho in _nomes(request.query_params.get('fields')):
+            *relacoes, campo = caminho.split('.')
+            no = raiz._no(relacoes)
+            if no.campos is None:
+                no.campos = set()
+            no.campos.add(campo)
+        return raiz
+
+    def _no(self, relacoes):
+        no = self
+        for nome in relacoes:
+            if nome not in no.expandir:
+                no.expandir[nome] = Selecao(f'{no.prefixo}{nome}.')
+            no = no.expandir[nome]
+        return no
+
+    def relacao(self, nome):
+        """Seleção da relação, se ela foi pedida; None se não."""
+        if nome in self.expandir:
+            return self.expandir[nome]
+        if self.campos is not None and nome in self.campos:
+            return Selecao(f'{self.prefixo}{nome}.')
+        return None
+
+    def validar(self, campos, relacoes):
+        desconhecidos = sorted((self.campos or set()) - set(campos))
+        if desconhecidos:
+            raise ValidationError({'fields': [f'Campo desconhecido: {self.prefixo}{nome}.' for nome in desconhecidos]})
+        desconhecidas = sorted(set(self.expandir) - set(relacoes))
+        if desconhecidas:
+            raise ValidationError({'expand': [f'Relação desconhecida: {self.prefixo}{nome}.' for nome in desconhecidas]})
+
+
+class CamposSelecionaveisMixin:
+    """
+    Aplica a Selecao da requisição (context['selecao']) a um ModelSerializer.
+    Serializers aninhados recebem a seleção da sua relação: os declarados
+    como campo a obtêm do pai; os criados em SerializerMethodFields devem
+    recebê-la em selecao=.
+    """
+    # Campos com objetos aninhados: só aparecem quando pedidos
+    relacoes = ()
+    # Colunas do modelo lidas por campos calculados (SerializerMethodField...)
+    colunas_dos_campos = {}
+
+    def __init__(self, *args, selecao=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._selecao = selecao
+
+    @property
+    def selecao(self):
+        if self._selecao is None:
+            pai, nome = self.parent, self.field_name
+            if isinstance(pai, serializers.ListSerializer):
+                pai, nome = pai.parent, pai.field_name
+            if isinstance(pai, CamposSelecionaveisMixin):
+                self._selecao = pai.selecao.relacao(nome) or Selecao()
+            else:
+                self._selecao = self.context.get('selecao') or Selecao()
+        return self._selecao
+
+    def get_fields(self):
+        campos = super().get_fields()
+        selecao = self.selecao
+        selecao.validar(campos, self.relacoes)
+        # Numa escrita, os campos graváveis continuam todos aqui; a resposta
+        # é filtrada em to_representation
+        escrita = hasattr(self, 'initial_data')
+        for nome in list(campos):
+            if nome in self.relacoes:
+                pedido = selecao.relacao(nome) is not None
+            else:
+                pedido = selecao.campos is None or nome in selecao.campos or (escrita and not campos[nome].read_only)
+            if not pedido:
+                del campos[nome]
+        return campos
+
+    def to_representation(self, instance):
+        dados = super().to_representation(instance)
+        campos = self.selecao.campos
+        if campos is not None and hasattr(self, 'initial_data'):
+            dados = {nome: valor for nome, valor in dados.items() if nome in campos or nome in self.selecao.expandir}
+        return dados
+
+    def colunas(self):
+        """Colunas do modelo necessárias para os campos selecionados (para only())."""
+        colunas = {'pk'}
+        for nome, campo in self.fields.items():
+            if nome in self.relacoes:
+                continue
+            if nome in self.colunas_dos_campos:
+                colunas.update(self.colunas_dos_campos[nome])
+            elif campo.source != '*':
+                colunas.add(campo.source.split('.')[0])
+        return colunas
+
+
+def selecionar_colunas(queryset, serializer_class, selecao, *extras):
+    """
+    queryset.only() com as colunas usadas por serializer_class na seleção,
+    mais as 'extras' (ex.: a chave estrangeira de um prefetch).
+    """
+    colunas = serializer_class(selecao=selecao).colunas()
+    return queryset.only(*sorted(colunas | set(extras)))
+
+
+class SelecaoNaViewMixin:
+    """Disponibiliza a Selecao da requisição no ViewSet (self.selecao) e no contexto dos serializers."""
+    # Ações em que o queryset busca só as colunas usadas na resposta
+    ACOES_DE_LEITURA = ('list', 'retrieve')
+
+    @cached_property
+    def selecao(self):
+        return Selecao.da_requisicao(self.request)
+
+    @property
+    def somente_leitura(self):
+        return self.action in self.ACOES_DE_LEITURA
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'selecao': self.selecao}
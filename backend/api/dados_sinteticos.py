@@ -0,0 +1,168 @@
+# backend/api/dados_sinteticos.py
+
+"""
+Dados sintéticos para desenvolvimento e benchmarks (comandos gerar_dados e
+benchmark_api): usuários, clientes, projetos com membros em papéis
+variados e árvores de tarefas com prazos.
+
+Tudo é criado em lote (bulk_create), com o que os signals fariam feito de
+uma vez no final: caminhos e contadores das árvores, sequência do
+/api/sync/, índice de busca e mapas de papéis. Os nomes levam um prefixo,
+para que os dados possam ser removidos depois (remover()).
+"""
+
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import busca
+from .models import Cliente, MembroProjeto, Projeto, Sequencia, Tarefa
+from .papeis import invalidar_papeis
+from .signals import exclusoes_em_lote
+
+EMPRESAS = (
+    'Acme', 'Horizonte', 'Ipê Sistemas', 'Nordeste Energia', 'Café Serrano', 'Transportes União',
+    'Clínica Vida', 'Construtora Alvorada', 'Banco Cooperativo', 'Editora Página',
+)
+ACOES = (
+    'Revisar', 'Implementar', 'Testar', 'Documentar', 'Migrar', 'Publicar', 'Corrigir', 'Validar',
+    'Especificar', 'Homologar',
+)
+OBJETOS = (
+    'contrato', 'módulo de faturamento', 'relatório mensal', 'integração com o ERP', 'tela de login',
+    'cadastro de clientes', 'backup do banco', 'orçamento', 'layout da home', 'API de pagamentos',
+)
+
+# Lote de cada INSERT (bulk_create) e UPDATE (bulk_update)
+LOTE = 1000
+
+
+class DadosGerados:
+    """Resumo do que foi criado: os usuários e projetos, e a contagem de cada modelo."""
+
+    def __init__(self, usuarios, clientes, projetos, membros, tarefas):
+        self.usuarios = usuarios
+        self.projetos = projetos
+        self.contagens = {
+            'usuarios': len(usuarios), 'clientes': len(clientes), 'projetos': len(projetos),
+            'membros': len(membros), 'tarefas': len(tarefas),
+        }
+
+
+def formato_da_arvore(total, largura, profundidade):
+    """
+    Níveis e pais (índices na lista) de 'total' tarefas dispostas em árvores
+    com até 'largura' filhas por tarefa e até 'profundidade' níveis. As
+    tarefas vêm em ordem de nível (pais antes dos filhos); quando um ramo
+    chega à profundidade máxima, a próxima tarefa começa uma nova árvore.
+    """
+    niveis, pais = [], []
+    for i in range(total):
+        pai = i // largura - 1 if i >= largura else None
+        if pai is not None and niveis[pai] + 1 >= profundidade:
+            pai = None
+        pais.append(pai)
+        niveis.append(0 if pai is None else niveis[pai] + 1)
+    return niveis, pais
+
+
+def _prazo(rng, hoje, sem_prazo=0.3):
+    # Atrasados, críticos, próximos e distantes (ver api/prioridade.py)
+    if rng.random() < sem_prazo:
+        return None
+    return hoje + timedelta(days=rng.randint(-30, 90))
+
+
+def gerar(
+    usuarios=10, clientes=5, projetos=20, tarefas_por_projeto=100, membros_por_projeto=3,
+    largura=5, profundidade=4, prefixo='sintetico', senha='senha-sintetica', semente=0,
+):
+    """
+    Cria o conjunto de dados. Cada projeto tem um ADMIN e os demais membros
+    como EDITOR ou VIEWER. Os usuários compartilham a mesma senha. Deve rodar
+    dentro de uma transação.
+    """
+    if User.objects.filter(username__startswith=f'{prefixo}-').exists():
+        raise ValueError(f"Já existem dados com o prefixo '{prefixo}'.")
+    rng = random.Random(semente)
+    hoje = timezone.localdate()
+    # Escritas em lote não passam pelo pre_save: tudo recebe uma única sequência
+    seq = Sequencia.proximo()
+
+    # O hash da senha é caro (é o que protege contra força bruta): calculado uma vez
+    senha = make_password(senha)
+    novos_usuarios = User.objects.bulk_create([
+        User(username=f'{prefixo}-{i}', password=senha, first_name=f'Usuário {i}')
+        for i in range(usuarios)
+    ], batch_size=LOTE)
+    novos_clientes = Cliente.objects.bulk_create([
+        Cliente(
+            nome=f'{prefixo} {i} {EMPRESAS[i % len(EMPRESAS)]}',
+            criado_por=rng.choice(novos_usuarios), seq=seq,
+        )
+        for i in range(clientes)
+    ], batch_size=LOTE)
+    novos_projetos = Projeto.objects.bulk_create([
+        Projeto(
+            cliente=rng.choice(novos_clientes), codigo_tag=f'{prefixo.upper()}-{i}',
+            nome_detalhado=f'{rng.choice(ACOES)} {rng.choice(OBJETOS)}',
+            data_prazo=_prazo(rng, hoje), seq=seq,
+        )
+        for i in range(projetos)
+    ], batch_size=LOTE)
+
+    membros = []
+    for projeto in novos_projetos:
+        escolhidos = rng.sample(novos_usuarios, min(membros_por_projeto, len(novos_usuarios)))
+        for i, usuario in enumerate(escolhidos):
+            papel = MembroProjeto.Papel.ADMIN if i == 0 else rng.choice(
+                (MembroProjeto.Papel.EDITOR, MembroProjeto.Papel.VIEWER)
+            )
+            membros.append(MembroProjeto(projeto=projeto, usuario=usuario, papel=papel, seq=seq))
+    MembroProjeto.objects.bulk_create(membros, batch_size=LOTE)
+
+    # Um nível por vez, para que os pais já tenham ID ao criar os filhos
+    niveis, pais = formato_da_arvore(tarefas_por_projeto, largura, profundidade)
+    por_projeto = {projeto.pk: [None] * tarefas_por_projeto for projeto in novos_projetos}
+    tarefas = []
+    for nivel in range(max(niveis, default=-1) + 1):
+        lote = []
+        for projeto in novos_projetos:
+            arvore = por_projeto[projeto.pk]
+            for i in range(tarefas_por_projeto):
+                if niveis[i] != nivel:
+                    continue
+                arvore[i] = Tarefa(
+                    projeto=projeto,
+                    tarefa_pai=None if pais[i] is None else arvore[pais[i]],
+                    descricao=f'{rng.choice(ACOES)} {rng.choice(OBJETOS)} #{i}',
+                    concluida=rng.random() < 0.3,
+                    data_prazo=_prazo(rng, hoje),
+                    seq=seq,
+                )
+                lote.append(arvore[i])
+        tarefas += Tarefa.objects.bulk_create(lote, batch_size=LOTE)
+    Tarefa.preencher_caminhos(tarefas)
+
+    do_conjunto = Projeto.objects.filter(codigo_tag__startswith=f'{prefixo.upper()}-')
+    Tarefa.recalcular_contadores(Tarefa.objects.filter(projeto__in=do_conjunto))
+    Projeto.recalcular_contadores(do_conjunto)
+    busca.indexar(Cliente.objects.filter(nome__startswith=f'{prefixo} '))
+    busca.indexar(do_conjunto)
+    busca.indexar(Tarefa.objects.filter(projeto__in=do_conjunto))
+    invalidar_papeis(*[usuario.pk for usuario in novos_usuarios])
+    return DadosGerados(novos_usuarios, novos_clientes, novos_projetos, membros, tarefas)
+
+
+def remover(prefixo='sintetico'):
+    """Remove os dados criados por gerar() com o prefixo (os signals limpam busca, papéis etc.)."""
+    usuarios = User.objects.filter(username__startswith=f'{prefixo}-')
+    ids = list(usuarios.values_list('pk', flat=True))
+    with exclusoes_em_lote():
+        Cliente.objects.filter(criado_por__in=ids).delete()
+        usuarios.delete()
+    invalidar_papeis(*ids)
+    return len(ids)
@@ -0,0 +1,275 @@
+# backend/api/leitura_rapida.py
+
+"""
+Leitura rápida do list e do retrieve de projetos e tarefas.
+
+As linhas vêm de queryset.values() e viram dicts direto, sem instanciar
+modelos nem passar campo a campo pelo ModelSerializer, e a resposta é
+renderizada com orjson (RendererJSONRapido). O resultado tem os mesmos
+bytes da resposta dos serializers: os campos, sua ordem e a seleção de
+?fields= e ?expand= vêm do próprio serializer (serializer.fields), e os
+campos calculados (SerializerMethodField) chamam os mesmos métodos
+get_<campo>, recebendo a linha no lugar do objeto.
+
+Os tipos que já saem do banco no formato da resposta (inteiros, textos,
+booleanos, datas) são copiados direto, e datas com hora são formatadas
+como no DateTimeField; campos com outras conversões continuam passando
+pelo to_representation do DRF.
+"""
+
+import json
+from operator import itemgetter
+
+import orjson
+from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .metricas import medir
+from .serializers import ProjetoSerializer, TarefaSerializer
+
+
+class RendererJSONRapido(JSONRenderer):
+    """
+    JSONRenderer com orjson. Gera os mesmos bytes do JSONRenderer (separadores
+    compactos, UTF-8 sem escapes, datas ISO 8601 com 'Z' para UTC); quando
+    pedem indentação ou os ajustes do DRF não são os padrão, ou quando há
+    algo que o orjson não serializa igual, usa o JSONRenderer.
+    """
+    OPCOES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            conteudo = orjson.dumps(data, default=self._converter, option=self.OPCOES)
+        except TypeError:
+            # orjson.JSONEncodeError: inteiros grandes demais, tipos desconhecidos...
+            return super().render(data, accepted_media_type, renderer_context)
+        # Como o JSONRenderer: \u2028 e \u2029 sempre escapados
+        return conteudo.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def _converter(self, obj):
+        # Só tipos que o encoder do DRF converte para outro tipo JSON nativo
+        # (lazy strings, Decimal, QuerySet...); o resto vai para o JSONRenderer
+        valor = self.encoder_class().default(obj)
+        if isinstance(valor, (str, int, bool, list, dict)) or valor is None:
+            return valor
+        raise TypeError
+
+
+# Campos cujo valor em values() já é o da resposta (sem to_representation)
+PASSAM_DIRETO = (
+    serializers.IntegerField, serializers.BooleanField, serializers.CharField,
+    serializers.ReadOnlyField, serializers.PrimaryKeyRelatedField,
+)
+
+# Relações aninhadas: (serializer, relação) -> chave estrangeira das linhas
+# filhas e, para as montadas num SerializerMethodField, o serializer que o
+# método usa
+RELACOES = {
+    (TarefaSerializer, 'subtarefas'): ('tarefa_pai', None),
+    (ProjetoSerializer, 'tarefas'): ('projeto', TarefaSerializer),
+    (ProjetoSerializer, 'membros'): ('projeto', None),
+}
+
+
+class _Linha:
+    """Linha de values() vista como objeto (sem cópia), para os métodos get_<campo> e as permissões."""
+
+    def __init__(self, linha):
+        self.__dict__ = linha
+
+
+def _obter_campo(modelo, campo, fuso):
+    """Coluna de values() de um campo declarado e a função que lê o valor da linha."""
+    origem = campo.source_attrs
+    if len(origem) == 1 and origem[0].startswith('get_') and origem[0].endswith('_display'):
+        # get_<campo>_display(): o rótulo da escolha
+        coluna = origem[0][len('get_'):-len('_display')]
+        rotulos = dict(modelo._meta.get_field(coluna).flatchoices)
+        return coluna, lambda linha: str(rotulos.get(linha[coluna], linha[coluna]))
+    coluna = '__'.join(origem)
+    if isinstance(campo, PASSAM_DIRETO):
+        return coluna, itemgetter(coluna)
+
+    # Como em DateField/DateTimeField.to_representation: sem 'format', vale o do settings
+    padrao = api_settings.DATETIME_FORMAT if isinstance(campo, serializers.DateTimeField) else api_settings.DATE_FORMAT
+    formato = getattr(campo, 'format', padrao)
+    iso = isinstance(formato, str) and formato.lower() == ISO_8601
+    if isinstance(campo, serializers.DateField) and iso:
+        # O orjson escreve datas em ISO 8601, como o DateField.to_representation
+        return coluna, itemgetter(coluna)
+    if isinstance(campo, serializers.DateTimeField) and iso and fuso is not None and not hasattr(campo, 'timezone'):
+        # O DateTimeField.to_representation, com o fuso lido uma vez por resposta
+        # (get_current_timezone() a cada linha custa mais que o resto da linha)
+        def momento(linha):
+            valor = linha[coluna]
+            if valor is None:
+                return None
+            texto = valor.astimezone(fuso).isoformat()
+            return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+        return coluna, momento
+
+    def converter(linha):
+        valor = linha[coluna]
+        return None if valor is None else campo.to_representation(valor)
+    return coluna, converter
+
+
+def _fuso_atual():
+    # O fuso em que o DateTimeField converte datas com fuso (None sem USE_TZ)
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+class _Relacao:
+    def __init__(self, montador, chave):
+        self.montador = montador
+        self.chave = chave
+
+    def consulta(self, ids):
+        """
+        Consulta das linhas filhas, em ordem de pk como os prefetches dos
+        serializers. Uma só, qualquer que seja o número de IDs: acima do
+        limite de parâmetros do banco, eles vão num único parâmetro JSON
+        (json_each, como em api/busca.py).
+        """
+        queryset = self.montador.modelo._default_manager.order_by(self.montador.pk).values(
+            *self.montador.colunas, self.chave,
+        )
+        if len(ids) > connections[queryset.db].features.max_query_params:
+            ids = RawSQL('SELECT value FROM json_each(%s)', [json.dumps(ids)])
+        return queryset.filter(**{f'{self.chave}__in': ids})
+
+    def agrupar(self, linhas, itens):
+        grupos = {}
+        for linha, item in zip(linhas, itens):
+            grupos.setdefault(linha[self.chave], []).append(item)
+        return grupos
+
+
+class Montador:
+    """
+    Monta a resposta de um serializer (com a seleção já aplicada) a partir
+    das linhas de queryset.values(*montador.colunas), buscando as relações
+    aninhadas pedidas com uma consulta para cada uma.
+    """
+
+    def __init__(self, serializer, fuso=None):
+        self.modelo = serializer.Meta.model
+        self.fuso = fuso if fuso is not None else _fuso_atual()
+        self.pk = self.modelo._meta.pk.attname
+        self.colunas = {self.pk}
+        self.campos = []
+        self.relacoes = {}
+        for nome, campo in serializer.fields.items():
+            if nome in serializer.relacoes:
+                self.relacoes[nome] = self._relacao(serializer, nome, campo)
+                self.campos.append((nome, None))
+            elif isinstance(campo, serializers.SerializerMethodField):
+                self.colunas.update(serializer.colunas_dos_campos[nome])
+                metodo = getattr(serializer, campo.method_name)
+                self.campos.append((nome, lambda linha, metodo=metodo: metodo(_Linha(linha))))
+            else:
+                coluna, obter = _obter_campo(self.modelo, campo, self.fuso)
+                self.colunas.add(coluna)
+                self.campos.append((nome, obter))
+
+    def _relacao(self, serializer, nome, campo):
+        chave, serializer_do_metodo = RELACOES[type(serializer), nome]
+        if serializer_do_metodo is None:
+            filho = campo.child
+        else:
+            filho = serializer_do_metodo(context=serializer.context, selecao=serializer.selecao.relacao(nome))
+        return _Relacao(Montador(filho, self.fuso), chave)
+
+    def montar(self, linhas):
+        with medir('serializacao'):
+            linhas = list(linhas)
+            ids = [linha[self.pk] for linha in linhas]
+            grupos = {}
+            for nome, relacao in self.relacoes.items():
+                filhas = list(relacao.consulta(ids))
+                grupos[nome] = relacao.agrupar(filhas, relacao.montador.montar(filhas))
+            return self._itens(linhas, grupos)
+
+    async def amontar(self, linhas):
+        """O montar(), com as consultas das relações feitas pelo ORM assíncrono."""
+        with medir('serializacao'):
+            linhas = list(linhas)
+            ids = [linha[self.pk] for linha in linhas]
+            grupos = {}
+            for nome, relacao in self.relacoes.items():
+                filhas = [filha async for filha in relacao.consulta(ids)]
+                grupos[nome] = relacao.agrupar(filhas, await relacao.montador.amontar(filhas))
+            return self._itens(linhas, grupos)
+
+    def _itens(self, linhas, grupos):
+        pk = self.pk
+        campos = [
+            (nome, obter if nome not in grupos else (lambda linha, grupo=grupos[nome]: grupo.get(linha[pk], [])))
+            for nome, obter in self.campos
+        ]
+        return [{nome: obter(linha) for nome, obter in campos} for linha in linhas]
+
+
+class LeituraRapidaMixin:
+    """
+    List e retrieve pelo Montador e pelo RendererJSONRapido. Os demais
+    renderers (API navegável) e as outras ações passam pelos serializers.
+    """
+    renderer_classes = [RendererJSONRapido, BrowsableAPIRenderer]
+    # Com False, list e retrieve voltam aos serializers (comparação nos testes e no benchmark)
+    leitura_rapida = True
+
+    def usar_leitura_rapida(self):
+        if not self.leitura_rapida or self.action not in ('list', 'retrieve'):
+            return False
+        # Sob ASGI (api/views_async.py) não há negociação: a resposta é sempre JSON
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return renderer is None or isinstance(renderer, RendererJSONRapido)
+
+    def get_montador(self):
+        return Montador(self.get_serializer())
+
+    def get_queryset_rapido(self, montador):
+        # As colunas de ordenação entram para o cursor da paginação
+        colunas = montador.colunas | set(self.ordering_fields)
+        return self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*sorted(colunas))
+
+    def get_linha(self, queryset):
+        """get_object() para o queryset de values()."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        linha = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.verificar_permissoes_da_linha(linha)
+        return linha
+
+    def verificar_permissoes_da_linha(self, linha):
+        # As permissões leem os campos do objeto (obj.id...) como atributos
+        self.check_object_permissions(self.request, _Linha(linha))
+
+    def list(self, request, *args, **kwargs):
+        if not self.usar_leitura_rapida():
+            return super().list(request, *args, **kwargs)
+        montador = self.get_montador()
+        queryset = self.get_queryset_rapido(montador)
+        pagina = self.paginate_queryset(queryset)
+        if pagina is not None:
+            return self.get_paginated_response(montador.montar(pagina))
+        return Response(montador.montar(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.usar_leitura_rapida():
+            return super().retrieve(request, *args, **kwargs)
+        montador = self.get_montador()
+        linha = self.get_linha(self.get_queryset_rapido(montador))
+        return Response(montador.montar([linha])[0])
@@ -0,0 +1,368 @@
+import json
+import subprocess
+import time
+import tracemalloc
+from itertools import count
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import dados_sinteticos, urls
+from api.models import Cliente, MembroProjeto, Projeto, Sequencia, Tarefa, Trabalho
+
+PREFIXO = 'benchmark-api'
+SENHA = 'benchmark-api'
+
+
+def nomes_das_rotas(padroes):
+    """Nomes de todas as rotas de api/urls.py (inclusive as aninhadas)."""
+    for padrao in padroes:
+        if isinstance(padrao, URLResolver):
+            yield from nomes_das_rotas(padrao.url_patterns)
+        elif padrao.name:
+            yield padrao.name
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Cenario:
+    """
+    Uma requisição medida: 'preparar(contexto, i)' retorna (método, URL,
+    corpo) da i-ésima repetição, criando antes o que ela consome (ex.: o
+    objeto que um DELETE exclui), fora da medição.
+    """
+
+    def __init__(self, nome, rota, preparar):
+        self.nome = nome
+        self.rota = rota
+        self.preparar = preparar
+
+
+class Contexto:
+    """Dados gerados usados pelos cenários, vistos pelo usuário autenticado."""
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        # Staff, para ler o /api/metrics/
+        usuario.is_staff = True
+        usuario.save(update_fields=['is_staff'])
+        adesao = MembroProjeto.objects.filter(usuario=usuario, papel=MembroProjeto.Papel.ADMIN).first()
+        self.projeto = adesao.projeto
+        self.tarefa = Tarefa.objects.filter(projeto=self.projeto, tarefa_pai=None).order_by('-total_descendentes')[0]
+        # Sem projetos do usuário: só aparece com ?all=true
+        self.cliente = Cliente.objects.create(nome=f'{PREFIXO} cliente próprio', criado_por=usuario)
+        self.membro = MembroProjeto.objects.filter(projeto=self.projeto).exclude(usuario=usuario).first()
+        self.outro_usuario = User.objects.filter(username__startswith=f'{PREFIXO}-').exclude(pk=usuario.pk).first()
+        self.refresh = str(RefreshToken.for_user(usuario))
+        self.trabalho = Trabalho.objects.create(
+            tipo=Trabalho.Tipo.EXCLUIR_PROJETO, objeto_id=self.projeto.pk, usuario=usuario,
+            status=Trabalho.Status.CONCLUIDO, processados=self.projeto.total_tarefas, total=self.projeto.total_tarefas,
+        )
+        self._numeros = count()
+        # Destino de 'mover subárvore', que leva a maior subárvore e a traz de volta
+        self.destino = self.novo_projeto()
+
+    def numero(self):
+        return next(self._numeros)
+
+    def novo_projeto(self):
+        projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag=f'{PREFIXO.upper()}-NOVO-{self.numero()}')
+        projeto.membros.add(self.usuario, through_defaults={'papel': MembroProjeto.Papel.ADMIN})
+        return projeto
+
+    def novo_usuario(self):
+        return User.objects.create(username=f'{PREFIXO}-novo-{self.numero()}')
+
+    def novo_cliente(self):
+        return Cliente.objects.create(nome=f'{PREFIXO} novo {self.numero()}', criado_por=self.usuario)
+
+    def novo_membro(self):
+        return MembroProjeto.objects.create(projeto=self.projeto, usuario=self.novo_usuario())
+
+    def nova_tarefa(self):
+        return Tarefa.objects.create(projeto=self.projeto, descricao=f'Excluir {self.numero()}')
+
+    def arquivo_de_importacao(self, tarefas=200):
+        """Um cliente novo em NDJSON (api/transferencia.py), com um projeto e 'tarefas' tarefas em árvore."""
+        numero = self.numero()
+        _, pais = dados_sinteticos.formato_da_arvore(tarefas, 4, 5)
+        registros = [
+            {'tipo': 'cliente', 'id': 1, 'nome': f'{PREFIXO} importado {numero}'},
+            {'tipo': 'projeto', 'id': 1, 'codigo_tag': f'{PREFIXO.upper()}-IMPORTADO-{numero}'},
+            {'tipo': 'membro', 'projeto': 1, 'usuario': self.outro_usuario.username, 'papel': 'EDITOR'},
+        ] + [
+            {'tipo': 'tarefa', 'id': i + 1, 'projeto': 1, 'tarefa_pai': None if pai is None else pai + 1,
+             'descricao': f'Tarefa importada {i}'}
+            for i, pai in enumerate(pais)
+        ]
+        return ''.join(json.dumps(registro) + '\n' for registro in registros).encode()
+
+
+def cenarios():
+    hoje = timezone.localdate().isoformat()
+    return [
+        Cenario('raiz', 'api-root', lambda c, i: ('get', '/api/', None)),
+        Cenario('clientes', 'cliente-list', lambda c, i: ('get', '/api/clientes/', None)),
+        Cenario('clientes com projetos e tarefas', 'cliente-list',
+                lambda c, i: ('get', '/api/clientes/?expand=projetos.tarefas', None)),
+        Cenario('todos os clientes com projetos e tarefas', 'cliente-list',
+                lambda c, i: ('get', '/api/clientes/?all=true&paginate=false&expand=projetos.tarefas', None)),
+        Cenario('criar cliente', 'cliente-list',
+                lambda c, i: ('post', '/api/clientes/', {'nome': f'{PREFIXO} criado {c.numero()}'})),
+        Cenario('exportar cliente', 'cliente-exportar',
+                lambda c, i: ('get', f'/api/clientes/{c.projeto.cliente_id}/exportar/', None)),
+        Cenario('importar cliente', 'cliente-importar',
+                lambda c, i: ('post', '/api/clientes/importar/', c.arquivo_de_importacao())),
+        Cenario('cliente', 'cliente-detail',
+                lambda c, i: ('get', f'/api/clientes/{c.projeto.cliente_id}/?expand=projetos', None)),
+        Cenario('alterar cliente', 'cliente-detail',
+                lambda c, i: ('patch', f'/api/clientes/{c.cliente.pk}/?all=true', {'nome': f'{PREFIXO} próprio {i}'})),
+        Cenario('excluir cliente', 'cliente-detail',
+                lambda c, i: ('delete', f'/api/clientes/{c.novo_cliente().pk}/?all=true', None)),
+        Cenario('projetos', 'projeto-list', lambda c, i: ('get', '/api/projetos/', None)),
+        Cenario('projetos com tarefas e membros', 'projeto-list',
+                lambda c, i: ('get', '/api/projetos/?expand=tarefas.subtarefas,membros', None)),
+        Cenario('criar projeto', 'projeto-list', lambda c, i: (
+            'post', '/api/projetos/', {'cliente': c.cliente.pk, 'codigo_tag': f'{PREFIXO.upper()}-CRIADO-{c.numero()}'},
+        )),
+        Cenario('projeto com tarefas', 'projeto-detail',
+                lambda c, i: ('get', f'/api/projetos/{c.projeto.pk}/?expand=tarefas', None)),
+        Cenario('alterar projeto', 'projeto-detail',
+                lambda c, i: ('patch', f'/api/projetos/{c.projeto.pk}/', {'nome_detalhado': f'Projeto {i}'})),
+        Cenario('excluir projeto', 'projeto-detail',
+                lambda c, i: ('delete', f'/api/projetos/{c.novo_projeto().pk}/', None)),
+        Cenario('árvore', 'projeto-arvore',
+                lambda c, i: ('get', f'/api/projetos/{c.projeto.pk}/arvore/', None)),
+        Cenario('árvore até o 1º nível', 'projeto-arvore',
+                lambda c, i: ('get', f'/api/projetos/{c.projeto.pk}/arvore/?depth=1', None)),
+        Cenario('membros', 'projeto-membros-list',
+                lambda c, i: ('get', f'/api/projetos/{c.projeto.pk}/membros/', None)),
+        Cenario('adicionar membro', 'projeto-membros-list', lambda c, i: (
+            'post', f'/api/projetos/{c.projeto.pk}/membros/',
+            {'usuario': c.novo_usuario().pk, 'papel': MembroProjeto.Papel.VIEWER},
+        )),
+        Cenario('membro', 'projeto-membros-detail',
+                lambda c, i: ('get', f'/api/projetos/{c.projeto.pk}/membros/{c.membro.pk}/', None)),
+        Cenario('alterar papel', 'projeto-membros-detail', lambda c, i: (
+            'patch', f'/api/projetos/{c.projeto.pk}/membros/{c.membro.pk}/',
+            {'papel': (MembroProjeto.Papel.EDITOR, MembroProjeto.Papel.VIEWER)[i % 2]},
+        )),
+        Cenario('remover membro', 'projeto-membros-detail',
+                lambda c, i: ('delete', f'/api/projetos/{c.projeto.pk}/membros/{c.novo_membro().pk}/', None)),
+        Cenario('tarefas', 'tarefa-list', lambda c, i: ('get', '/api/tarefas/', None)),
+        Cenario('tarefas, página de 500', 'tarefa-list',
+                lambda c, i: ('get', '/api/tarefas/?page_size=500&expand=subtarefas', None)),
+        Cenario('criar tarefa', 'tarefa-list', lambda c, i: (
+            'post', '/api/tarefas/', {'projeto': c.projeto.pk, 'tarefa_pai': c.tarefa.pk, 'descricao': f'Nova {i}'},
+        )),
+        Cenario('tarefa', 'tarefa-detail',
+                lambda c, i: ('get', f'/api/tarefas/{c.tarefa.pk}/?expand=subtarefas', None)),
+        Cenario('concluir subárvore', 'tarefa-detail',
+                lambda c, i: ('patch', f'/api/tarefas/{c.tarefa.pk}/', {'concluida': i % 2 == 0})),
+        Cenario('excluir tarefa', 'tarefa-detail',
+                lambda c, i: ('delete', f'/api/tarefas/{c.nova_tarefa().pk}/', None)),
+        Cenario('mover subárvore', 'tarefa-mover', lambda c, i: (
+            'post', f'/api/tarefas/{c.tarefa.pk}/mover/', {'projeto': (c.destino if i % 2 == 0 else c.projeto).pk},
+        )),
+        Cenario('urgentes', 'tarefa-urgentes', lambda c, i: ('get', '/api/tarefas/urgentes/', None)),
+        Cenario('lote de 50 operações', 'tarefa-bulk', lambda c, i: ('post', '/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'create', 'projeto': c.projeto.pk, 'descricao': f'Lote {i}.{n}', 'data_prazo': hoje}
+            for n in range(40)
+        ] + [
+            {'op': 'toggle', 'id': pk, 'concluida': i % 2 == 0}
+            for pk in Tarefa.objects.filter(projeto=c.projeto).values_list('pk', flat=True)[:10]
+        ]})),
+        Cenario('trabalhos', 'trabalho-list', lambda c, i: ('get', '/api/trabalhos/', None)),
+        Cenario('trabalho', 'trabalho-detail', lambda c, i: ('get', f'/api/trabalhos/{c.trabalho.pk}/', None)),
+        Cenario('usuários', 'user-list', lambda c, i: ('get', '/api/users/', None)),
+        Cenario('usuário', 'user-detail', lambda c, i: ('get', f'/api/users/{c.outro_usuario.pk}/', None)),
+        Cenario('sincronização completa', 'sync', lambda c, i: ('get', '/api/sync/?since=0', None)),
+        Cenario('sincronização incremental', 'sync',
+                lambda c, i: ('get', f'/api/sync/?since={Sequencia.atual() - 1}', None)),
+        Cenario('busca', 'busca', lambda c, i: ('get', '/api/busca/?q=contrato', None)),
+        Cenario('dashboard', 'dashboard', lambda c, i: ('get', '/api/dashboard/', None)),
+        Cenario('eventos (conexão)', 'eventos', lambda c, i: ('get', '/api/eventos/', None)),
+        Cenario('métricas', 'metricas', lambda c, i: ('get', '/api/metrics/', None)),
+        Cenario('token', 'token_obtain_pair', lambda c, i: (
+            'post', '/api/token/', {'username': c.usuario.username, 'password': SENHA},
+        )),
+        Cenario('renovar token', 'token_refresh', lambda c, i: ('post', '/api/token/refresh/', {'refresh': c.refresh})),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede todas as rotas de api/urls.py (inclusive membros de projeto e "
+        "tokens) pelo cliente de testes do Django, sobre dados sintéticos "
+        "(api/dados_sinteticos.py): latência (p50/p90/p99), consultas SQL e pico "
+        "de memória alocada por requisição. Grava um relatório JSON para "
+        "comparar entre commits (--comparar). Os dados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20)
+        parser.add_argument('--saida', help='Arquivo do relatório JSON (padrão: só o resumo na tela).')
+        parser.add_argument('--comparar', help='Relatório anterior, para mostrar as diferenças.')
+        parser.add_argument('--com-cache', action='store_true',
+                            help='Mantém o cache de respostas entre as repetições (padrão: limpo a cada uma).')
+        parser.add_argument('--usuarios', type=int, default=20)
+        parser.add_argument('--clientes', type=int, default=10)
+        parser.add_argument('--projetos', type=int, default=50)
+        parser.add_argument('--tarefas-por-projeto', type=int, default=200)
+        parser.add_argument('--membros-por-projeto', type=int, default=4)
+        parser.add_argument('--largura', type=int, default=4)
+        parser.add_argument('--profundidade', type=int, default=5)
+        parser.add_argument('--semente', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['repeticoes'] < 1:
+            raise CommandError('--repeticoes deve ser maior que zero.')
+        lista = cenarios()
+        faltando = set(nomes_das_rotas(urls.urlpatterns)) - {cenario.rota for cenario in lista}
+        if faltando:
+            raise CommandError(f'Rotas sem cenário no benchmark: {", ".join(sorted(faltando))}.')
+        base = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                base = json.load(arquivo)
+
+        parametros = {
+            nome: options[nome] for nome in (
+                'repeticoes', 'com_cache', 'usuarios', 'clientes', 'projetos', 'tarefas_por_projeto',
+                'membros_por_projeto', 'largura', 'profundidade', 'semente',
+            )
+        }
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            dados = dados_sinteticos.gerar(
+                usuarios=options['usuarios'], clientes=options['clientes'], projetos=options['projetos'],
+                tarefas_por_projeto=options['tarefas_por_projeto'],
+                membros_por_projeto=options['membros_por_projeto'], largura=options['largura'],
+                profundidade=options['profundidade'], prefixo=PREFIXO, senha=SENHA, semente=options['semente'],
+            )
+            contexto = Contexto(self.usuario_principal(dados))
+            api = APIClient()
+            # Autenticação de verdade (JWT), como nas requisições do frontend
+            api.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(contexto.usuario).access_token}')
+            resultados = {}
+            for cenario in lista:
+                resultados[cenario.nome] = self.medir(api, cenario, contexto, options)
+                self.stdout.write(self.linha(cenario.nome, resultados[cenario.nome], base))
+            transaction.set_rollback(True)
+        caches['respostas'].clear()
+
+        relatorio = {'commit': self.commit(), 'parametros': parametros, 'cenarios': resultados}
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump(relatorio, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+                arquivo.write('\n')
+            self.stdout.write(self.style.SUCCESS(f'Relatório gravado em {options["saida"]}.'))
+
+    def usuario_principal(self, dados):
+        # O usuário que administra mais projetos: alcança todas as rotas
+        admins = [membro for membro in MembroProjeto.objects.filter(
+            usuario__in=dados.usuarios, papel=MembroProjeto.Papel.ADMIN
+        ).values_list('usuario', flat=True)]
+        if not admins:
+            raise CommandError('Os dados gerados não têm nenhum administrador de projeto.')
+        return User.objects.get(pk=max(set(admins), key=admins.count))
+
+    def executar(self, api, metodo, url, corpo):
+        if isinstance(corpo, bytes):
+            # Arquivo de importação (NDJSON), enviado como está
+            response = getattr(api, metodo)(url, corpo, content_type='application/x-ndjson')
+        elif corpo is not None:
+            response = getattr(api, metodo)(url, corpo, format='json')
+        else:
+            response = getattr(api, metodo)(url)
+        if response.streaming:
+            if response['Content-Type'].startswith('text/event-stream'):
+                # Fluxo de eventos: mede até a primeira mensagem e fecha a conexão
+                next(iter(response.streaming_content))
+            else:
+                # Exportação: mede até o fim do arquivo
+                for _ in response.streaming_content:
+                    pass
+            # O request_finished do close() fecharia a conexão com o banco no
+            # meio da transação (o invólucro do test client religa o
+            # close_old_connections antes do sinal)
+            with mock.patch.object(connection, 'close_if_unusable_or_obsolete'):
+                response.close()
+        return response
+
+    def medir(self, api, cenario, contexto, options):
+        latencias, consultas = [], []
+        for i in range(options['repeticoes']):
+            metodo, url, corpo = cenario.preparar(contexto, i)
+            if not options['com_cache']:
+                caches['respostas'].clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = self.executar(api, metodo, url, corpo)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{cenario.nome}: {metodo.upper()} {url} retornou HTTP {response.status_code}: '
+                    f'{response.content[:500].decode(errors="replace")}'
+                )
+            consultas.append(len(capturadas))
+
+        # Memória numa repetição à parte: o tracemalloc deixa tudo mais lento
+        metodo, url, corpo = cenario.preparar(contexto, options['repeticoes'])
+        if not options['com_cache']:
+            caches['respostas'].clear()
+        tracemalloc.start()
+        try:
+            self.executar(api, metodo, url, corpo)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'rota': cenario.rota,
+            'metodo': metodo.upper(),
+            'status': response.status_code,
+            'latencia_ms': {
+                'p50': round(percentil(latencias, 50), 3),
+                'p90': round(percentil(latencias, 90), 3),
+                'p99': round(percentil(latencias, 99), 3),
+                'max': round(max(latencias), 3),
+            },
+            'consultas': max(consultas),
+            'memoria_pico_kib': round(pico / 1024, 1),
+        }
+
+    def linha(self, nome, resultado, base):
+        latencia = resultado['latencia_ms']
+        texto = (
+            f'{nome}: p50 {latencia["p50"]:.1f} ms, p99 {latencia["p99"]:.1f} ms, '
+            f'{resultado["consultas"]} consulta(s), {resultado["memoria_pico_kib"]:.0f} KiB'
+        )
+        anterior = (base or {}).get('cenarios', {}).get(nome)
+        if anterior:
+            p50 = anterior['latencia_ms']['p50']
+            variacao = (latencia['p50'] - p50) / p50 * 100 if p50 else 0
+            texto += f' | antes: p50 {p50:.1f} ms ({variacao:+.0f}%), {anterior["consultas"]} consulta(s)'
+            if anterior['consultas'] != resultado['consultas']:
+                texto = self.style.WARNING(texto)
+        return texto
+
+    def commit(self):
+        try:
+            resultado = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return resultado.stdout.strip() or None
@@ -0,0 +1,53 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Cliente, Projeto, Tarefa
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede as operações de subárvore de Tarefa (descendentes, cascata de "
+        "'concluida', contagem e ancestrais) em uma árvore gerada. "
+        "Os dados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--largura', type=int, default=10, help='Filhas por tarefa.')
+        parser.add_argument('--profundidade', type=int, default=4, help='Níveis abaixo da raiz.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            raiz, folha = self.criar_arvore(options['largura'], options['profundidade'])
+            total = raiz.descendentes().count() + 1
+            self.stdout.write(f'Árvore com {total} tarefas')
+
+            self.medir('descendentes', lambda: list(raiz.descendentes().values_list('id', flat=True)))
+            self.medir('cascata concluida', lambda: raiz.descendentes().update(concluida=True))
+            self.medir('contagem da subárvore', lambda: raiz.descendentes().count())
+            self.medir('ancestrais da folha', lambda: list(folha.ancestrais()))
+            transaction.set_rollback(True)
+
+    def criar_arvore(self, largura, profundidade):
+        usuario = User.objects.create(username='benchmark-arvore')
+        cliente = Cliente.objects.create(nome='benchmark-arvore', criado_por=usuario)
+        projeto = Projeto.objects.create(cliente=cliente, codigo_tag='BENCHMARK-ARVORE')
+        raiz = Tarefa.objects.create(projeto=projeto, descricao='raiz')
+        nivel = [raiz]
+        for _ in range(profundidade):
+            nivel = Tarefa.objects.bulk_create([
+                Tarefa(projeto=projeto, tarefa_pai=pai, descricao=f'{pai.descricao}.{i}')
+                for pai in nivel for i in range(largura)
+            ])
+            Tarefa.preencher_caminhos(nivel)
+        return raiz, nivel[-1]
+
+    def medir(self, nome, funcao):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            funcao()
+            duracao = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(f'{nome}: {duracao:.2f} ms, {len(consultas)} consulta(s)')
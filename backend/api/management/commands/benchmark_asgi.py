@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Cliente, Projeto, Tarefa, MembroProjeto
+
+
+def _gunicorn(porta, threads):
+    return [
+        sys.executable, '-m', 'gunicorn', 'core.wsgi', '--worker-class', 'gthread',
+        '--workers', '1', '--threads', str(threads), '--bind', f'127.0.0.1:{porta}',
+        '--log-level', 'warning',
+    ]
+
+
+def _uvicorn(porta, threads):
+    return [
+        sys.executable, '-m', 'uvicorn', 'core.asgi:application', '--workers', '1',
+        '--host', '127.0.0.1', '--port', str(porta), '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+# Comando e variáveis de ambiente de cada servidor: 'asgi' são os ViewSets
+# síncronos sob o uvicorn, 'asgi-leituras' as leituras de api/views_async.py
+SERVIDORES = {
+    'wsgi': (_gunicorn, {}),
+    'asgi': (_uvicorn, {'LEITURAS_ASSINCRONAS': '0'}),
+    'asgi-leituras': (_uvicorn, {'LEITURAS_ASSINCRONAS': '1'}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga HTTP com conexões keep-alive simultâneas contra os GETs de "
+        "clientes, detalhe de projeto e tarefas, servidos pelo gunicorn (WSGI, "
+        "gthread) e pelo uvicorn (ASGI), com os ViewSets ou com as leituras de "
+        "api/views_async.py (LEITURAS_ASSINCRONAS). Mede "
+        "vazão e latência (p50/p99) para cada número de conexões. Os servidores "
+        "usam o banco configurado (DB_NOME, DB_PERFIL...) e os dados criados "
+        "são excluídos ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conexoes', default='50,100,250,500')
+        parser.add_argument('--segundos', type=float, default=10)
+        parser.add_argument('--projetos', type=int, default=50)
+        parser.add_argument('--threads', type=int, default=8, help='Threads do gunicorn (gthread).')
+        parser.add_argument('--porta', type=int, default=8765)
+        parser.add_argument('--servidores', default='wsgi,asgi,asgi-leituras')
+
+    def handle(self, *args, **options):
+        servidores = options['servidores'].split(',')
+        if set(servidores) - set(SERVIDORES):
+            raise CommandError(f'Servidores válidos: {", ".join(SERVIDORES)}')
+        conexoes = [int(n) for n in options['conexoes'].split(',')]
+
+        usuario, urls = self.criar_dados(options['projetos'])
+        token = str(AccessToken.for_user(usuario))
+        try:
+            for nome in servidores:
+                self.stdout.write(f'{nome}:')
+                processo = self.iniciar(nome, options['porta'], options['threads'])
+                try:
+                    for n in conexoes:
+                        medidas = asyncio.run(
+                            self.carga(options['porta'], urls, token, n, options['segundos'])
+                        )
+                        self.relatar(n, medidas, options['segundos'])
+                finally:
+                    processo.terminate()
+                    processo.wait()
+        finally:
+            Cliente.objects.filter(criado_por=usuario).delete()
+            usuario.delete()
+
+    def criar_dados(self, n_projetos, tarefas_por_projeto=20):
+        usuario = User.objects.create(username='benchmark-asgi')
+        clientes = Cliente.objects.bulk_create([
+            Cliente(nome=f'benchmark-asgi {i}', criado_por=usuario) for i in range(max(1, n_projetos // 10))
+        ])
+        projetos = Projeto.objects.bulk_create([
+            Projeto(cliente=clientes[i % len(clientes)], codigo_tag=f'BENCHMARK-ASGI-{i}')
+            for i in range(n_projetos)
+        ])
+        MembroProjeto.objects.bulk_create([
+            MembroProjeto(projeto=projeto, usuario=usuario, papel=MembroProjeto.Papel.ADMIN)
+            for projeto in projetos
+        ])
+        tarefas = Tarefa.objects.bulk_create([
+            Tarefa(projeto=projeto, descricao=f'tarefa {i}')
+            for projeto in projetos for i in range(tarefas_por_projeto)
+        ])
+        Tarefa.preencher_caminhos(tarefas)
+        ids = [projeto.pk for projeto in projetos]
+        Projeto.recalcular_contadores(Projeto.objects.filter(pk__in=ids))
+        urls = ['/api/clientes/?page_size=20', '/api/tarefas/?page_size=50']
+        urls += [f'/api/projetos/{pk}/' for pk in ids]
+        return usuario, urls
+
+    def iniciar(self, nome, porta, threads):
+        # O servidor herda o ambiente (DJANGO_SETTINGS_MODULE, DB_NOME...)
+        comando, ambiente = SERVIDORES[nome]
+        processo = subprocess.Popen(
+            comando(porta, threads), cwd=settings.BASE_DIR, env={**os.environ, **ambiente},
+        )
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if processo.poll() is not None:
+                raise CommandError(f'O servidor {nome} terminou ao iniciar.')
+            try:
+                socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+                return processo
+            except OSError:
+                time.sleep(0.2)
+        processo.terminate()
+        raise CommandError(f'O servidor {nome} não respondeu em 30s.')
+
+    async def carga(self, porta, urls, token, n_conexoes, segundos):
+        fim = time.perf_counter() + segundos
+        ciclo = itertools.cycle(urls)
+        latencias, erros = [], []
+
+        async def conexao():
+            leitor = escritor = None
+            while time.perf_counter() < fim:
+                try:
+                    if escritor is None:
+                        leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+                    inicio = time.perf_counter()
+                    escritor.write(
+                        f'GET {next(ciclo)} HTTP/1.1\r\nHost: localhost\r\n'
+                        f'Authorization: Bearer {token}\r\n\r\n'.encode()
+                    )
+                    cabecalho = await leitor.readuntil(b'\r\n\r\n')
+                    codigo = int(cabecalho.split(b' ', 2)[1])
+                    tamanho = next(
+                        int(linha.split(b':', 1)[1]) for linha in cabecalho.split(b'\r\n')
+                        if linha.lower().startswith(b'content-length:')
+                    )
+                    await leitor.readexactly(tamanho)
+                except (OSError, asyncio.IncompleteReadError, StopIteration) as erro:
+                    erros.append(type(erro).__name__)
+                    escritor = None
+                    continue
+                if codigo != 200:
+                    erros.append(f'HTTP {codigo}')
+                    continue
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            if escritor is not None:
+                escritor.close()
+
+        await asyncio.gather(*(conexao() for _ in range(n_conexoes)))
+        return latencias, erros
+
+    def relatar(self, n_conexoes, medidas, segundos):
+        latencias, erros = medidas
+        latencias.sort()
+        linha = f'  {n_conexoes} conexões: {len(latencias) / segundos:.1f} req/s'
+        if latencias:
+            p50 = latencias[len(latencias) // 2]
+            p99 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))]
+            linha += f', p50 {p50:.1f} ms, p99 {p99:.1f} ms'
+        linha += f', {len(erros)} erro(s)'
+        self.stdout.write(linha)
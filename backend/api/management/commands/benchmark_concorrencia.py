@@ -0,0 +1,167 @@
+import itertools
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import busca
+from api.models import Cliente, Projeto, Tarefa, MembroProjeto
+from core.banco import REPLICA
+
+
+class Command(BaseCommand):
+    help = (
+        "Leitores e escritores simultâneos contra a API (GETs de tarefas "
+        "urgentes e busca; PATCHs que concluem subárvores em cascata), medindo "
+        "vazão, latência e erros de 'database is locked'. Usa o perfil de banco "
+        "ativo: compare rodando com e sem DB_PERFIL=producao (e DB_REPLICA, "
+        "que recebe uma cópia do primário antes da medição). Os dados criados "
+        "são excluídos ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leitores', type=int, default=8)
+        parser.add_argument('--escritores', type=int, default=2)
+        parser.add_argument('--segundos', type=float, default=10)
+        parser.add_argument('--projetos', type=int, default=20)
+
+    def handle(self, *args, **options):
+        banco = settings.DATABASES['default']
+        self.stdout.write(
+            f"Banco: {banco['NAME']} ({banco.get('OPTIONS', {}).get('init_command') or 'sem PRAGMAs'})"
+        )
+        # Os erros 500 são contados no resumo; sem o traceback de cada um
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            usuario, raizes = self.criar_dados(options['projetos'])
+            try:
+                if REPLICA in settings.DATABASES:
+                    self.copiar_para_replica()
+                self.medir(usuario, raizes, options)
+            finally:
+                Cliente.objects.filter(criado_por=usuario).delete()
+                usuario.delete()
+
+    def criar_dados(self, n_projetos, largura=5, profundidade=3):
+        usuario = User.objects.create(username='benchmark-concorrencia')
+        cliente = Cliente.objects.create(nome='benchmark-concorrencia', criado_por=usuario)
+        projetos = Projeto.objects.bulk_create([
+            Projeto(cliente=cliente, codigo_tag=f'BENCHMARK-CONCORRENCIA-{i}') for i in range(n_projetos)
+        ])
+        MembroProjeto.objects.bulk_create([
+            MembroProjeto(projeto=projeto, usuario=usuario, papel=MembroProjeto.Papel.ADMIN)
+            for projeto in projetos
+        ])
+        hoje = timezone.localdate()
+        nivel = Tarefa.objects.bulk_create([
+            Tarefa(projeto=projeto, descricao=f'tarefa {projeto.codigo_tag}', data_prazo=hoje)
+            for projeto in projetos
+        ])
+        Tarefa.preencher_caminhos(nivel)
+        raizes = [tarefa.pk for tarefa in nivel]
+        for profundidade_atual in range(profundidade):
+            nivel = Tarefa.objects.bulk_create([
+                Tarefa(
+                    projeto_id=pai.projeto_id, tarefa_pai=pai, descricao=f'{pai.descricao}.{i}',
+                    data_prazo=hoje + timedelta(days=i + profundidade_atual),
+                )
+                for pai in nivel for i in range(largura)
+            ])
+            Tarefa.preencher_caminhos(nivel)
+        ids = [projeto.pk for projeto in projetos]
+        Projeto.recalcular_contadores(Projeto.objects.filter(pk__in=ids))
+        Tarefa.recalcular_contadores(Tarefa.objects.filter(projeto_id__in=ids))
+        busca.indexar(Tarefa.objects.filter(projeto_id__in=ids))
+        return usuario, raizes
+
+    def copiar_para_replica(self):
+        connections.close_all()
+        origem = sqlite3.connect(settings.DATABASES['default']['NAME'])
+        destino = sqlite3.connect(settings.DATABASES[REPLICA]['NAME'])
+        with origem, destino:
+            origem.backup(destino)
+        origem.close()
+        destino.close()
+        self.stdout.write(f"Réplica copiada para {settings.DATABASES[REPLICA]['NAME']}")
+
+    def medir(self, usuario, raizes, options):
+        fim = time.perf_counter() + options['segundos']
+        resultados = defaultdict(list)
+        threads = []
+        for i in range(options['leitores']):
+            threads.append(threading.Thread(
+                target=self.executar, args=('leitura', self.leitor(usuario, i), fim, resultados)
+            ))
+        for i in range(options['escritores']):
+            raizes_do_escritor = raizes[i::options['escritores']]
+            threads.append(threading.Thread(
+                target=self.executar, args=('escrita', self.escritor(usuario, raizes_do_escritor), fim, resultados)
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for papel, medidas in sorted(resultados.items()):
+            latencias = sorted(ms for lista, _ in medidas for ms in lista)
+            erros = sum((contagem for _, contagem in medidas), Counter())
+            linha = f'{papel}: {len(latencias)} ok ({len(latencias) / options["segundos"]:.1f}/s)'
+            if latencias:
+                p95 = latencias[int(len(latencias) * 0.95) - 1] if len(latencias) >= 20 else latencias[-1]
+                linha += f', p50 {statistics.median(latencias):.1f} ms, p95 {p95:.1f} ms'
+            linha += f', {sum(erros.values())} erro(s)'
+            self.stdout.write(linha)
+            for erro, total in erros.most_common():
+                self.stdout.write(f'    {total}x {erro}')
+
+    def cliente_da_api(self, usuario):
+        api = APIClient()
+        api.force_authenticate(usuario)
+        return api
+
+    def leitor(self, usuario, indice):
+        api = self.cliente_da_api(usuario)
+        urls = itertools.islice(itertools.cycle([
+            '/api/tarefas/urgentes/?dias=3650&page_size=100',
+            '/api/busca/?q=tarefa benchmark',
+        ]), indice, None)
+        return lambda: api.get(next(urls))
+
+    def escritor(self, usuario, raizes):
+        api = self.cliente_da_api(usuario)
+        # Cada escritor alterna 'concluida' nas suas raízes (cascata na subárvore)
+        alteracoes = itertools.cycle([(pk, concluida) for concluida in (True, False) for pk in raizes])
+
+        def escrever():
+            pk, concluida = next(alteracoes)
+            return api.patch(f'/api/tarefas/{pk}/', {'concluida': concluida}, format='json')
+        return escrever
+
+    def executar(self, papel, funcao, fim, resultados):
+        latencias, erros = [], Counter()
+        try:
+            while time.perf_counter() < fim:
+                inicio = time.perf_counter()
+                try:
+                    response = funcao()
+                except OperationalError as erro:
+                    erros[str(erro)] += 1
+                    continue
+                if response.status_code != 200:
+                    erros[f'HTTP {response.status_code}'] += 1
+                    continue
+                latencias.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            connections.close_all()
+        resultados[papel].append((latencias, erros))
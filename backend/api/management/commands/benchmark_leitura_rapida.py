@@ -0,0 +1,89 @@
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from api.leitura_rapida import LeituraRapidaMixin
+from api.models import Cliente, Projeto, Tarefa, MembroProjeto
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o list/retrieve de tarefas e projetos pela leitura rápida "
+        "(values() + orjson, api/leitura_rapida.py) com os serializers do DRF, "
+        "num projeto com cada quantidade de tarefas. Confere que as respostas "
+        "têm os mesmos bytes. Os dados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarefas', default='10000,100000')
+        parser.add_argument('--repeticoes', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            usuario = User.objects.create(username='benchmark-leitura-rapida')
+            api = APIClient()
+            api.force_authenticate(usuario)
+            for total in [int(n) for n in options['tarefas'].split(',')]:
+                projeto = self.criar_dados(usuario, total)
+                self.stdout.write(f'{total} tarefas:')
+                urls = [
+                    '/api/tarefas/?page_size=500',
+                    '/api/tarefas/?paginate=false',
+                    '/api/tarefas/?paginate=false&expand=subtarefas',
+                    f'/api/projetos/{projeto.pk}/?expand=tarefas',
+                ]
+                for url in urls:
+                    self.comparar(api, url, options['repeticoes'])
+                Cliente.objects.filter(criado_por=usuario).delete()
+            transaction.set_rollback(True)
+
+    def criar_dados(self, usuario, total):
+        cliente = Cliente.objects.create(nome='benchmark-leitura-rapida', criado_por=usuario)
+        projeto = Projeto.objects.create(cliente=cliente, codigo_tag='BENCHMARK-LEITURA-RAPIDA')
+        MembroProjeto.objects.create(projeto=projeto, usuario=usuario, papel=MembroProjeto.Papel.ADMIN)
+        # Metade raízes, metade subtarefas (uma por raiz), com prazos variados
+        raizes = []
+        for inicio in range(0, total // 2, 10_000):
+            raizes += Tarefa.objects.bulk_create([
+                Tarefa(projeto=projeto, descricao=f'Tarefa {i}', data_prazo=projeto.data_criacao.date())
+                for i in range(inicio, min(inicio + 10_000, total // 2))
+            ])
+        subtarefas = []
+        for inicio in range(0, len(raizes), 10_000):
+            subtarefas += Tarefa.objects.bulk_create([
+                Tarefa(projeto=projeto, tarefa_pai=pai, descricao=f'Sub {pai.descricao}', concluida=True)
+                for pai in raizes[inicio:inicio + 10_000]
+            ])
+        Tarefa.preencher_caminhos(raizes + subtarefas)
+        Projeto.recalcular_contadores(Projeto.objects.filter(pk=projeto.pk))
+        return projeto
+
+    def medir(self, api, url, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            # Sem o cache de respostas: mede a montagem da resposta
+            caches['respostas'].clear()
+            inicio = time.perf_counter()
+            response = api.get(url)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: HTTP {response.status_code}')
+        return statistics.median(tempos), response.content
+
+    def comparar(self, api, url, repeticoes):
+        with mock.patch.object(LeituraRapidaMixin, 'leitura_rapida', False):
+            drf_ms, esperado = self.medir(api, url, repeticoes)
+        rapida_ms, conteudo = self.medir(api, url, repeticoes)
+        if conteudo != esperado:
+            raise CommandError(f'{url}: a leitura rápida gerou uma resposta diferente dos serializers.')
+        self.stdout.write(
+            f'  {url}: serializers {drf_ms:.1f} ms, leitura rápida {rapida_ms:.1f} ms '
+            f'({drf_ms / rapida_ms:.1f}x, {len(conteudo) / 1024:.0f} KiB)'
+        )
@@ -0,0 +1,79 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.pagination import Cursor
+from rest_framework.test import APIClient
+
+from api.models import Cliente, Projeto, Tarefa, MembroProjeto
+from api.pagination import CursorPaginacao, PaginacaoPorPosicao
+from api.views import TarefaViewSet
+
+
+class PaginacaoPorOffset(PaginacaoPorPosicao):
+    """LIMIT/OFFSET sem COUNT(*) e sem teto no limite, só para a comparação."""
+    max_limit = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência de /api/tarefas/ em páginas cada vez mais distantes, "
+        "comparando o cursor com um LIMIT/OFFSET equivalente, ambos como "
+        "requisições completas à mesma view. "
+        "Os dados são descartados ao final (rollback)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarefas', type=int, default=1_000_000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--paginas', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            usuario = self.criar_dados(options['tarefas'])
+            api = APIClient()
+            api.force_authenticate(usuario)
+            ids = Tarefa.objects.order_by('id').values_list('id', flat=True)
+
+            for pagina in options['paginas']:
+                offset = (pagina - 1) * page_size
+                if offset >= options['tarefas']:
+                    continue
+                url = f'/api/tarefas/?page_size={page_size}'
+                if offset:
+                    url = self.url_do_cursor(url, ids[offset - 1])
+                cursor_ms = self.medir(api, url)
+                # A mesma página pela mesma view, paginada por LIMIT/OFFSET
+                with mock.patch.object(TarefaViewSet, 'pagination_class', PaginacaoPorOffset):
+                    offset_ms = self.medir(api, f'/api/tarefas/?limit={page_size}&offset={offset}')
+                self.stdout.write(f'página {pagina}: cursor {cursor_ms:.2f} ms, offset {offset_ms:.2f} ms')
+            transaction.set_rollback(True)
+
+    def medir(self, api, url):
+        """Duração da requisição completa, em ms."""
+        inicio = time.perf_counter()
+        response = api.get(url)
+        duracao = (time.perf_counter() - inicio) * 1000
+        assert response.status_code == 200, response.status_code
+        return duracao
+
+    def criar_dados(self, total):
+        usuario = User.objects.create(username='benchmark-paginacao')
+        cliente = Cliente.objects.create(nome='benchmark-paginacao', criado_por=usuario)
+        projeto = Projeto.objects.create(cliente=cliente, codigo_tag='BENCHMARK-PAGINACAO')
+        MembroProjeto.objects.create(projeto=projeto, usuario=usuario, papel=MembroProjeto.Papel.ADMIN)
+        for inicio in range(0, total, 10_000):
+            Tarefa.objects.bulk_create([
+                Tarefa(projeto=projeto, descricao=f'Tarefa {i}')
+                for i in range(inicio, min(inicio + 10_000, total))
+            ])
+        return usuario
+
+    def url_do_cursor(self, url, posicao):
+        paginador = CursorPaginacao()
+        paginador.base_url = 'http://testserver' + url
+        return paginador.encode_cursor(Cursor(offset=0, reverse=False, position=str(posicao)))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import transferencia
+from api.models import Cliente
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta um cliente com todos os seus projetos, membros e tarefas "
+        "(api/transferencia.py), um registro por linha, para um arquivo ou "
+        "para a saída padrão. O arquivo pode ser importado em outro ambiente "
+        "com o comando importar_cliente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('cliente', type=int, help='ID do cliente.')
+        parser.add_argument('--formato', choices=transferencia.FORMATOS, default='ndjson')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: a saída padrão).')
+
+    def handle(self, *args, **options):
+        try:
+            cliente = Cliente.objects.get(pk=options['cliente'])
+        except Cliente.DoesNotExist:
+            raise CommandError(f"Cliente {options['cliente']} não encontrado.")
+        linhas = transferencia.exportar(cliente, options['formato'])
+        if options['saida'] is None:
+            for linha in linhas:
+                self.stdout.write(linha.decode(), ending='')
+            return
+        with open(options['saida'], 'wb') as arquivo:
+            arquivo.writelines(linhas)
+        self.stdout.write(self.style.SUCCESS(f"Cliente {cliente.pk} exportado para {options['saida']}."))
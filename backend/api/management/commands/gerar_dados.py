@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import dados_sinteticos
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos (api/dados_sinteticos.py): usuários, clientes, "
+        "projetos com membros em papéis variados e árvores de tarefas com "
+        "prazos. --largura e --profundidade controlam o formato das árvores "
+        "(ex.: --largura 1 --profundidade 50 para árvores profundas). Com "
+        "--remover, exclui os dados do prefixo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10)
+        parser.add_argument('--clientes', type=int, default=5)
+        parser.add_argument('--projetos', type=int, default=20)
+        parser.add_argument('--tarefas-por-projeto', type=int, default=100)
+        parser.add_argument('--membros-por-projeto', type=int, default=3)
+        parser.add_argument('--largura', type=int, default=5, help='Máximo de subtarefas por tarefa.')
+        parser.add_argument('--profundidade', type=int, default=4, help='Máximo de níveis de cada árvore.')
+        parser.add_argument('--prefixo', default='sintetico')
+        parser.add_argument('--senha', default='senha-sintetica', help='Senha de todos os usuários gerados.')
+        parser.add_argument('--semente', type=int, default=0)
+        parser.add_argument('--remover', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['remover']:
+            with transaction.atomic():
+                total = dados_sinteticos.remover(options['prefixo'])
+            self.stdout.write(self.style.SUCCESS(f'{total} usuário(s) removido(s), com seus dados.'))
+            return
+
+        for opcao in ('usuarios', 'clientes', 'projetos', 'largura', 'profundidade'):
+            if options[opcao] < 1:
+                raise CommandError(f'--{opcao} deve ser maior que zero.')
+        try:
+            with transaction.atomic():
+                dados = dados_sinteticos.gerar(
+                    usuarios=options['usuarios'],
+                    clientes=options['clientes'],
+                    projetos=options['projetos'],
+                    tarefas_por_projeto=options['tarefas_por_projeto'],
+                    membros_por_projeto=options['membros_por_projeto'],
+                    largura=options['largura'],
+                    profundidade=options['profundidade'],
+                    prefixo=options['prefixo'],
+                    senha=options['senha'],
+                    semente=options['semente'],
+                )
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        resumo = ', '.join(f'{total} {nome}' for nome, total in dados.contagens.items())
+        self.stdout.write(self.style.SUCCESS(f'Criados: {resumo}.'))
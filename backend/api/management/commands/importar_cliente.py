@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import transferencia
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa um arquivo gerado por exportar_cliente (ou por GET "
+        "/api/clientes/<id>/exportar/) como um novo cliente de --usuario, que "
+        "passa a ser ADMIN dos projetos. O arquivo é lido linha a linha e as "
+        "tarefas gravadas em lotes; com qualquer erro, nada é gravado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--usuario', required=True, help='Username de quem fica como dono do cliente.')
+        parser.add_argument('--formato', choices=transferencia.FORMATOS, default='ndjson')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário '{options['usuario']}' não encontrado.")
+        try:
+            with open(options['arquivo'], 'rb') as arquivo, transaction.atomic():
+                resumo = transferencia.importar(arquivo, usuario, options['formato'])
+        except OSError as erro:
+            raise CommandError(str(erro))
+        except transferencia.ErroDeImportacao as erro:
+            raise CommandError(str(erro))
+        contagens = ', '.join(f'{total} {nome}' for nome, total in resumo.contagens.items())
+        self.stdout.write(self.style.SUCCESS(f'Importados: {contagens}.'))
+        if resumo.usuarios_nao_encontrados:
+            self.stdout.write(self.style.WARNING(
+                'Membros ignorados (usuários inexistentes): ' + ', '.join(sorted(resumo.usuarios_nao_encontrados))
+            ))
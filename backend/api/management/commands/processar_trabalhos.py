@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from api import trabalhos
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa a fila de trabalhos em segundo plano (api/trabalhos.py): "
+        "exclusões de clientes, projetos e subárvores grandes e conclusões em "
+        "cascata, em lotes. Fica esperando novos trabalhos, verificando a fila "
+        "a cada --intervalo segundos; com --uma-vez, sai quando a fila esvazia. "
+        "Vários workers podem rodar ao mesmo tempo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Segundos entre verificações da fila vazia.')
+        parser.add_argument('--uma-vez', action='store_true', help='Esvazia a fila e sai.')
+
+    def handle(self, *args, **options):
+        if options['intervalo'] <= 0:
+            raise CommandError('--intervalo deve ser maior que zero.')
+        while True:
+            executados = trabalhos.processar_pendentes()
+            if executados:
+                self.stdout.write(f'{executados} trabalho(s) executado(s).')
+            if options['uma_vez']:
+                return
+            # Como entre requisições: descarta conexões quebradas ou velhas
+            close_old_connections()
+            time.sleep(options['intervalo'])
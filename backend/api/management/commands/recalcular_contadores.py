@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+
+from api.models import Projeto, Tarefa
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói os contadores de progresso de Projeto (total_tarefas, "
+        "tarefas_concluidas) e Tarefa (total_descendentes, descendentes_concluidas). "
+        "Com --verificar, apenas compara com os valores reais e falha se houver diferença."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Não altera nada; só verifica.')
+        parser.add_argument('--projeto', type=int, action='append', help='Limita a estes projetos (repetível).')
+
+    def handle(self, *args, **options):
+        projetos = Projeto.objects.all()
+        tarefas = Tarefa.objects.all()
+        if options['projeto']:
+            projetos = projetos.filter(pk__in=options['projeto'])
+            tarefas = tarefas.filter(projeto_id__in=options['projeto'])
+
+        if options['verificar']:
+            divergentes = self.divergentes(projetos, Projeto) + self.divergentes(tarefas, Tarefa)
+            if divergentes:
+                raise CommandError(f'{divergentes} registro(s) com contadores divergentes.')
+            self.stdout.write(self.style.SUCCESS('Contadores conferidos.'))
+            return
+
+        with transaction.atomic():
+            total_projetos = Projeto.recalcular_contadores(projetos)
+            total_tarefas = Tarefa.recalcular_contadores(tarefas)
+        self.stdout.write(self.style.SUCCESS(
+            f'Contadores recalculados: {total_projetos} projeto(s), {total_tarefas} tarefa(s).'
+        ))
+
+    def divergentes(self, queryset, modelo):
+        reais = modelo.contadores_reais()
+        divergencia = Q()
+        for campo in reais:
+            divergencia |= ~Q(**{campo: F(f'{campo}_real')})
+        anotacoes = {f'{campo}_real': expressao for campo, expressao in reais.items()}
+        linhas = queryset.annotate(**anotacoes).filter(divergencia)
+        for linha in linhas.values('pk', *reais, *anotacoes)[:20]:
+            self.stdout.write(f'{modelo.__name__} {linha["pk"]}: {linha}')
+        return linhas.count()
+
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import busca
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice de busca textual (tarefas, projetos e clientes) a partir das tabelas."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            busca.reconstruir()
+        self.stdout.write(self.style.SUCCESS('Índice de busca reconstruído.'))
@@ -0,0 +1,331 @@
+# backend/api/metricas.py
+
+"""
+Métricas de desempenho por requisição.
+
+O MetricasMiddleware abre uma Medicao para cada requisição e, ao final:
+- escreve o cabeçalho Server-Timing (aparece na aba Network do navegador)
+  com o tempo das consultas SQL (db, com o número de consultas), da
+  autenticação, da serialização, da renderização e o total;
+- acumula esses tempos e o número de consultas em histogramas por rota
+  (nome da URL, ex.: 'cliente-list') e método, expostos em /api/metrics/
+  no formato de texto do Prometheus;
+- com METRICAS_LENTAS_MS, registra no logger 'api.lentas' as requisições
+  que levaram pelo menos esse tempo, com o SQL de cada consulta.
+
+As fases são medidas onde acontecem: as consultas por um execute_wrapper
+em cada conexão, a autenticação no perform_authentication das views
+(MedicaoNaViewMixin), a serialização no to_representation dos serializers
+e no Montador da leitura rápida, e a renderização no
+process_template_response. O tempo de cada fase não inclui o das
+consultas feitas durante ela, que entra em db: as fases somam no máximo o
+total. Como no django-debug-toolbar, db é o tempo do execute() de cada
+consulta; a leitura das linhas que vem depois (fetch) conta na fase em
+que acontece.
+
+Os histogramas ficam na memória do processo: com vários workers, cada um
+expõe os seus (o Prometheus soma as séries de cada alvo).
+"""
+
+import logging
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger('api.lentas')
+
+FASES = ('autenticacao', 'serializacao', 'renderizacao')
+
+# Limites (em segundos) dos histogramas de duração e de número de consultas
+LIMITES_DE_DURACAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_DE_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Consultas listadas no log de uma requisição lenta
+SQL_NO_LOG = 200
+
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """Tempos e consultas de uma requisição."""
+
+    def __init__(self, guardar_sql=False):
+        self.inicio = perf_counter()
+        self.total = None
+        self.tempo_db = 0.0
+        self.consultas = 0
+        self.fases = dict.fromkeys(FASES, 0.0)
+        self.ativas = set()
+        # (duração, sql, params) de cada consulta, para o log de lentas
+        self.sql = [] if guardar_sql else None
+
+    def registrar_consulta(self, sql, params, duracao):
+        self.consultas += 1
+        self.tempo_db += duracao
+        if self.sql is not None and len(self.sql) < SQL_NO_LOG:
+            self.sql.append((duracao, sql, params))
+
+    def encerrar(self):
+        self.total = perf_counter() - self.inicio
+
+    def server_timing(self):
+        partes = [f'db;dur={self.tempo_db * 1000:.1f};desc="{self.consultas} consulta(s)"']
+        partes += [f'{fase};dur={self.fases[fase] * 1000:.1f}' for fase in FASES]
+        partes.append(f'total;dur={self.total * 1000:.1f}')
+        return ', '.join(partes)
+
+
+class medir:
+    """
+    Conta o tempo do bloco na fase da requisição atual, sem o das consultas
+    feitas nele. Blocos aninhados da mesma fase (serializers aninhados)
+    contam uma vez só. Fora de uma requisição medida, não faz nada.
+    """
+
+    def __init__(self, fase):
+        self.fase = fase
+
+    def __enter__(self):
+        medicao = self.medicao = _medicao_atual.get()
+        if medicao is None or self.fase in medicao.ativas:
+            self.medicao = None
+            return
+        medicao.ativas.add(self.fase)
+        self.tempo_db = medicao.tempo_db
+        self.inicio = perf_counter()
+
+    def __exit__(self, *exc_info):
+        medicao = self.medicao
+        if medicao is not None:
+            medicao.fases[self.fase] += perf_counter() - self.inicio - (medicao.tempo_db - self.tempo_db)
+            medicao.ativas.discard(self.fase)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.registrar_consulta(sql, params, perf_counter() - inicio)
+
+
+@receiver(connection_created)
+def instalar_na_conexao(sender, connection, **kwargs):
+    # O ContextVar acompanha as consultas feitas em sync_to_async (ASGI). No
+    # início da lista: o connection.execute_wrapper() remove o último da lista
+    # ao sair, mesmo que a conexão tenha sido aberta dentro dele
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _medir_consulta)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, contagem in zip((*self.limites, '+Inf'), self.contagens):
+            acumulado += contagem
+            yield f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}'
+        yield f'{nome}_sum{{{rotulos}}} {self.soma}'
+        yield f'{nome}_count{{{rotulos}}} {self.total}'
+
+
+def _rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registro:
+    """Histogramas por rota e método, acumulados no processo."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.limpar()
+
+    def limpar(self):
+        with self._trava:
+            # (rota, metodo, fase) -> Histograma; (rota, metodo) -> Histograma; (rota, metodo, status) -> int
+            self.duracoes = {}
+            self.consultas = {}
+            self.respostas = {}
+
+    def registrar(self, rota, metodo, status, medicao):
+        tempos = {'total': medicao.total, 'db': medicao.tempo_db, **medicao.fases}
+        with self._trava:
+            for fase, duracao in tempos.items():
+                chave = (rota, metodo, fase)
+                if chave not in self.duracoes:
+                    self.duracoes[chave] = Histograma(LIMITES_DE_DURACAO)
+                self.duracoes[chave].observar(duracao)
+            if (rota, metodo) not in self.consultas:
+                self.consultas[rota, metodo] = Histograma(LIMITES_DE_CONSULTAS)
+            self.consultas[rota, metodo].observar(medicao.consultas)
+            self.respostas[rota, metodo, status] = self.respostas.get((rota, metodo, status), 0) + 1
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)."""
+        with self._trava:
+            linhas = [
+                '# HELP api_requisicoes_total Requisições atendidas, por rota, método e status.',
+                '# TYPE api_requisicoes_total counter',
+            ]
+            for (rota, metodo, status), total in sorted(self.respostas.items()):
+                linhas.append(
+                    f'api_requisicoes_total{{rota="{_rotulo(rota)}",metodo="{metodo}",status="{status}"}} {total}'
+                )
+            linhas += [
+                '# HELP api_requisicao_segundos Duração das requisições e de cada fase (total, db, '
+                'autenticacao, serializacao, renderizacao).',
+                '# TYPE api_requisicao_segundos histogram',
+            ]
+            for (rota, metodo, fase), histograma in sorted(self.duracoes.items()):
+                rotulos = f'rota="{_rotulo(rota)}",metodo="{metodo}",fase="{fase}"'
+                linhas += histograma.linhas('api_requisicao_segundos', rotulos)
+            linhas += [
+                '# HELP api_requisicao_consultas Consultas SQL por requisição.',
+                '# TYPE api_requisicao_consultas histogram',
+            ]
+            for (rota, metodo), histograma in sorted(self.consultas.items()):
+                linhas += histograma.linhas('api_requisicao_consultas', f'rota="{_rotulo(rota)}",metodo="{metodo}"')
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+
+def _rota(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return '(sem rota)'
+    return resolver_match.view_name or resolver_match.route
+
+
+class MetricasMiddleware:
+    """Mede cada requisição (ver o início do módulo). Deve ser o primeiro middleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        medicao = self._iniciar()
+        token = _medicao_atual.set(medicao)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._encerrar(request, response, medicao)
+
+    async def __acall__(self, request):
+        medicao = self._iniciar()
+        token = _medicao_atual.set(medicao)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        return self._encerrar(request, response, medicao)
+
+    def process_template_response(self, request, response):
+        # Chamado logo antes do response.render() do Django (Response do DRF)
+        with medir('renderizacao'):
+            response.render()
+        return response
+
+    def _iniciar(self):
+        return Medicao(guardar_sql=getattr(settings, 'METRICAS_LENTAS_MS', None) is not None)
+
+    def _encerrar(self, request, response, medicao):
+        medicao.encerrar()
+        response['Server-Timing'] = medicao.server_timing()
+        rota = _rota(request)
+        registro.registrar(rota, request.method, response.status_code, medicao)
+        limite = getattr(settings, 'METRICAS_LENTAS_MS', None)
+        if limite is not None and medicao.total * 1000 >= limite:
+            registrar_lenta(request, rota, response, medicao)
+        return response
+
+
+def registrar_lenta(request, rota, response, medicao):
+    consultas = [f'  {duracao * 1000:.1f} ms: {sql} {params!r}' for duracao, sql, params in medicao.sql]
+    if medicao.consultas > len(medicao.sql):
+        consultas.append(f'  (+{medicao.consultas - len(medicao.sql)} consultas)')
+    logger.warning(
+        'Requisição lenta: %s %s (%s) -> %s em %.1f ms; %s\n%s',
+        request.method, request.get_full_path(), rota, response.status_code, medicao.total * 1000,
+        medicao.server_timing(), '\n'.join(consultas),
+    )
+
+
+class MedicaoNaViewMixin:
+    """Mede a autenticação das views do DRF."""
+
+    def perform_authentication(self, request):
+        with medir('autenticacao'):
+            super().perform_authentication(request)
+
+
+class SerializacaoMedidaMixin:
+    """Mede o to_representation do serializer (os aninhados contam dentro do mais externo)."""
+
+    def to_representation(self, instance):
+        with medir('serializacao'):
+            return super().to_representation(instance)
+
+
+class TokenDeMetricas(BaseAuthentication):
+    """
+    'Authorization: Bearer <METRICAS_TOKEN>', para o Prometheus coletar
+    /api/metrics/ sem um usuário. Sem METRICAS_TOKEN, só usuários staff.
+    """
+
+    def authenticate(self, request):
+        token = getattr(settings, 'METRICAS_TOKEN', None)
+        partes = get_authorization_header(request).split()
+        if not token or len(partes) != 2 or partes[0].lower() != b'bearer':
+            return None
+        if not constant_time_compare(partes[1], token.encode()):
+            return None
+        return AnonymousUser(), 'metricas'
+
+    def authenticate_header(self, request):
+        # Sem ele, o DRF responde 403 em vez de 401 a um token inválido
+        return 'Bearer realm="api"'
+
+
+class RendererPrometheus(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            # Erros (401, 403...)
+            data = f"# {data.get('detail', data)}\n"
+        return data.encode(self.charset)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+def preencher_caminhos(apps, schema_editor):
+    """Calcula o caminho materializado das tarefas já existentes."""
+    Tarefa = apps.get_model('api', 'Tarefa')
+    pais = dict(Tarefa.objects.values_list('id', 'tarefa_pai_id'))
+    caminhos = {}
+
+    def caminho_de(tarefa_id):
+        # Sobe até a primeira tarefa com caminho conhecido (ou até a raiz)
+        pilha = []
+        while tarefa_id is not None and tarefa_id not in caminhos:
+            pilha.append(tarefa_id)
+            tarefa_id = pais[tarefa_id]
+        prefixo = caminhos.get(tarefa_id, '')
+        for atual in reversed(pilha):
+            prefixo += f'{atual:010d}/'
+            caminhos[atual] = prefixo
+        return prefixo
+
+    lote = []
+    for tarefa_id in pais:
+        lote.append(Tarefa(id=tarefa_id, caminho=caminho_de(tarefa_id)))
+        if len(lote) >= 500:
+            Tarefa.objects.bulk_update(lote, ['caminho'])
+            lote = []
+    Tarefa.objects.bulk_update(lote, ['caminho'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_cliente_criado_por'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='caminho',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.RunPython(preencher_caminhos, migrations.RunPython.noop),
+    ]
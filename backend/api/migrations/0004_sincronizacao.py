@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 06:58
+
+from django.db import migrations, models
+
+
+def iniciar_sequencia(apps, schema_editor):
+    """Cria o contador e marca os registros existentes com a primeira alteração."""
+    apps.get_model('api', 'Sequencia').objects.create(pk=1, valor=1)
+    for modelo in ('Cliente', 'Projeto', 'Tarefa', 'MembroProjeto'):
+        apps.get_model('api', modelo).objects.update(seq=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_tarefa_caminho'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Exclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cliente', 'Cliente'), ('projeto', 'Projeto'), ('tarefa', 'Tarefa'), ('membro', 'Membro do projeto')], max_length=10)),
+                ('objeto_id', models.BigIntegerField()),
+                ('projeto_id', models.BigIntegerField(blank=True, null=True)),
+                ('usuario_id', models.BigIntegerField(blank=True, null=True)),
+                ('seq', models.BigIntegerField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Sequencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='membroprojeto',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projeto',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(iniciar_sequencia, migrations.RunPython.noop),
+    ]
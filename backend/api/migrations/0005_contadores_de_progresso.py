@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:03
+
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Length, Substr
+
+
+def _contagem(queryset, concluidas=False):
+    if concluidas:
+        queryset = queryset.filter(concluida=True)
+    contagem = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total')
+    return Coalesce(Subquery(contagem), 0)
+
+
+def calcular_contadores(apps, schema_editor):
+    """Preenche os contadores de progresso a partir das tarefas existentes."""
+    Projeto = apps.get_model('api', 'Projeto')
+    Tarefa = apps.get_model('api', 'Tarefa')
+
+    tarefas = Tarefa.objects.filter(projeto=OuterRef('pk'))
+    Projeto.objects.update(
+        total_tarefas=_contagem(tarefas),
+        tarefas_concluidas=_contagem(tarefas, concluidas=True),
+    )
+
+    caminho = OuterRef('caminho')
+    limite = Concat(Substr(caminho, 1, Length(caminho) - 1), Value('0'))
+    descendentes = Tarefa.objects.filter(caminho__gt=caminho, caminho__lt=limite)
+    Tarefa.objects.update(
+        total_descendentes=_contagem(descendentes),
+        descendentes_concluidas=_contagem(descendentes, concluidas=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_sincronizacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projeto',
+            name='tarefas_concluidas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projeto',
+            name='total_tarefas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='descendentes_concluidas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='total_descendentes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_contadores_de_progresso'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projeto',
+            index=models.Index(fields=['data_prazo'], name='projeto_prazo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(condition=models.Q(('concluida', False)), fields=['projeto', 'data_prazo'], name='tarefa_abertas_prazo_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 07:20
+
+from django.db import migrations
+
+# Índice de busca textual (ver api/busca.py). O rowid é id * 4 + tipo
+# (1 = tarefa, 2 = projeto, 3 = cliente).
+CRIAR_INDICE = """
+CREATE VIRTUAL TABLE api_busca USING fts5(
+    titulo, detalhe, projeto_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+PREENCHER_INDICE = [
+    "INSERT INTO api_busca (rowid, titulo, detalhe, projeto_id) "
+    "SELECT id * 4 + 1, descricao, '', projeto_id FROM api_tarefa",
+    "INSERT INTO api_busca (rowid, titulo, detalhe, projeto_id) "
+    "SELECT id * 4 + 2, codigo_tag, nome_detalhado, id FROM api_projeto",
+    "INSERT INTO api_busca (rowid, titulo, detalhe, projeto_id) "
+    "SELECT id * 4 + 3, nome, '', NULL FROM api_cliente",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_indices_de_prazo'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CRIAR_INDICE, 'DROP TABLE api_busca'),
+        migrations.RunSQL(PREENCHER_INDICE, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_busca'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='membroprojeto',
+            name='projeto',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='adesoes', to='api.projeto'),
+        ),
+        migrations.AlterField(
+            model_name='membroprojeto',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='adesoes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tarefa',
+            name='projeto',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tarefas', to='api.projeto'),
+        ),
+        migrations.AlterField(
+            model_name='tarefa',
+            name='seq',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='membroprojeto',
+            index=models.Index(fields=['usuario', 'projeto', 'papel'], name='membro_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['projeto', 'caminho'], name='tarefa_projeto_caminho_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarefa',
+            index=models.Index(fields=['projeto', 'seq'], name='tarefa_projeto_seq_idx'),
+        ),
+    ]
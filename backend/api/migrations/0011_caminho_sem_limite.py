@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_indice_de_criacao_do_projeto'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tarefa',
+            name='caminho',
+            field=models.TextField(blank=True, db_index=True, default='', editable=False),
+        ),
+    ]
@@ -1,14 +1,81 @@
 # api/models.py
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Length, Substr
 from django.contrib.auth.models import User # <-- IMPORTAR ESTA LINHA
 from django.conf import settings # Importe settings
 
+
+class Sequencia(models.Model):
+    """
+    Contador global (linha única) que ordena as alterações de Cliente, Projeto,
+    Tarefa e MembroProjeto. Cada escrita recebe um valor maior que o anterior
+    no campo 'seq', usado pelo /api/sync/.
+    """
+    valor = models.BigIntegerField(default=0)
+
+    @classmethod
+    def proximo(cls):
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(valor=F('valor') + 1):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(valor=F('valor') + 1)
+            return cls.atual()
+
+    @classmethod
+    def atual(cls):
+        # Sempre do primário: uma posição atrasada (réplica) faria o /api/sync/
+        # e o /api/eventos/ repetirem ou perderem alterações
+        return cls.objects.using('default').filter(pk=1).values_list('valor', flat=True).first() or 0
+
+
+def campos_sem_contadores(instance, contadores):
+    """
+    Campos a gravar num save() de um objeto existente. Os contadores são
+    mantidos no banco com UPDATEs incrementais (F()), então o valor em memória
+    pode estar desatualizado e nunca deve sobrescrevê-los.
+    """
+    return [
+        campo.name for campo in instance._meta.concrete_fields
+        if not campo.primary_key and campo.name not in contadores
+    ]
+
+
+def _contagem(queryset, concluidas=False):
+    """Subquery com a contagem de tarefas (ou só das concluídas) de um queryset correlacionado."""
+    if concluidas:
+        queryset = queryset.filter(concluida=True)
+    contagem = queryset.order_by().annotate(total=Func(F('pk'), function='COUNT')).values('total')
+    return Coalesce(Subquery(contagem), 0)
+
+
+class Exclusao(models.Model):
+    """Registro (tombstone) de um objeto excluído, para o /api/sync/."""
+    class Tipo(models.TextChoices):
+        CLIENTE = 'cliente', 'Cliente'
+        PROJETO = 'projeto', 'Projeto'
+        TAREFA = 'tarefa', 'Tarefa'
+        MEMBRO = 'membro', 'Membro do projeto'
+
+    tipo = models.CharField(max_length=10, choices=Tipo.choices)
+    objeto_id = models.BigIntegerField()
+    # Usados para filtrar as exclusões que cada usuário pode ver
+    projeto_id = models.BigIntegerField(null=True, blank=True)
+    usuario_id = models.BigIntegerField(null=True, blank=True)
+    seq = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.objeto_id} excluído (seq {self.seq})"
+
+
 class Cliente(models.Model):
     nome = models.CharField(max_length=100, unique=True)
     data_criacao = models.DateTimeField(auto_now_add=True)
     # Adicione este campo para sabermos quem é o dono do cliente
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Número da última alteração (ver Sequencia)
+    seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     def __str__(self):
         return self.nome
@@ -19,12 +86,21 @@ class MembroProjeto(models.Model):
         EDITOR = 'EDITOR', 'Editor'
         VIEWER = 'VIEWER', 'Visualizador'
 
-    projeto = models.ForeignKey('Projeto', on_delete=models.CASCADE, related_name='adesoes')
-    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='adesoes')
+    # Sem os índices próprios das chaves estrangeiras: o unique_together
+    # (projeto, usuario) e o membro_usuario_idx já começam por elas
+    projeto = models.ForeignKey('Projeto', on_delete=models.CASCADE, related_name='adesoes', db_index=False)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='adesoes', db_index=False)
     papel = models.CharField(max_length=10, choices=Papel.choices, default=Papel.EDITOR)
+    seq = models.BigIntegerField(default=0, db_index=True, editable=False)
 
     class Meta:
         unique_together = ('projeto', 'usuario')
+        indexes = [
+            # Índice de cobertura do mapa de papéis (api/papeis.py) e dos
+            # projetos do usuário (projetos_participados): a consulta é
+            # respondida só pelo índice, sem ler a tabela
+            models.Index(fields=['usuario', 'projeto', 'papel'], name='membro_usuario_idx'),
+        ]
 
     def __str__(self):
         return f"{self.usuario.username} como {self.get_papel_display()} em '{self.projeto.codigo_tag}'"
@@ -37,12 +113,50 @@ class Projeto(models.Model):
     data_criacao = models.DateTimeField(auto_now_add=True)
     data_prazo = models.DateField(null=True, blank=True)
     membros = models.ManyToManyField(User, through=MembroProjeto, related_name='projetos_participados')
+    seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+    # Contadores de progresso, mantidos pelas escritas em Tarefa
+    total_tarefas = models.PositiveIntegerField(default=0, editable=False)
+    tarefas_concluidas = models.PositiveIntegerField(default=0, editable=False)
+
+    CONTADORES = ('total_tarefas', 'tarefas_concluidas')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['data_prazo'], name='projeto_prazo_idx'),
+            # Ordem padrão das listagens e do cursor (ProjetoViewSet.ordering)
+            models.Index(fields=['data_criacao', 'id'], name='projeto_criacao_idx'),
+        ]
 
     def __str__(self):
         return self.codigo_tag
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = campos_sem_contadores(self, self.CONTADORES)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def contadores_reais(cls):
+        """Expressões que contam as tarefas de cada projeto direto na tabela de tarefas."""
+        tarefas = Tarefa.objects.filter(projeto=OuterRef('pk'))
+        return {
+            'total_tarefas': _contagem(tarefas),
+            'tarefas_concluidas': _contagem(tarefas, concluidas=True),
+        }
+
+    @classmethod
+    def recalcular_contadores(cls, queryset=None):
+        """Reconstrói os contadores dos projetos do queryset em um único UPDATE."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(**cls.contadores_reais())
+
 
 class Tarefa(models.Model):
+    """
+    Tarefa de um projeto, com subtarefas em qualquer profundidade: cada nível
+    soma um segmento de 11 caracteres ao caminho materializado, um TextField
+    sem tamanho máximo (o SQLite não acusaria um caminho cortado).
+    """
     # Uma tarefa pode estar ligada a um projeto OU a uma tarefa pai, mas não ambos.
     # Por isso, ambos os campos podem ser nulos.
     projeto = models.ForeignKey(
@@ -50,7 +164,8 @@ class Tarefa(models.Model):
         related_name='tarefas', 
         on_delete=models.CASCADE,
         null=True,  # Permitir que este campo seja nulo
-        blank=True
+        blank=True,
+        db_index=False,  # Os índices compostos da Meta já começam pelo projeto
     )
     tarefa_pai = models.ForeignKey(
         'self',  # A mágica acontece aqui: ForeignKey para o próprio modelo
@@ -64,20 +179,257 @@ class Tarefa(models.Model):
     concluida = models.BooleanField(default=False)
     data_prazo = models.DateField(null=True, blank=True)
     data_criacao = models.DateTimeField(auto_now_add=True)
+    # Caminho materializado da árvore: IDs dos ancestros e da própria tarefa,
+    # com zeros à esquerda (ex: '0000000001/0000000005/'). Permite buscar
+    # subárvores e ancestrais com uma única consulta indexada.
+    caminho = models.TextField(blank=True, default='', db_index=True, editable=False)
+    # Indexado junto com o projeto (tarefa_projeto_seq_idx): o /api/sync/ e as
+    # notificações sempre filtram as tarefas pelos projetos
+    seq = models.BigIntegerField(default=0, editable=False)
+    # Contadores de progresso da subárvore (sem contar a própria tarefa)
+    total_descendentes = models.PositiveIntegerField(default=0, editable=False)
+    descendentes_concluidas = models.PositiveIntegerField(default=0, editable=False)
+
+    CONTADORES = ('total_descendentes', 'descendentes_concluidas')
+
+    class Meta:
+        indexes = [
+            # Índice parcial: só tarefas abertas, por projeto e prazo (ver /api/tarefas/urgentes/)
+            models.Index(
+                fields=['projeto', 'data_prazo'], condition=models.Q(concluida=False),
+                name='tarefa_abertas_prazo_idx',
+            ),
+            # Árvore de um projeto (/api/projetos/<id>/arvore/) já na ordem do caminho
+            models.Index(fields=['projeto', 'caminho'], name='tarefa_projeto_caminho_idx'),
+            # Alterações dos projetos do usuário desde um seq (/api/sync/)
+            models.Index(fields=['projeto', 'seq'], name='tarefa_projeto_seq_idx'),
+        ]
 
     def __str__(self):
         if self.tarefa_pai:
             return f"Subtarefa de '{self.tarefa_pai.descricao[:20]}...': {self.descricao[:30]}"
         return f"Tarefa de '{self.projeto.codigo_tag}': {self.descricao[:30]}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_estado()
+        return instance
+
+    def _guardar_estado(self):
+        # Estado gravado no banco, usado pelo save() para ajustar os contadores.
+        # Lido de __dict__ para não disparar consultas em campos adiados (only/defer).
+        campos = ('projeto_id', 'concluida', 'caminho')
+        self._estado_salvo = {campo: self.__dict__[campo] for campo in campos if campo in self.__dict__}
+
     def save(self, *args, **kwargs):
         """
         Garante que, ao salvar, toda subtarefa tenha uma referência
-        direta ao projeto de sua tarefa-pai.
+        direta ao projeto de sua tarefa-pai (uma nova subtarefa fica sempre
+        no projeto do pai, mesmo que outro seja informado), e mantém o caminho
+        materializado da tarefa (e de sua subárvore, se ela mudou de pai)
+        e os contadores de progresso do projeto e dos ancestrais.
         """
-        if self.tarefa_pai and not self.projeto:
-            self.projeto = self.tarefa_pai.projeto
+        if self.tarefa_pai and (self._state.adding or not self.projeto):
+            self.projeto_id = self.tarefa_pai.projeto_id
+
+        anterior = None
+        if not self._state.adding:
+            anterior = getattr(self, '_estado_salvo', None)
+            if anterior is None or len(anterior) < 3:
+                anterior = Tarefa.objects.filter(pk=self.pk).values('projeto_id', 'concluida', 'caminho').first()
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = campos_sem_contadores(self, self.CONTADORES)
 
         super().save(*args, **kwargs)
-    
 
+        if self._caminho_desatualizado():
+            self._atualizar_caminho()
+        self._atualizar_contadores(anterior)
+        self._guardar_estado()
+
+    @staticmethod
+    def ids_do_caminho(caminho):
+        return [int(segmento) for segmento in caminho.split('/')[:-1]]
+
+    @staticmethod
+    def ajustar_contadores(projeto_id, ancestrais_ids, total, concluidas):
+        """Soma os deltas aos contadores do projeto e dos ancestrais informados."""
+        if not total and not concluidas:
+            return
+        if projeto_id:
+            Projeto.objects.filter(pk=projeto_id).update(
+                total_tarefas=F('total_tarefas') + total,
+                tarefas_concluidas=F('tarefas_concluidas') + concluidas,
+            )
+        if ancestrais_ids:
+            Tarefa.objects.filter(pk__in=ancestrais_ids).update(
+                total_descendentes=F('total_descendentes') + total,
+                descendentes_concluidas=F('descendentes_concluidas') + concluidas,
+            )
+
+    def _atualizar_contadores(self, anterior):
+        ancestrais = self.ids_do_caminho(self.caminho)[:-1]
+        concluida = int(self.concluida)
+        if anterior is None:
+            self.ajustar_contadores(self.projeto_id, ancestrais, 1, concluida)
+            return
+
+        concluida_antes = int(anterior['concluida'])
+        ancestrais_antes = self.ids_do_caminho(anterior['caminho'])[:-1]
+        if ancestrais_antes == ancestrais:
+            self.ajustar_contadores(None, ancestrais, 0, concluida - concluida_antes)
+        else:
+            # Mudou de pai: a subárvore inteira sai dos ancestrais antigos e entra nos novos
+            total, concluidas = Tarefa.objects.filter(pk=self.pk).values_list(
+                'total_descendentes', 'descendentes_concluidas'
+            ).get()
+            self.ajustar_contadores(None, ancestrais_antes, -(total + 1), -(concluidas + concluida_antes))
+            self.ajustar_contadores(None, ancestrais, total + 1, concluidas + concluida)
+
+        if anterior['projeto_id'] == self.projeto_id:
+            self.ajustar_contadores(self.projeto_id, None, 0, concluida - concluida_antes)
+        else:
+            self.ajustar_contadores(anterior['projeto_id'], None, -1, -concluida_antes)
+            self.ajustar_contadores(self.projeto_id, None, 1, concluida)
+
+    def propagar_conclusao(self, seq):
+        """
+        Aplica o 'concluida' desta tarefa a todas as descendentes, mantendo os
+        contadores da subárvore, dos ancestrais e do projeto.
+        """
+        total, atuais = Tarefa.objects.filter(pk=self.pk).values_list(
+            'total_descendentes', 'descendentes_concluidas'
+        ).get()
+        novas = total if self.concluida else 0
+        self.descendentes().update(
+            concluida=self.concluida,
+            descendentes_concluidas=F('total_descendentes') if self.concluida else Value(0),
+            seq=seq,
+        )
+        delta = novas - atuais
+        if delta:
+            Tarefa.objects.filter(pk=self.pk).update(descendentes_concluidas=novas)
+            self.ajustar_contadores(self.projeto_id, self.ids_do_caminho(self.caminho)[:-1], 0, delta)
+        self.total_descendentes, self.descendentes_concluidas = total, novas
+
+    @classmethod
+    def contadores_reais(cls):
+        """Expressões que contam as descendentes de cada tarefa pelo caminho materializado."""
+        caminho = OuterRef('caminho')
+        limite = Concat(Substr(caminho, 1, Length(caminho) - 1), Value('0'))
+        descendentes = Tarefa.objects.filter(caminho__gt=caminho, caminho__lt=limite)
+        return {
+            'total_descendentes': _contagem(descendentes),
+            'descendentes_concluidas': _contagem(descendentes, concluidas=True),
+        }
+
+    @classmethod
+    def recalcular_contadores(cls, queryset=None):
+        """Reconstrói os contadores das tarefas do queryset em um único UPDATE."""
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(**cls.contadores_reais())
+
+    @staticmethod
+    def segmento(pk):
+        return f'{pk:010d}/'
+
+    @staticmethod
+    def _limite_superior(caminho):
+        # Todo caminho que começa com 'caminho' é menor que este valor ('/' + 1 == '0')
+        return caminho[:-1] + '0'
+
+    def _caminho_desatualizado(self):
+        segmentos = self.caminho.split('/')[:-1]
+        if not segmentos or int(segmentos[-1]) != self.pk:
+            return True
+        pai_atual = int(segmentos[-2]) if len(segmentos) > 1 else None
+        return pai_atual != self.tarefa_pai_id
+
+    def _atualizar_caminho(self):
+        prefixo = self.tarefa_pai.caminho if self.tarefa_pai_id else ''
+        novo = prefixo + self.segmento(self.pk)
+        antigo = self.caminho
+        if antigo:
+            # Reescreve o prefixo de toda a subárvore em um único UPDATE
+            Tarefa.objects.filter(
+                caminho__gte=antigo, caminho__lt=self._limite_superior(antigo)
+            ).update(caminho=Concat(Value(novo), Substr('caminho', len(antigo) + 1)))
+        else:
+            Tarefa.objects.filter(pk=self.pk).update(caminho=novo)
+        self.caminho = novo
+
+    @classmethod
+    def preencher_caminhos(cls, tarefas):
+        """
+        Calcula o caminho de tarefas criadas via bulk_create (que não passa
+        pelo save()). Os pais devem vir antes dos filhos na lista.
+        """
+        caminhos = {}
+        for tarefa in tarefas:
+            prefixo = ''
+            if tarefa.tarefa_pai_id:
+                prefixo = caminhos.get(tarefa.tarefa_pai_id) or tarefa.tarefa_pai.caminho
+            tarefa.caminho = prefixo + cls.segmento(tarefa.pk)
+            caminhos[tarefa.pk] = tarefa.caminho
+        cls.objects.bulk_update(tarefas, ['caminho'], batch_size=500)
+
+    def descendentes(self):
+        """Todas as tarefas abaixo desta na árvore, em uma única consulta."""
+        return Tarefa.objects.filter(
+            caminho__gt=self.caminho, caminho__lt=self._limite_superior(self.caminho)
+        )
+
+    def subarvore(self):
+        """A própria tarefa e todas as suas descendentes, em uma única consulta."""
+        return Tarefa.objects.filter(
+            caminho__gte=self.caminho, caminho__lt=self._limite_superior(self.caminho)
+        )
+
+    def ancestrais(self):
+        """Tarefas acima desta na árvore (da raiz até o pai), em uma única consulta."""
+        ids = self.ids_do_caminho(self.caminho)[:-1]
+        return Tarefa.objects.filter(id__in=ids).order_by('caminho')
+
+
+class Trabalho(models.Model):
+    """
+    Operação pesada (exclusão de um cliente, projeto ou subárvore grande,
+    conclusão em cascata) executada em lotes pelo comando processar_trabalhos,
+    fora da requisição (ver api/trabalhos.py).
+    """
+    class Tipo(models.TextChoices):
+        EXCLUIR_CLIENTE = 'excluir_cliente', 'Excluir cliente'
+        EXCLUIR_PROJETO = 'excluir_projeto', 'Excluir projeto'
+        EXCLUIR_TAREFA = 'excluir_tarefa', 'Excluir tarefa e subtarefas'
+        PROPAGAR_CONCLUSAO = 'propagar_conclusao', 'Propagar conclusão às subtarefas'
+
+    class Status(models.TextChoices):
+        PENDENTE = 'pendente', 'Pendente'
+        EXECUTANDO = 'executando', 'Executando'
+        CONCLUIDO = 'concluido', 'Concluído'
+        FALHOU = 'falhou', 'Falhou'
+
+    tipo = models.CharField(max_length=20, choices=Tipo.choices)
+    objeto_id = models.BigIntegerField()
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='trabalhos')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDENTE)
+    # Tarefas processadas até agora, de um total estimado ao enfileirar
+    processados = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    erro = models.TextField(blank=True, default='')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_inicio = models.DateTimeField(null=True, blank=True)
+    # Atualizada a cada lote: um trabalho em execução parado há muito tempo é retomado
+    data_atualizacao = models.DateTimeField(null=True, blank=True)
+    data_conclusao = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # O próximo da fila (status, id) e os presos em execução
+            models.Index(fields=['status', 'id'], name='trabalho_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.objeto_id} ({self.get_status_display()})"
@@ -0,0 +1,101 @@
+# backend/api/movimentacao.py
+
+"""
+Move uma tarefa, com a subárvore inteira, para baixo de outra tarefa ou
+para a raiz de um projeto (POST /api/tarefas/<id>/mover/ e o PATCH de
+tarefa_pai ou projeto).
+
+O número de consultas não depende do tamanho da subárvore:
+- o ciclo é verificado numa consulta, pelo caminho do novo pai, que já
+  lista todos os ancestrais dele: a tarefa não pode estar entre eles;
+- o caminho, o projeto e o seq de toda a subárvore mudam num único UPDATE,
+  pelo índice do caminho;
+- os contadores saem dos ancestrais antigos e entram nos novos pelos
+  totais da própria tarefa, como no save();
+- mudando de projeto, as exclusões para quem só vê o projeto de origem
+  (/api/sync/) são gravadas num único INSERT ... SELECT, e a subárvore é
+  reindexada na busca, que guarda o projeto de cada tarefa.
+"""
+
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Concat, Substr
+
+from . import busca, notificacoes
+from .cache_respostas import incrementar_versao
+from .models import Exclusao, Sequencia, Tarefa
+
+
+class MovimentoInvalido(Exception):
+    pass
+
+
+def _subarvore(caminho):
+    return Tarefa.objects.filter(caminho__gte=caminho, caminho__lt=Tarefa._limite_superior(caminho))
+
+
+def _registrar_saidas(caminho, projeto_id):
+    """Exclusões (/api/sync/) da subárvore no projeto de origem, com uma sequência própria."""
+    seq = Sequencia.proximo()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Exclusao._meta.db_table} (tipo, objeto_id, projeto_id, seq) '
+            f'SELECT %s, id, %s, %s FROM {Tarefa._meta.db_table} WHERE caminho >= %s AND caminho < %s',
+            [Exclusao.Tipo.TAREFA, projeto_id, seq, caminho, Tarefa._limite_superior(caminho)],
+        )
+    return Exclusao.objects.filter(seq=seq)
+
+
+def mover(tarefa, tarefa_pai=None, projeto_id=None):
+    """
+    Move a tarefa para baixo de 'tarefa_pai' ou, sem ele, para a raiz do
+    projeto 'projeto_id'. Deve rodar dentro de uma transação. Atualiza o
+    objeto 'tarefa' e retorna se algo mudou; levanta MovimentoInvalido se
+    o destino estiver na própria subárvore.
+    """
+    # O estado gravado: o objeto pode estar desatualizado
+    atual = Tarefa.objects.filter(pk=tarefa.pk).values(
+        'projeto_id', 'caminho', 'concluida', 'total_descendentes', 'descendentes_concluidas',
+    ).get()
+    caminho = atual['caminho']
+    if tarefa_pai is not None:
+        # Idem para o pai, que pode ter sido movido depois de lido
+        destino, caminho_do_pai = Tarefa.objects.filter(pk=tarefa_pai.pk).values_list('projeto_id', 'caminho').get()
+        if caminho_do_pai.startswith(caminho):
+            raise MovimentoInvalido('Uma tarefa não pode ficar abaixo dela mesma.')
+        novo_caminho = caminho_do_pai + Tarefa.segmento(tarefa.pk)
+    elif projeto_id is None:
+        raise MovimentoInvalido('Informe a tarefa pai ou o projeto.')
+    else:
+        destino, novo_caminho = projeto_id, Tarefa.segmento(tarefa.pk)
+    origem = atual['projeto_id']
+    if novo_caminho == caminho and destino == origem:
+        return False
+
+    saidas = _registrar_saidas(caminho, origem) if destino != origem else None
+    seq = Sequencia.proximo()
+    # A tarefa leva a subárvore: ela mesma e as descendentes
+    total = atual['total_descendentes'] + 1
+    concluidas = atual['descendentes_concluidas'] + atual['concluida']
+    outro_projeto = destino != origem
+    Tarefa.ajustar_contadores(origem if outro_projeto else None, Tarefa.ids_do_caminho(caminho)[:-1], -total, -concluidas)
+    _subarvore(caminho).update(
+        caminho=Concat(Value(novo_caminho), Substr('caminho', len(caminho) + 1)), projeto=destino, seq=seq,
+    )
+    Tarefa.objects.filter(pk=tarefa.pk).update(tarefa_pai=tarefa_pai)
+    Tarefa.ajustar_contadores(destino if outro_projeto else None, Tarefa.ids_do_caminho(novo_caminho)[:-1], total, concluidas)
+
+    movidas = _subarvore(novo_caminho)
+    if outro_projeto:
+        busca.indexar(movidas)
+        notificacoes.publicar_exclusoes(saidas)
+    notificacoes.publicar_alteracoes(movidas)
+    incrementar_versao('projeto', *{origem, destino})
+
+    tarefa.tarefa_pai = tarefa_pai
+    tarefa.projeto_id, tarefa.caminho, tarefa.seq = destino, novo_caminho, seq
+    tarefa.total_descendentes, tarefa.descendentes_concluidas = total - 1, concluidas - atual['concluida']
+    tarefa._guardar_estado()
+    # O 'concluida' gravado: se o objeto traz outro, o save() seguinte ajusta os contadores
+    tarefa._estado_salvo['concluida'] = atual['concluida']
+    return True
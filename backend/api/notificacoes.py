@@ -0,0 +1,248 @@
+# backend/api/notificacoes.py
+
+"""
+Notificações de alterações em tempo real (server-sent events em /api/eventos/).
+
+Os signals (api/signals.py) publicam cada Cliente, Projeto, Tarefa e
+MembroProjeto gravado e cada exclusão registrada, depois do commit, no
+difusor deste processo, que entrega a cada conexão aberta só o que o seu
+usuário pode ver (as mesmas regras do /api/sync/). Escritas em lote que não
+passam pelos signals (bulk_update, queryset.update) devem chamar
+publicar_alteracoes() por conta própria.
+
+Cada mensagem do fluxo tem o formato da resposta do /api/sync/ ('seq' e as
+listas 'clientes', 'projetos', 'tarefas', 'membros' e 'exclusoes' que
+tiverem itens), então o cliente aplica as duas com o mesmo código.
+
+O difusor é um objeto em memória: com mais de um processo servindo a API,
+cada conexão só recebe as alterações feitas no seu processo. Nesse caso é
+preciso trocá-lo por um que repasse as publicações entre processos (ex.:
+Redis pub/sub) mantendo a mesma interface.
+"""
+
+import asyncio
+import json
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Cliente, Exclusao, MembroProjeto, Projeto, Sequencia, Tarefa
+
+# Campos de cada modelo nos eventos (os mesmos do /api/sync/)
+CAMPOS = {
+    Cliente: ('clientes', ('id', 'nome', 'data_criacao', 'seq')),
+    Projeto: ('projetos', ('id', 'cliente', 'codigo_tag', 'nome_detalhado', 'data_criacao', 'data_prazo', 'seq')),
+    Tarefa: ('tarefas', ('id', 'projeto', 'tarefa_pai', 'descricao', 'concluida', 'data_prazo', 'data_criacao', 'seq')),
+    MembroProjeto: ('membros', ('id', 'projeto', 'usuario', 'papel', 'seq')),
+}
+
+# Segundos sem eventos até um comentário de keep-alive (proxies fecham
+# conexões ociosas; é também como se descobre que o cliente desconectou)
+INTERVALO_PING = 15
+
+# O cliente reconecta depois deste intervalo (ms) se a conexão cair
+RECONEXAO_MS = 5000
+
+
+class Assinatura:
+    """
+    Fila de eventos de uma conexão. Guarda os projetos que o usuário pode
+    ver, atualizados pelos próprios eventos de entrada e saída de membros.
+
+    Se o cliente não consumir os eventos (conexão lenta ou travada), a fila
+    para de crescer em LIMITE e a conexão recebe um pedido para sincronizar
+    pelo /api/sync/ no lugar dos eventos perdidos.
+    """
+    LIMITE = 1000
+
+    def __init__(self, usuario_id, projetos, loop=None):
+        self.usuario_id = usuario_id
+        self.projetos = set(projetos)
+        self._eventos = []
+        self._perdeu_eventos = False
+        self._lock = threading.Lock()
+        # Conexões assíncronas são acordadas dentro do seu event loop
+        self._loop = loop
+        self._sinal = asyncio.Event() if loop else threading.Event()
+
+    def _interessada(self, nome, item):
+        if nome == 'clientes':
+            return True
+        if nome == 'projetos':
+            return item['id'] in self.projetos
+        if nome == 'membros' and item['usuario'] == self.usuario_id:
+            # Entrou no projeto: passa a receber o que acontece nele
+            self.projetos.add(item['projeto'])
+        if nome == 'exclusoes':
+            if item['tipo'] == Exclusao.Tipo.CLIENTE:
+                return True
+            if item['tipo'] == Exclusao.Tipo.MEMBRO and item.get('usuario') == self.usuario_id:
+                self.projetos.discard(item['projeto'])
+                return True
+            visivel = item['projeto'] in self.projetos
+            if item['tipo'] == Exclusao.Tipo.PROJETO:
+                self.projetos.discard(item['projeto'])
+            return visivel
+        return item['projeto'] in self.projetos
+
+    def entregar(self, nome, itens):
+        with self._lock:
+            itens = [item for item in itens if self._interessada(nome, item)]
+            if not itens:
+                return
+            if len(self._eventos) + len(itens) > self.LIMITE:
+                self._perdeu_eventos = True
+                self._eventos = []
+            else:
+                self._eventos.extend((nome, item) for item in itens)
+        if self._loop is None:
+            self._sinal.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._sinal.set)
+            except RuntimeError:
+                # Event loop já encerrado: a conexão está sendo fechada
+                pass
+
+    def retirar(self):
+        """Retorna (eventos pendentes, se algum foi perdido) e esvazia a fila."""
+        # Limpo antes de esvaziar: uma entrega concorrente volta a acordar a conexão
+        self._sinal.clear()
+        with self._lock:
+            eventos, perdeu = self._eventos, self._perdeu_eventos
+            self._eventos, self._perdeu_eventos = [], False
+        return eventos, perdeu
+
+    def esperar(self, timeout):
+        self._sinal.wait(timeout)
+
+    async def aesperar(self, timeout):
+        try:
+            await asyncio.wait_for(self._sinal.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class Difusor:
+    """Distribui as publicações entre as assinaturas abertas neste processo."""
+
+    def __init__(self):
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        # Sem ninguém conectado, publicar não faz nada (nem consultas)
+        return bool(self._assinaturas)
+
+    def assinar(self, usuario_id, projetos, loop=None):
+        assinatura = Assinatura(usuario_id, projetos, loop)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def publicar(self, nome, itens):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            assinatura.entregar(nome, itens)
+
+
+difusor = Difusor()
+
+
+def _publicar_ao_confirmar(nome, itens):
+    # Só depois do commit: um rollback não gera eventos
+    if itens:
+        transaction.on_commit(lambda: difusor.publicar(nome, itens))
+
+
+def publicar_objeto(instance):
+    """Publica um objeto gravado (post_save)."""
+    if not difusor:
+        return
+    nome, campos = CAMPOS[type(instance)]
+    opcoes = instance._meta
+    _publicar_ao_confirmar(nome, [
+        {campo: getattr(instance, opcoes.get_field(campo).attname) for campo in campos}
+    ])
+
+
+def publicar_alteracoes(queryset):
+    """Publica os objetos do queryset, alterados sem passar pelos signals."""
+    if not difusor:
+        return
+    nome, campos = CAMPOS[queryset.model]
+    _publicar_ao_confirmar(nome, list(queryset.values(*campos)))
+
+
+def publicar_exclusoes(exclusoes):
+    """Publica registros de exclusão (Exclusao) já numerados."""
+    if not difusor:
+        return
+    itens = []
+    for exclusao in exclusoes:
+        item = {'tipo': exclusao.tipo, 'id': exclusao.objeto_id, 'projeto': exclusao.projeto_id, 'seq': exclusao.seq}
+        if exclusao.tipo == Exclusao.Tipo.MEMBRO:
+            item['usuario'] = exclusao.usuario_id
+        itens.append(item)
+    _publicar_ao_confirmar('exclusoes', itens)
+
+
+def _mensagem(evento, dados, id_=None):
+    linhas = [f'id: {id_}'] if id_ is not None else []
+    corpo = json.dumps(dados, cls=JSONEncoder, separators=(',', ':'))
+    linhas += [f'event: {evento}', f'data: {corpo}']
+    return ('\n'.join(linhas) + '\n\n').encode()
+
+
+def _mensagens_pendentes(assinatura):
+    eventos, perdeu = assinatura.retirar()
+    if perdeu:
+        # O cliente deve chamar /api/sync/?since=<última seq recebida>
+        yield _mensagem('sincronizar', {})
+    if eventos:
+        # Tudo o que chegou desde a última mensagem vai numa só
+        dados = {'seq': max(item['seq'] for _, item in eventos)}
+        for nome, item in eventos:
+            dados.setdefault(nome, []).append(item)
+        yield _mensagem('alteracoes', dados, id_=dados['seq'])
+
+
+def _inicio(seq):
+    return f'retry: {RECONEXAO_MS}\n\n'.encode() + _mensagem('conectado', {'seq': seq})
+
+
+def fluxo(usuario_id, projetos):
+    """
+    Conteúdo da resposta SSE de um usuário, sob WSGI. Cada conexão ocupa
+    uma thread do servidor enquanto estiver aberta; sob ASGI é usado o afluxo().
+    """
+    # Assina antes de ler a sequência: nada fica entre uma e outra
+    assinatura = difusor.assinar(usuario_id, projetos)
+    try:
+        yield _inicio(Sequencia.atual())
+        while True:
+            assinatura.esperar(INTERVALO_PING)
+            mensagens = list(_mensagens_pendentes(assinatura))
+            yield b''.join(mensagens) or b': ping\n\n'
+    finally:
+        difusor.cancelar(assinatura)
+
+
+async def afluxo(usuario_id, projetos):
+    """O fluxo(), sem prender uma thread: a assinatura é acordada no event loop."""
+    assinatura = difusor.assinar(usuario_id, projetos, loop=asyncio.get_running_loop())
+    try:
+        yield _inicio(await sync_to_async(Sequencia.atual)())
+        while True:
+            await assinatura.aesperar(INTERVALO_PING)
+            mensagens = list(_mensagens_pendentes(assinatura))
+            yield b''.join(mensagens) or b': ping\n\n'
+    finally:
+        difusor.cancelar(assinatura)
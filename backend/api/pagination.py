@@ -0,0 +1,110 @@
+# backend/api/pagination.py
+
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorPaginacao(CursorPagination):
+    """
+    Paginação por cursor (keyset): cada página é buscada a partir da posição
+    da última linha vista, então o custo não cresce com o número da página.
+
+    - page_size: tamanho da página (até max_page_size).
+    - ordering: um dos 'ordering_fields' do ViewSet (com o ID para desempate).
+    - paginate=false: desliga a paginação e retorna a lista completa.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('paginate', 'true').lower() == 'false':
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # Qualquer ordenação pedida (?ordering=data_criacao...) termina no ID,
+        # no mesmo sentido do primeiro campo: linhas empatadas ficam sempre
+        # na mesma ordem, sem se repetir ou sumir entre uma página e outra
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering[-1].lstrip('-') in ('id', 'pk'):
+            return ordering
+        return ordering + ('-id' if ordering[0].startswith('-') else 'id',)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Versão assíncrona do paginate_queryset (api/views_async.py). A lógica
+        do cursor continua sendo a do DRF: uma primeira passada só registra a
+        consulta final (ordenação, filtro e fatia), executada com o ORM
+        assíncrono; a segunda monta a página e os cursores com as linhas já lidas.
+        """
+        consulta = _ConsultaRegistrada(queryset)
+        if self.paginate_queryset(consulta, request, view) is None:
+            return None
+        final = consulta.registro['final']
+        linhas = [obj async for obj in final.aiterator(chunk_size=self.page_size + 1)]
+        return self.paginate_queryset(_ConsultaRegistrada(queryset, linhas), request, view)
+
+
+class CursorPaginacaoPorPrazo(CursorPaginacao):
+    """Cursor pelo prazo (e ID, para desempate), usado em /api/tarefas/urgentes/."""
+    ordering = ('data_prazo', 'id')
+
+
+class PaginacaoPorPosicao(LimitOffsetPagination):
+    """
+    Paginação por limit/offset para resultados ordenados por relevância (onde
+    não há uma coluna estável para o cursor). Não conta o total de resultados:
+    busca uma linha a mais que o limite só para saber se há próxima página.
+    """
+    default_limit = 20
+    max_limit = 100
+    template = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        pagina = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.tem_proxima = len(pagina) > self.limit
+        return pagina[:self.limit]
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class _ConsultaRegistrada:
+    """
+    Imita o queryset recebido pelo CursorPagination (order_by, filter e uma
+    fatia). Sem 'linhas', a fatia só é registrada e vem vazia; com 'linhas',
+    a fatia devolve as linhas já buscadas, sem consultar o banco.
+    """
+
+    def __init__(self, queryset, linhas=None, registro=None):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.linhas = linhas
+        self.registro = {} if registro is None else registro
+
+    def order_by(self, *campos):
+        return _ConsultaRegistrada(self.queryset.order_by(*campos), self.linhas, self.registro)
+
+    def filter(self, *args, **kwargs):
+        return _ConsultaRegistrada(self.queryset.filter(*args, **kwargs), self.linhas, self.registro)
+
+    def __getitem__(self, fatia):
+        self.registro['final'] = self.queryset[fatia]
+        return [] if self.linhas is None else self.linhas
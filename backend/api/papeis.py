@@ -0,0 +1,77 @@
+# backend/api/papeis.py
+
+from django.core.cache import cache
+
+from core.banco import leituras_no_primario
+
+from .models import MembroProjeto
+
+# Tempo máximo que um mapa de papéis fica no cache. As alterações em
+# MembroProjeto já invalidam o cache via signals; o timeout só limita o
+# estrago caso alguma escrita passe por fora deles (ex: bulk_create).
+PAPEIS_CACHE_TIMEOUT = 300
+
+
+def _chave(usuario_id):
+    return f'papeis_projeto:{usuario_id}'
+
+
+def carregar_papeis(usuario):
+    """
+    Retorna {projeto_id: papel} com os projetos dos quais o usuário é membro,
+    usando o cache do Django e consultando o banco só quando necessário.
+    """
+    if not usuario.is_authenticated:
+        return {}
+    chave = _chave(usuario.pk)
+    papeis = cache.get(chave)
+    if papeis is None:
+        # Do primário: a réplica atrasada deixaria o mapa antigo no cache
+        with leituras_no_primario():
+            papeis = dict(
+                MembroProjeto.objects.filter(usuario=usuario).values_list('projeto_id', 'papel')
+            )
+        cache.set(chave, papeis, PAPEIS_CACHE_TIMEOUT)
+    return papeis
+
+
+async def acarregar_papeis(usuario):
+    """Versão assíncrona do carregar_papeis (mesmo cache e mesma chave)."""
+    if not usuario.is_authenticated:
+        return {}
+    chave = _chave(usuario.pk)
+    papeis = await cache.aget(chave)
+    if papeis is None:
+        with leituras_no_primario():
+            papeis = {
+                projeto_id: papel async for projeto_id, papel in
+                MembroProjeto.objects.filter(usuario=usuario).values_list('projeto_id', 'papel')
+            }
+        await cache.aset(chave, papeis, PAPEIS_CACHE_TIMEOUT)
+    return papeis
+
+
+def papeis_da_requisicao(request):
+    """Mapa de papéis do usuário da requisição, carregado uma única vez por requisição."""
+    papeis = getattr(request, '_papeis_projeto', None)
+    if papeis is None:
+        papeis = carregar_papeis(request.user)
+        request._papeis_projeto = papeis
+    return papeis
+
+
+async def apapeis_da_requisicao(request):
+    """
+    Carrega o mapa de papéis da requisição de forma assíncrona. Depois dela,
+    papeis_da_requisicao(request) responde sem acessar cache nem banco.
+    """
+    papeis = getattr(request, '_papeis_projeto', None)
+    if papeis is None:
+        papeis = await acarregar_papeis(request.user)
+        request._papeis_projeto = papeis
+    return papeis
+
+
+def invalidar_papeis(*usuario_ids):
+    """Descarta o mapa de papéis em cache dos usuários informados."""
+    cache.delete_many([_chave(usuario_id) for usuario_id in usuario_ids])
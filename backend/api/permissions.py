@@ -1,5 +1,6 @@
 from rest_framework import permissions
 from .models import MembroProjeto
+from .papeis import papeis_da_requisicao
 
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
@@ -20,16 +21,15 @@ class IsProjectAdminOrReadOnly(permissions.BasePermission):
     mas apenas admins alterem ou deletem.
     """
     def has_object_permission(self, request, view, obj):
+        # Mapa {projeto_id: papel} do usuário, carregado uma vez por requisição
+        papeis = papeis_da_requisicao(request)
+
         # Permissões de leitura (GET, HEAD, OPTIONS) são permitidas para qualquer membro
         if request.method in permissions.SAFE_METHODS:
-            return obj.membros.filter(id=request.user.id).exists()
+            return obj.id in papeis
 
         # Permissões de escrita (POST, PUT, PATCH, DELETE) exigem papel de ADMIN
-        return MembroProjeto.objects.filter(
-            projeto=obj,
-            usuario=request.user,
-            papel=MembroProjeto.Papel.ADMIN
-        ).exists()
+        return papeis.get(obj.id) == MembroProjeto.Papel.ADMIN
 
 class IsProjectAdmin(permissions.BasePermission):
     """
@@ -40,10 +40,21 @@ class IsProjectAdmin(permissions.BasePermission):
         projeto_id = view.kwargs.get('projeto_pk')
         if not projeto_id:
             return False
-            
-        # Verifica se existe uma entrada de membro para este usuário, neste projeto, com o papel de ADMIN
-        return MembroProjeto.objects.filter(
-            projeto_id=projeto_id,
-            usuario=request.user,
-            papel=MembroProjeto.Papel.ADMIN
-        ).exists()
\ No newline at end of file
+        try:
+            projeto_id = int(projeto_id)
+        except ValueError:
+            return False
+
+        # Verifica no mapa de papéis se o usuário é ADMIN deste projeto
+        return papeis_da_requisicao(request).get(projeto_id) == MembroProjeto.Papel.ADMIN
+
+
+class PodeVerMetricas(permissions.BasePermission):
+    """
+    /api/metrics/: usuários staff, ou o Prometheus com o METRICAS_TOKEN
+    (api.metricas.TokenDeMetricas).
+    """
+    def has_permission(self, request, view):
+        if request.auth == 'metricas':
+            return True
+        return bool(request.user and request.user.is_staff)
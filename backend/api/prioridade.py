@@ -0,0 +1,27 @@
+# backend/api/prioridade.py
+
+from django.utils import timezone
+
+# Faixas de prazo (em dias a partir de hoje), as mesmas do frontend/src/utils/priority.js
+FAIXAS = (
+    (3, 'critico', 'Crítico ({dias}d)', 'error'),
+    (7, 'atencao', 'Atenção ({dias}d)', 'warning'),
+    (15, 'normal', 'Normal ({dias}d)', 'info'),
+    (None, 'ok', 'Prazo OK ({dias}d)', 'success'),
+)
+
+
+def classificar_prazo(data_prazo, hoje=None):
+    """
+    Classifica um prazo em atrasado / crítico (≤3d) / atenção (≤7d) /
+    normal (≤15d) / OK. Retorna None para itens sem prazo.
+    """
+    if data_prazo is None:
+        return None
+    hoje = hoje or timezone.localdate()
+    dias = (data_prazo - hoje).days
+    if dias < 0:
+        return {'nivel': 'atrasado', 'rotulo': f'Atrasado {abs(dias)}d', 'cor': 'error', 'dias': dias}
+    for limite, nivel, rotulo, cor in FAIXAS:
+        if limite is None or dias <= limite:
+            return {'nivel': nivel, 'rotulo': rotulo.format(dias=dias), 'cor': cor, 'dias': dias}
@@ -1,16 +1,29 @@
 # backend/api/serializers.py
 
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
-from .models import Cliente, Projeto, Tarefa, MembroProjeto
+from .campos import CamposSelecionaveisMixin
+from .metricas import SerializacaoMedidaMixin
+from .models import Cliente, Projeto, Tarefa, MembroProjeto, Trabalho
+from .prioridade import classificar_prazo
 from django.contrib.auth.models import User # Adicione este import
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializacaoMedidaMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'first_name', 'last_name']
 
-class MembroProjetoCreateUpdateSerializer(serializers.ModelSerializer):
+class PrazoMixin:
+    """Data de hoje para classificar_prazo, lida uma vez por serializer e não a cada objeto."""
+
+    @cached_property
+    def hoje(self):
+        return timezone.localdate()
+
+
+class MembroProjetoCreateUpdateSerializer(SerializacaoMedidaMixin, serializers.ModelSerializer):
     # Permite que o frontend envie o ID do usuário
     usuario = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
 
@@ -19,7 +32,7 @@ class MembroProjetoCreateUpdateSerializer(serializers.ModelSerializer):
         fields = ['id', 'usuario', 'papel']
 
 
-class MembroProjetoSerializer(serializers.ModelSerializer):
+class MembroProjetoSerializer(SerializacaoMedidaMixin, CamposSelecionaveisMixin, serializers.ModelSerializer):
     """Serializer para mostrar os detalhes de um membro do projeto."""
     usuario = serializers.ReadOnlyField(source='usuario.username')
     papel = serializers.CharField(source='get_papel_display')
@@ -29,40 +42,72 @@ class MembroProjetoSerializer(serializers.ModelSerializer):
         fields = ['usuario', 'papel']
 
 
-class SubtarefaSerializer(serializers.ModelSerializer):
+class SubtarefaSerializer(SerializacaoMedidaMixin, CamposSelecionaveisMixin, serializers.ModelSerializer):
     """Um serializer simplificado para mostrar subtarefas aninhadas."""
     class Meta:
         model = Tarefa
         fields = ['id', 'descricao', 'concluida', 'data_prazo']
 
 
-class TarefaSerializer(serializers.ModelSerializer):
-    """Serializer para tarefas, incluindo suas subtarefas."""
+class TarefaSerializer(SerializacaoMedidaMixin, PrazoMixin, CamposSelecionaveisMixin, serializers.ModelSerializer):
+    """Serializer para tarefas; as subtarefas só vêm com ?expand=subtarefas."""
     subtarefas = SubtarefaSerializer(many=True, read_only=True)
+    prioridade = serializers.SerializerMethodField()
+    relacoes = ('subtarefas',)
+    colunas_dos_campos = {'prioridade': ('concluida', 'data_prazo')}
 
     class Meta:
         model = Tarefa
         fields = [
             'id', 'projeto', 'tarefa_pai', 'descricao',
-            'concluida', 'data_prazo', 'data_criacao', 'subtarefas'
+            'concluida', 'data_prazo', 'data_criacao', 'subtarefas',
+            'total_descendentes', 'descendentes_concluidas', 'prioridade'
         ]
 
+    def get_prioridade(self, obj):
+        """Faixa do prazo (atrasado, crítico, atenção...); tarefas concluídas não têm."""
+        return None if obj.concluida else classificar_prazo(obj.data_prazo, self.hoje)
+
+    def validate(self, attrs):
+        # A subárvore fica inteira no projeto da raiz: com tarefa pai, o projeto é o dela
+        pai, projeto = attrs.get('tarefa_pai'), attrs.get('projeto')
+        if pai is not None and projeto is not None and pai.projeto_id != projeto.pk:
+            raise serializers.ValidationError({'tarefa_pai': 'A tarefa pai é de outro projeto.'})
+        return attrs
+
+
+class TarefaUrgenteSerializer(SerializacaoMedidaMixin, PrazoMixin, serializers.ModelSerializer):
+    """Tarefa aberta com prazo próximo ou vencido, para /api/tarefas/urgentes/."""
+    codigo_tag = serializers.ReadOnlyField(source='projeto.codigo_tag')
+    prioridade = serializers.SerializerMethodField()
 
-class ProjetoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarefa
+        fields = ['id', 'projeto', 'codigo_tag', 'tarefa_pai', 'descricao', 'data_prazo', 'prioridade']
+
+    def get_prioridade(self, obj):
+        return classificar_prazo(obj.data_prazo, self.hoje)
+
+
+class ProjetoSerializer(SerializacaoMedidaMixin, PrazoMixin, CamposSelecionaveisMixin, serializers.ModelSerializer):
     """
     Serializer para projetos.
-    Inclui listas aninhadas de tarefas e membros, e uma flag 'is_member'
-    para indicar se o usuário atual faz parte do projeto.
+    Inclui (com ?expand=) listas aninhadas de tarefas e membros, e uma flag
+    'is_member' para indicar se o usuário atual faz parte do projeto.
     """
     tarefas = serializers.SerializerMethodField()
     membros = MembroProjetoSerializer(source='adesoes', many=True, read_only=True)
     is_member = serializers.SerializerMethodField()
+    prioridade = serializers.SerializerMethodField()
+    relacoes = ('tarefas', 'membros')
+    colunas_dos_campos = {'prioridade': ('data_prazo',), 'is_member': ()}
 
     class Meta:
         model = Projeto
         fields = [
             'id', 'cliente', 'codigo_tag', 'nome_detalhado',
-            'data_criacao', 'tarefas', 'membros', 'is_member', 'data_prazo'
+            'data_criacao', 'tarefas', 'membros', 'is_member', 'data_prazo',
+            'total_tarefas', 'tarefas_concluidas', 'prioridade'
         ]
 
     def get_tarefas(self, obj):
@@ -71,11 +116,20 @@ class ProjetoSerializer(serializers.ModelSerializer):
         """
         # A linha abaixo agora pega todas as tarefas, sem filtro.
         todas_as_tarefas = obj.tarefas.all()
-        serializer = TarefaSerializer(todas_as_tarefas, many=True, context=self.context)
+        serializer = TarefaSerializer(
+            todas_as_tarefas, many=True, context=self.context, selecao=self.selecao.relacao('tarefas')
+        )
         return serializer.data
 
+    def get_prioridade(self, obj):
+        return classificar_prazo(obj.data_prazo, self.hoje)
+
     def get_is_member(self, obj):
         """Verifica se o usuário da requisição é membro deste projeto."""
+        projetos_do_usuario = self.context.get('projetos_do_usuario')
+        if projetos_do_usuario is not None:
+            # Mapa de papéis carregado uma única vez por requisição no ViewSet
+            return obj.id in projetos_do_usuario
         usuario = self.context['request'].user
         # 'obj' é a instância do Projeto que está sendo serializada
         return usuario in obj.membros.all()
@@ -83,9 +137,10 @@ class ProjetoSerializer(serializers.ModelSerializer):
 
 # backend/api/serializers.py
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(SerializacaoMedidaMixin, CamposSelecionaveisMixin, serializers.ModelSerializer):
     # Usamos um método para ter controle total sobre quais projetos são listados
     projetos = serializers.SerializerMethodField()
+    relacoes = ('projetos',)
 
     class Meta:
         model = Cliente
@@ -99,10 +154,66 @@ class ClienteSerializer(serializers.ModelSerializer):
         # Pega o usuário logado que o ViewSet nos passou pelo contexto
         usuario = self.context['request'].user
         
-        # Filtra os projetos do cliente (obj)
-        projetos_acessiveis = obj.projetos.filter(membros=usuario)
+        # Usa os projetos pré-carregados pelo ViewSet, se houver;
+        # caso contrário, filtra os projetos do cliente (obj)
+        projetos_acessiveis = getattr(obj, 'projetos_acessiveis', None)
+        if projetos_acessiveis is None:
+            projetos_acessiveis = obj.projetos.filter(membros=usuario)
         
         # Usa o ProjetoSerializer para formatar os dados corretamente
         # É importante passar o contexto adiante, para que o 'is_member' do ProjetoSerializer funcione
-        serializer = ProjetoSerializer(projetos_acessiveis, many=True, context=self.context)
-        return serializer.data
\ No newline at end of file
+        serializer = ProjetoSerializer(
+            projetos_acessiveis, many=True, context=self.context, selecao=self.selecao.relacao('projetos')
+        )
+        return serializer.data
+
+class OperacaoTarefaSerializer(serializers.Serializer):
+    """
+    Uma operação do endpoint /api/tarefas/bulk/. A validação aqui é só de
+    formato (sem consultas); a existência e o acesso às tarefas e projetos
+    referenciados são verificados de uma vez para todo o lote, no ViewSet.
+    """
+    OPERACOES = ('create', 'update', 'toggle', 'delete')
+
+    op = serializers.ChoiceField(choices=OPERACOES)
+    id = serializers.IntegerField(required=False)
+    projeto = serializers.IntegerField(required=False, allow_null=True)
+    tarefa_pai = serializers.IntegerField(required=False, allow_null=True)
+    descricao = serializers.CharField(required=False)
+    concluida = serializers.BooleanField(required=False)
+    data_prazo = serializers.DateField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if op == 'create':
+            if 'id' in attrs:
+                raise serializers.ValidationError({'id': 'Não informe o ID ao criar uma tarefa.'})
+            if not attrs.get('descricao'):
+                raise serializers.ValidationError({'descricao': 'Este campo é obrigatório.'})
+            if not attrs.get('projeto') and not attrs.get('tarefa_pai'):
+                raise serializers.ValidationError('Informe o projeto ou a tarefa pai.')
+        elif 'id' not in attrs:
+            raise serializers.ValidationError({'id': 'Este campo é obrigatório.'})
+        if op == 'toggle' and 'concluida' not in attrs:
+            raise serializers.ValidationError({'concluida': 'Este campo é obrigatório.'})
+        return attrs
+
+
+class MoverTarefaSerializer(serializers.Serializer):
+    """
+    Destino de /api/tarefas/<id>/mover/: a tarefa pai ou, sem ela, a raiz do
+    projeto (o da própria tarefa, se omitido). O acesso é verificado no ViewSet.
+    """
+    tarefa_pai = serializers.IntegerField(required=False, allow_null=True)
+    projeto = serializers.IntegerField(required=False, allow_null=True)
+
+
+class TrabalhoSerializer(serializers.ModelSerializer):
+    """Estado de um trabalho em segundo plano (api/trabalhos.py), acompanhado pelo frontend."""
+    class Meta:
+        model = Trabalho
+        fields = [
+            'id', 'tipo', 'objeto_id', 'status', 'processados', 'total', 'erro',
+            'data_criacao', 'data_inicio', 'data_conclusao',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,259 @@
+# backend/api/signals.py
+
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import busca, notificacoes
+from .autenticacao import invalidar_usuario
+from .cache_respostas import incrementar_versao, incrementar_versao_colecao
+from .models import Cliente, Exclusao, MembroProjeto, Projeto, Sequencia, Tarefa
+from .papeis import invalidar_papeis
+
+
+@receiver(post_save, sender=MembroProjeto)
+@receiver(post_delete, sender=MembroProjeto)
+def invalidar_papeis_do_membro(sender, instance, **kwargs):
+    invalidar_papeis(instance.usuario_id)
+    incrementar_versao('projeto', instance.projeto_id)
+
+
+@receiver(m2m_changed, sender=Projeto.membros.through)
+def invalidar_papeis_dos_membros(sender, instance, action, reverse, pk_set, **kwargs):
+    """projeto.membros.add()/remove()/clear() não disparam post_save/post_delete."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance é o usuário (ex: usuario.projetos_participados.add(...))
+        invalidar_papeis(instance.pk)
+        if action == 'post_add':
+            adesoes = MembroProjeto.objects.filter(usuario=instance, projeto_id__in=pk_set)
+            adesoes.update(seq=Sequencia.proximo())
+            notificacoes.publicar_alteracoes(adesoes)
+        projeto_ids = pk_set if action != 'pre_clear' else instance.projetos_participados.values_list('pk', flat=True)
+        incrementar_versao('projeto', *projeto_ids)
+    else:
+        if action == 'pre_clear':
+            invalidar_papeis(*instance.membros.values_list('pk', flat=True))
+        else:
+            invalidar_papeis(*pk_set)
+        if action == 'post_add':
+            adesoes = MembroProjeto.objects.filter(projeto=instance, usuario_id__in=pk_set)
+            adesoes.update(seq=Sequencia.proximo())
+            notificacoes.publicar_alteracoes(adesoes)
+        incrementar_versao('projeto', instance.pk)
+
+
+# Usuários em cache na autenticação (api/autenticacao.py)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_usuario_autenticado(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+    # De novo após o commit: uma requisição concorrente pode ter posto no
+    # cache a versão anterior (ainda ativa) antes dele
+    transaction.on_commit(lambda: invalidar_usuario(instance.pk))
+
+
+# Versões usadas pelo cache de respostas / ETag (api/cache_respostas.py)
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def versionar_cliente(sender, instance, created=False, **kwargs):
+    incrementar_versao('cliente', instance.pk)
+    # Listagens de todos os clientes (?all=true e dashboard)
+    incrementar_versao_colecao('clientes')
+    if kwargs['signal'] is post_save and not created:
+        # Os projetos embutem os dados do cliente nas listagens
+        incrementar_versao('projeto', *instance.projetos.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Projeto)
+@receiver(post_delete, sender=Projeto)
+def versionar_projeto(sender, instance, **kwargs):
+    incrementar_versao('projeto', instance.pk)
+
+
+@receiver(post_save, sender=Tarefa)
+@receiver(post_delete, sender=Tarefa)
+def versionar_tarefa(sender, instance, **kwargs):
+    if instance.projeto_id:
+        incrementar_versao('projeto', instance.projeto_id)
+
+
+# Sequência de alterações e exclusões usadas pelo /api/sync/
+
+@receiver(pre_save, sender=Cliente)
+@receiver(pre_save, sender=Projeto)
+@receiver(pre_save, sender=Tarefa)
+@receiver(pre_save, sender=MembroProjeto)
+def numerar_alteracao(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.seq = Sequencia.proximo()
+
+
+_lote = threading.local()
+
+
+@contextmanager
+def exclusoes_em_lote():
+    """
+    Agrupa as exclusões registradas dentro do bloco em um único bulk_create,
+    com uma única sequência (e uma única publicação), e as remoções do índice
+    de busca em um único DELETE. Use em deleções grandes (ex: queryset.delete()).
+    Dentro do bloco os contadores de progresso não são ajustados: quem chama
+    deve recalculá-los (Projeto/Tarefa.recalcular_contadores) ao final.
+    """
+    if getattr(_lote, 'exclusoes', None) is not None:
+        yield
+        return
+    _lote.exclusoes = []
+    _lote.removidos_da_busca = []
+    try:
+        yield
+        if _lote.exclusoes:
+            seq = Sequencia.proximo()
+            for exclusao in _lote.exclusoes:
+                exclusao.seq = seq
+            Exclusao.objects.bulk_create(_lote.exclusoes)
+            notificacoes.publicar_exclusoes(_lote.exclusoes)
+        busca.remover_linhas(_lote.removidos_da_busca)
+    finally:
+        _lote.exclusoes = None
+        _lote.removidos_da_busca = None
+
+
+def _em_lote():
+    return getattr(_lote, 'exclusoes', None) is not None
+
+
+def excluir_subarvores(tarefas):
+    """
+    Exclui as tarefas do queryset, que deve conter subárvores inteiras (ex:
+    filtrado pelo caminho), com um DELETE direto: sem o Collector, que faria
+    uma consulta por nível da árvore, nem os signals de cada tarefa. As
+    exclusões são registradas e publicadas e as tarefas saem da busca em lote;
+    os contadores de progresso ficam por conta de quem chama.
+    """
+    linhas = list(tarefas.values_list('pk', 'projeto_id'))
+    if not linhas:
+        return
+    seq = Sequencia.proximo()
+    exclusoes = Exclusao.objects.bulk_create([
+        Exclusao(tipo=Exclusao.Tipo.TAREFA, objeto_id=pk, projeto_id=projeto_id, seq=seq) for pk, projeto_id in linhas
+    ])
+    notificacoes.publicar_exclusoes(exclusoes)
+    busca.remover(tarefas)
+    tarefas._raw_delete(tarefas.db)
+
+
+def _modelo_de_origem(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+# Excluídos junto com estes modelos, projetos e tarefas não precisam de
+# registro individual nem de ajuste de contadores
+ORIGENS_EM_CASCATA = (Cliente, User)
+
+
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Projeto)
+@receiver(post_delete, sender=Tarefa)
+@receiver(post_delete, sender=MembroProjeto)
+def registrar_exclusao(sender, instance, origin=None, **kwargs):
+    origem = _modelo_de_origem(origin)
+    # Quem sincroniza descarta por conta própria tudo o que estava abaixo de
+    # um cliente ou projeto excluído; não é preciso registrar cada tarefa.
+    if sender is Tarefa and origem in (Projeto,) + ORIGENS_EM_CASCATA:
+        return
+    if sender is Projeto and origem in ORIGENS_EM_CASCATA:
+        return
+
+    if sender is Cliente:
+        tipo, projeto_id = Exclusao.Tipo.CLIENTE, None
+    elif sender is Projeto:
+        tipo, projeto_id = Exclusao.Tipo.PROJETO, instance.pk
+    elif sender is Tarefa:
+        tipo, projeto_id = Exclusao.Tipo.TAREFA, instance.projeto_id
+    else:
+        tipo, projeto_id = Exclusao.Tipo.MEMBRO, instance.projeto_id
+    exclusao = Exclusao(
+        tipo=tipo,
+        objeto_id=instance.pk,
+        projeto_id=projeto_id,
+        usuario_id=getattr(instance, 'usuario_id', None),
+    )
+    if _em_lote():
+        _lote.exclusoes.append(exclusao)
+    else:
+        exclusao.seq = Sequencia.proximo()
+        exclusao.save()
+        notificacoes.publicar_exclusoes([exclusao])
+
+
+@receiver(pre_delete, sender=Tarefa)
+def descontar_tarefa_excluida(sender, instance, origin=None, **kwargs):
+    """Mantém os contadores de progresso do projeto e dos ancestrais ao excluir tarefas."""
+    origem = _modelo_de_origem(origin)
+    if _em_lote() or origem in (Projeto,) + ORIGENS_EM_CASCATA:
+        return
+    ancestrais = Tarefa.ids_do_caminho(instance.caminho)[:-1]
+    if isinstance(origin, Tarefa):
+        # Exclusão de uma tarefa: a raiz desconta a subárvore inteira de uma vez
+        if instance.pk != origin.pk:
+            return
+        concluida, total, concluidas = Tarefa.objects.filter(pk=instance.pk).values_list(
+            'concluida', 'total_descendentes', 'descendentes_concluidas'
+        ).get()
+        Tarefa.ajustar_contadores(instance.projeto_id, ancestrais, -(total + 1), -(concluidas + concluida))
+    else:
+        # queryset.delete(): cada tarefa desconta apenas a si mesma
+        Tarefa.ajustar_contadores(instance.projeto_id, ancestrais, -1, -int(instance.concluida))
+
+
+# Índice de busca textual (api/busca.py)
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Projeto)
+@receiver(post_save, sender=Tarefa)
+def indexar_na_busca(sender, instance, **kwargs):
+    busca.indexar(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(pre_delete, sender=Cliente)
+@receiver(pre_delete, sender=Projeto)
+@receiver(pre_delete, sender=Tarefa)
+def remover_da_busca(sender, instance, origin=None, **kwargs):
+    origem = _modelo_de_origem(origin)
+    if sender is Tarefa:
+        if origem in (Projeto,) + ORIGENS_EM_CASCATA:
+            # Já removidas, de uma vez, pelo pre_delete do projeto
+            return
+        if isinstance(origin, Tarefa):
+            # Exclusão de uma tarefa: a raiz remove a subárvore inteira de uma vez
+            if instance.pk == origin.pk:
+                busca.remover(instance.subarvore())
+            return
+    if sender is Projeto:
+        busca.remover(Tarefa.objects.filter(projeto=instance))
+    if _em_lote():
+        _lote.removidos_da_busca.append((sender, instance.pk))
+    else:
+        busca.remover_linhas([(sender, instance.pk)])
+
+
+# Notificações em tempo real (api/notificacoes.py); as exclusões são
+# publicadas junto com o seu registro, em registrar_exclusao
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Projeto)
+@receiver(post_save, sender=Tarefa)
+@receiver(post_save, sender=MembroProjeto)
+def notificar_alteracao(sender, instance, raw=False, **kwargs):
+    if not raw:
+        notificacoes.publicar_objeto(instance)
@@ -1,3 +1,2129 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import warnings
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.core.paginator import UnorderedObjectListWarning
+from django.db import connection, connections
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.throttling import BaseThrottle
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.banco import REPLICA, LeituraNaReplicaMiddleware, RoteadorDeReplica, perfil_producao
+
+from . import busca, dados_sinteticos, metricas, notificacoes, trabalhos, transferencia, urls, views, views_async
+from .autenticacao import JWTAuthenticationComCache
+from .campos import CamposSelecionaveisMixin
+from .management.commands import benchmark_api
+from .admin import PaginadorEstimado
+from .leitura_rapida import LeituraRapidaMixin, Montador, RendererJSONRapido
+from .models import Cliente, Exclusao, Projeto, Sequencia, Tarefa, MembroProjeto, Trabalho
+from .papeis import carregar_papeis, invalidar_papeis
+from .prioridade import classificar_prazo
+
+
+# Todas as relações aninhadas de clientes (ver api/campos.py)
+GRAFO_COMPLETO = 'expand=projetos.tarefas.subtarefas,projetos.membros'
+
+
+def criar_dados(usuario, n_projetos, projetos_por_cliente=10):
+    """Cria clientes, projetos (com o usuário como membro), tarefas e subtarefas em lote."""
+    n_clientes = max(1, n_projetos // projetos_por_cliente)
+    clientes = Cliente.objects.bulk_create([
+        Cliente(nome=f'Cliente {i}', criado_por=usuario) for i in range(n_clientes)
+    ])
+    projetos = Projeto.objects.bulk_create([
+        Projeto(cliente=clientes[i % n_clientes], codigo_tag=f'PRJ-{i}') for i in range(n_projetos)
+    ])
+    MembroProjeto.objects.bulk_create([
+        MembroProjeto(projeto=p, usuario=usuario, papel=MembroProjeto.Papel.ADMIN) for p in projetos
+    ])
+    tarefas = Tarefa.objects.bulk_create([
+        Tarefa(projeto=p, descricao=f'Tarefa {p.codigo_tag}') for p in projetos
+    ])
+    subtarefas = Tarefa.objects.bulk_create([
+        Tarefa(projeto=t.projeto, tarefa_pai=t, descricao=f'Sub {t.descricao}') for t in tarefas
+    ])
+    Tarefa.preencher_caminhos(tarefas + subtarefas)
+    # bulk_create não dispara os signals que invalidam o mapa de papéis
+    invalidar_papeis(usuario.pk)
+    return clientes, projetos
+
+
+def tarefas_dos_clientes(clientes):
+    return sum(len(projeto['tarefas']) for cliente in clientes for projeto in cliente['projetos'])
+
+
+class APITestBase(TestCase):
+    """Usuário autenticado e cache limpo a cada teste."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.usuario = User.objects.create_user('ana', password='senha')
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+
+class NumeroDeConsultasTest(APITestBase):
+    """As listagens aninhadas devem usar um número fixo de consultas."""
+
+    def assertConsultasFixas(self, url, esperado, contar_tarefas):
+        # Sem paginação: a resposta traz todos os dados, não só a primeira página
+        url += '&paginate=false'
+        for n_projetos in (10, 100, 1000):
+            with self.subTest(n_projetos=n_projetos):
+                Cliente.objects.all().delete()
+                criar_dados(self.usuario, n_projetos)
+                with self.assertNumQueries(esperado):
+                    response = self.api.get(url)
+                self.assertEqual(response.status_code, 200)
+                # Cada projeto tem uma tarefa e uma subtarefa
+                self.assertEqual(contar_tarefas(response.json()), 2 * n_projetos)
+
+    def test_lista_de_clientes(self):
+        self.assertConsultasFixas(f'/api/clientes/?{GRAFO_COMPLETO}', 6, tarefas_dos_clientes)
+
+    def test_lista_de_todos_os_clientes(self):
+        self.assertConsultasFixas(f'/api/clientes/?all=true&{GRAFO_COMPLETO}', 6, tarefas_dos_clientes)
+
+    def test_lista_de_projetos(self):
+        self.assertConsultasFixas(
+            '/api/projetos/?expand=tarefas.subtarefas,membros', 5,
+            lambda projetos: sum(len(projeto['tarefas']) for projeto in projetos),
+        )
+
+    def test_lista_de_tarefas(self):
+        self.assertConsultasFixas('/api/tarefas/?expand=subtarefas', 3, len)
+
+    def test_payload_inalterado(self):
+        _, projetos = criar_dados(self.usuario, 2)
+        outro = User.objects.create_user('bia', password='senha')
+        cliente = Cliente.objects.create(nome='Alheio', criado_por=outro)
+        Projeto.objects.create(cliente=cliente, codigo_tag='ALHEIO')
+
+        response = self.api.get(f'/api/clientes/?all=true&paginate=false&{GRAFO_COMPLETO}')
+        por_nome = {c['nome']: c for c in response.json()}
+        self.assertEqual(por_nome['Alheio']['projetos'], [])
+        projeto = por_nome['Cliente 0']['projetos'][0]
+        self.assertTrue(projeto['is_member'])
+        self.assertEqual(projeto['membros'], [{'usuario': 'ana', 'papel': 'Administrador'}])
+        self.assertEqual(len(projeto['tarefas']), 2)
+        pai = next(t for t in projeto['tarefas'] if t['tarefa_pai'] is None)
+        self.assertEqual(len(pai['subtarefas']), 1)
+
+
+class ArvoreDeTarefasTest(APITestBase):
+    """Operações de subárvore pelo caminho materializado."""
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='raiz')
+        self.filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao='filha')
+        self.neta = Tarefa.objects.create(tarefa_pai=self.filha, descricao='neta')
+        self.outra = Tarefa.objects.create(projeto=self.projeto, descricao='outra')
+
+    def test_arvore_profunda(self):
+        # Mais de 1000 caracteres de caminho: o caminho inteiro é gravado e lido
+        tarefa = self.neta
+        for i in range(100):
+            tarefa = Tarefa.objects.create(tarefa_pai=tarefa, descricao=f'nível {i}')
+        caminho = Tarefa.objects.values_list('caminho', flat=True).get(pk=tarefa.pk)
+        self.assertGreater(len(caminho), 1000)
+        self.assertEqual(Tarefa.ids_do_caminho(caminho)[:3], [self.raiz.pk, self.filha.pk, self.neta.pk])
+        self.assertEqual(self.raiz.subarvore().count(), 103)
+        self.assertEqual(self.api.post(f'/api/tarefas/{self.filha.pk}/mover/', {'tarefa_pai': self.outra.pk}, format='json').status_code, 200)
+        self.assertEqual(self.outra.subarvore().count(), 103)
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+
+        self.assertEqual(self.neta.projeto, self.projeto)
+        self.assertEqual(self.neta.caminho, self.raiz.caminho + Tarefa.segmento(self.filha.pk) + Tarefa.segmento(self.neta.pk))
+
+    def test_descendentes_e_ancestrais_em_uma_consulta(self):
+        with self.assertNumQueries(1):
+            self.assertEqual({t.pk for t in self.raiz.descendentes()}, {self.filha.pk, self.neta.pk})
+        with self.assertNumQueries(1):
+            self.assertEqual([t.pk for t in self.neta.ancestrais()], [self.raiz.pk, self.filha.pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.filha.descendentes().count(), 1)
+
+    def test_mudanca_de_pai_reescreve_subarvore(self):
+        self.filha.tarefa_pai = self.outra
+        self.filha.save()
+        self.neta.refresh_from_db()
+        self.assertTrue(self.neta.caminho.startswith(self.outra.caminho))
+        self.assertEqual(list(self.raiz.descendentes()), [])
+
+    def test_conclusao_em_cascata(self):
+        response = self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'concluida': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Tarefa.objects.filter(concluida=True).count(), 3)
+        self.outra.refresh_from_db()
+        self.assertFalse(self.outra.concluida)
+
+    def test_endpoint_arvore(self):
+        api = self.api
+        url = f'/api/projetos/{self.projeto.pk}/arvore/'
+
+        arvore = api.get(url).json()
+        self.assertEqual([no['id'] for no in arvore], [self.raiz.pk, self.outra.pk])
+        filha = arvore[0]['subtarefas'][0]
+        self.assertEqual(filha['id'], self.filha.pk)
+        self.assertEqual(filha['subtarefas'][0]['id'], self.neta.pk)
+
+        arvore = api.get(url, {'depth': 0}).json()
+        self.assertEqual(arvore[0]['subtarefas'], [])
+        self.assertTrue(arvore[0]['tem_subtarefas'])
+        self.assertFalse(arvore[1]['tem_subtarefas'])
+
+        arvore = api.get(url, {'root': self.filha.pk, 'depth': 1}).json()
+        self.assertEqual(len(arvore), 1)
+        self.assertEqual(arvore[0]['subtarefas'][0]['id'], self.neta.pk)
+
+        self.assertEqual(api.get(url, {'depth': 'x'}).status_code, 400)
+        self.assertEqual(api.get(url, {'root': 0}).status_code, 404)
+
+
+class PaginacaoTest(APITestBase):
+    """Listagens paginadas por cursor, com opção explícita de desligar."""
+
+    def setUp(self):
+        super().setUp()
+        criar_dados(self.usuario, 30)
+
+    def test_percorre_todas_as_paginas(self):
+        ids = []
+        url = '/api/tarefas/?page_size=7'
+        while url:
+            pagina = self.api.get(url).json()
+            self.assertLessEqual(len(pagina['results']), 7)
+            ids.extend(t['id'] for t in pagina['results'])
+            url = pagina['next']
+        self.assertEqual(ids, sorted(Tarefa.objects.values_list('id', flat=True)))
+
+    def test_empates_desfeitos_pelo_id(self):
+        # Criados no mesmo instante: o cursor desempata pelo ID, no sentido
+        # da ordenação pedida, e nenhum item se repete ou fica de fora
+        agora = timezone.now()
+        Projeto.objects.update(data_criacao=agora)
+        Cliente.objects.update(data_criacao=agora)
+        for url, modelo, decrescente in (
+            ('/api/projetos/?page_size=4', Projeto, False),
+            ('/api/projetos/?page_size=4&ordering=-data_criacao', Projeto, True),
+            ('/api/clientes/?page_size=2&ordering=-data_criacao', Cliente, True),
+        ):
+            with self.subTest(url=url):
+                ids = []
+                while url:
+                    pagina = self.api.get(url).json()
+                    ids.extend(item['id'] for item in pagina['results'])
+                    url = pagina['next']
+                self.assertEqual(ids, sorted(modelo.objects.values_list('id', flat=True), reverse=decrescente))
+
+    def test_ordenacao_por_nome(self):
+        pagina = self.api.get('/api/clientes/', {'ordering': '-nome'}).json()
+        nomes = [c['nome'] for c in pagina['results']]
+        self.assertEqual(nomes, sorted(nomes, reverse=True))
+
+    def test_sem_paginacao(self):
+        response = self.api.get('/api/projetos/', {'paginate': 'false'})
+        self.assertEqual(len(response.json()), 30)
+        response = self.api.get('/api/users/', {'paginate': 'false'})
+        self.assertEqual([u['username'] for u in response.json()], ['ana'])
+
+
+class MapaDePapeisTest(APITestBase):
+    """Permissões lidas do mapa de papéis em cache, invalidado por signals."""
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=cliente, codigo_tag='PRJ')
+        self.membro = MembroProjeto.objects.create(
+            projeto=self.projeto, usuario=self.usuario, papel=MembroProjeto.Papel.VIEWER
+        )
+        self.url = f'/api/projetos/{self.projeto.pk}/'
+
+    def test_mapa_em_cache_entre_requisicoes(self):
+        self.api.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(carregar_papeis(self.usuario), {self.projeto.pk: 'VIEWER'})
+
+    def test_promocao_invalida_o_cache(self):
+        self.assertEqual(self.api.patch(self.url, {'nome_detalhado': 'x'}).status_code, 403)
+        self.membro.papel = MembroProjeto.Papel.ADMIN
+        self.membro.save()
+        self.assertEqual(self.api.patch(self.url, {'nome_detalhado': 'x'}).status_code, 200)
+        self.assertEqual(self.api.get(f'{self.url}membros/').status_code, 200)
+
+    def test_remocao_invalida_o_cache(self):
+        self.assertEqual(self.api.get(self.url).status_code, 200)
+        self.projeto.membros.remove(self.usuario)
+        self.assertEqual(self.api.get(self.url).status_code, 404)
+
+    def test_adicao_via_m2m_invalida_o_cache(self):
+        outro = User.objects.create_user('bia', password='senha')
+        self.api.force_authenticate(outro)
+        self.assertEqual(self.api.get(f'{self.url}membros/').status_code, 403)
+        self.projeto.membros.add(outro, through_defaults={'papel': 'ADMIN'})
+        self.assertEqual(self.api.get(f'{self.url}membros/').status_code, 200)
+
+
+class CacheDeRespostasTest(APITestBase):
+    """ETag derivado das versões de projetos/clientes e 304 sem tocar no banco."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.projetos = criar_dados(self.usuario, 3)
+        self.tarefa = Tarefa.objects.filter(projeto=self.projetos[0]).first()
+
+    def test_304_sem_consultas(self):
+        for url in ('/api/clientes/', '/api/clientes/?all=true', f'/api/projetos/{self.projetos[0].pk}/', '/api/tarefas/'):
+            with self.subTest(url=url):
+                response = self.api.get(url)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_resposta_servida_do_cache(self):
+        url = f'/api/projetos/{self.projetos[0].pk}/arvore/'
+        primeira = self.api.get(url)
+        with self.assertNumQueries(0):
+            segunda = self.api.get(url)
+        self.assertEqual(segunda.json(), primeira.json())
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+
+    def test_escritas_mudam_o_etag(self):
+        url = f'/api/projetos/{self.projetos[0].pk}/?expand=tarefas'
+        etag = self.api.get(url)['ETag']
+        outro_etag = self.api.get(f'/api/projetos/{self.projetos[1].pk}/')['ETag']
+
+        self.api.patch(f'/api/tarefas/{self.tarefa.pk}/', {'descricao': 'nova'}, format='json')
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('nova', [t['descricao'] for t in response.json()['tarefas']])
+        # Projetos não alterados continuam com o mesmo ETag
+        self.assertEqual(self.api.get(f'/api/projetos/{self.projetos[1].pk}/')['ETag'], outro_etag)
+
+        etag = self.api.get('/api/clientes/?all=true')['ETag']
+        etag_dos_meus = self.api.get('/api/clientes/')['ETag']
+        Cliente.objects.create(nome='Novo', criado_por=self.usuario)
+        self.assertNotEqual(self.api.get('/api/clientes/?all=true')['ETag'], etag)
+        # Um cliente sem projetos do usuário não muda a listagem dele
+        self.assertEqual(self.api.get('/api/clientes/')['ETag'], etag_dos_meus)
+        cliente = self.projetos[0].cliente
+        cliente.nome = 'Renomeado'
+        cliente.save()
+        self.assertIn('Renomeado', [c['nome'] for c in self.api.get('/api/clientes/').json()['results']])
+
+    def test_leitura_antes_do_commit(self):
+        url = f'/api/projetos/{self.projetos[0].pk}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projetos[0].nome_detalhado = 'Alterado'
+            self.projetos[0].save()
+            # Uma leitura concorrente, antes do commit, guarda no cache a versão nova
+            durante = self.api.get(url)['ETag']
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=durante)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], durante)
+
+    def test_etag_por_usuario(self):
+        url = '/api/clientes/?all=true&expand=projetos'
+        etag = self.api.get(url)['ETag']
+        outro = User.objects.create_user('bia', password='senha')
+        self.api.force_authenticate(outro)
+        response = self.api.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(c['projetos'] == [] for c in response.json()['results']))
+
+
+class CamposSelecionaveisTest(APITestBase):
+    """?fields= e ?expand=: relações aninhadas só quando pedidas, com consultas e colunas correspondentes."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.projetos = criar_dados(self.usuario, 3)
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [consulta['sql'] for consulta in contexto.captured_queries]
+
+    def test_relacoes_omitidas_por_padrao(self):
+        dados, sqls = self.consultas('/api/clientes/')
+        self.assertNotIn('projetos', dados['results'][0])
+        self.assertFalse([sql for sql in sqls if 'api_tarefa' in sql])
+        projeto, _ = self.consultas(f'/api/projetos/{self.projetos[0].pk}/')
+        self.assertNotIn('tarefas', projeto)
+        self.assertNotIn('membros', projeto)
+        self.assertIn('is_member', projeto)
+        tarefas, _ = self.consultas('/api/tarefas/')
+        self.assertNotIn('subtarefas', tarefas['results'][0])
+
+    def test_campos_e_colunas(self):
+        dados, sqls = self.consultas('/api/clientes/?fields=id,nome')
+        self.assertEqual(set(dados['results'][0]), {'id', 'nome'})
+        self.assertNotIn('data_criacao', sqls[-1])
+
+        dados, sqls = self.consultas('/api/clientes/?fields=nome,projetos.codigo_tag')
+        self.assertEqual(dados['results'][0], {'nome': 'Cliente 0', 'projetos': [
+            {'codigo_tag': projeto.codigo_tag} for projeto in self.projetos
+        ]})
+        self.assertNotIn('nome_detalhado', sqls[-1])
+
+        dados, _ = self.consultas('/api/projetos/?fields=id&expand=tarefas.subtarefas')
+        tarefa = next(t for t in dados['results'][0]['tarefas'] if t['tarefa_pai'] is None)
+        self.assertEqual(set(dados['results'][0]), {'id', 'tarefas'})
+        self.assertEqual(len(tarefa['subtarefas']), 1)
+        self.assertIn('prioridade', tarefa)
+
+    def test_escrita_respeita_a_selecao(self):
+        url = f'/api/projetos/{self.projetos[0].pk}/?fields=id,nome_detalhado'
+        response = self.api.patch(url, {'nome_detalhado': 'Novo', 'data_prazo': '2030-01-01'}, format='json')
+        self.assertEqual(response.json(), {'id': self.projetos[0].pk, 'nome_detalhado': 'Novo'})
+        self.projetos[0].refresh_from_db()
+        self.assertEqual(str(self.projetos[0].data_prazo), '2030-01-01')
+
+        response = self.api.post('/api/clientes/?expand=projetos', {'nome': 'Novo'}, format='json')
+        self.assertEqual(response.json()['projetos'], [])
+
+    def test_nomes_desconhecidos(self):
+        response = self.api.get('/api/clientes/?fields=id,projetos.xyz')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Campo desconhecido: projetos.xyz.']})
+        response = self.api.get('/api/tarefas/?expand=projetos')
+        self.assertEqual(response.json(), {'expand': ['Relação desconhecida: projetos.']})
+
+
+class LeituraRapidaTest(APITestBase):
+    """O list e o retrieve por values() + orjson devem gerar os mesmos bytes dos serializers."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.projetos = criar_dados(self.usuario, 3)
+        hoje = timezone.localdate()
+        # Prazos em várias faixas, concluídas, acentos e os separadores que o JSONRenderer escapa
+        Tarefa.objects.filter(tarefa_pai__isnull=True).update(data_prazo=hoje + timedelta(days=2))
+        Tarefa.objects.filter(tarefa_pai__isnull=False).update(concluida=True, data_prazo=hoje - timedelta(days=1))
+        tarefa = Tarefa.objects.filter(tarefa_pai__isnull=True).first()
+        tarefa.descricao = 'Revisão\u2028do contrato "final"'
+        tarefa.save()
+        Projeto.objects.filter(pk=self.projetos[0].pk).update(nome_detalhado='Implantação', data_prazo=hoje)
+        outro = User.objects.create_user('bia', password='senha')
+        MembroProjeto.objects.create(projeto=self.projetos[0], usuario=outro, papel=MembroProjeto.Papel.VIEWER)
+
+    def comparar(self, url):
+        caches['respostas'].clear()
+        # No caminho rápido nenhum serializer monta a resposta
+        with mock.patch.object(CamposSelecionaveisMixin, 'to_representation', side_effect=AssertionError):
+            rapida = self.api.get(url)
+        caches['respostas'].clear()
+        with mock.patch.object(LeituraRapidaMixin, 'leitura_rapida', False):
+            serializers = self.api.get(url)
+        self.assertEqual(rapida.status_code, serializers.status_code, url)
+        self.assertEqual(rapida.content, serializers.content, url)
+        return rapida
+
+    def test_mesmos_bytes_dos_serializers(self):
+        pk = self.projetos[0].pk
+        urls = [
+            '/api/tarefas/', '/api/tarefas/?paginate=false', '/api/tarefas/?page_size=2&ordering=-data_criacao',
+            '/api/tarefas/?expand=subtarefas', '/api/tarefas/?fields=id,prioridade,subtarefas.concluida',
+            f'/api/tarefas/{Tarefa.objects.first().pk}/?expand=subtarefas',
+            '/api/projetos/', f'/api/projetos/?{GRAFO_COMPLETO.replace("projetos.", "")}',
+            '/api/projetos/?fields=codigo_tag,is_member,tarefas.descricao,membros.papel',
+            f'/api/projetos/{pk}/', f'/api/projetos/{pk}/?expand=tarefas.subtarefas,membros',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.comparar(url).status_code, 200)
+        proxima = self.comparar('/api/tarefas/?page_size=2').json()['next']
+        self.comparar(proxima)
+        self.assertIn(b'\\u2028', self.comparar('/api/tarefas/?paginate=false').content)
+        with timezone.override('America/Sao_Paulo'):
+            self.assertIn(b'-03:00', self.comparar('/api/tarefas/').content)
+
+    def test_relacoes_em_ordem_de_id(self):
+        # Gravadas fora da ordem de pk: pelo índice do caminho, as filhas viriam depois da raiz,
+        # e pelo de (projeto, usuario), o membro novo viria por último
+        projeto = self.projetos[0]
+        raiz = Tarefa.objects.create(pk=9000, projeto=projeto, descricao='Raiz tardia')
+        Tarefa.objects.create(pk=8000, tarefa_pai=raiz, descricao='Filha')
+        Tarefa.objects.create(pk=7000, tarefa_pai=raiz, descricao='Outra filha')
+        MembroProjeto.objects.filter(projeto=projeto).update(id=F('id') + 100)
+        MembroProjeto.objects.create(pk=1, projeto=projeto, usuario=User.objects.create_user('caio'))
+
+        dados = self.comparar(f'/api/projetos/{projeto.pk}/?expand=tarefas.subtarefas,membros').json()
+        ids = [tarefa['id'] for tarefa in dados['tarefas']]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(
+            [membro['usuario'] for membro in dados['membros']],
+            list(projeto.adesoes.order_by('id').values_list('usuario__username', flat=True)),
+        )
+        self.assertEqual(dados['membros'][0]['usuario'], 'caio')
+        subtarefas = self.comparar(f'/api/tarefas/{raiz.pk}/?expand=subtarefas').json()['subtarefas']
+        self.assertEqual([tarefa['id'] for tarefa in subtarefas], [7000, 8000])
+
+    def test_erros_e_permissoes(self):
+        cliente = Cliente.objects.create(nome='Alheio', criado_por=self.usuario)
+        alheio = Projeto.objects.create(cliente=cliente, codigo_tag='ALHEIO')
+        for url in (f'/api/projetos/{alheio.pk}/', '/api/projetos/abc/', '/api/tarefas/?fields=xyz'):
+            with self.subTest(url=url):
+                self.assertIn(self.comparar(url).status_code, (400, 404))
+
+    def test_api_navegavel_usa_os_serializers(self):
+        with mock.patch.object(Montador, 'montar') as montar:
+            response = self.api.get('/api/tarefas/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        montar.assert_not_called()
+
+    def test_renderer(self):
+        dados = {
+            'texto': 'ação\u2028\u2029', 1: [None, True, 1.5], 'lazy': gettext_lazy('Not found.'),
+            'erro': ErrorDetail('inválido', code='invalid'), 'data': timezone.localdate(),
+            'momento': timezone.now(), 'exato': timezone.now().replace(microsecond=0), 'grande': 2 ** 70,
+        }
+        for media_type in (None, 'application/json; indent=4'):
+            with self.subTest(media_type=media_type):
+                self.assertEqual(
+                    RendererJSONRapido().render(dados, media_type), JSONRenderer().render(dados, media_type)
+                )
+
+
+class LoteDeTarefasTest(APITestBase):
+    """POST /api/tarefas/bulk/ valida e aplica o lote inteiro de uma vez."""
+
+    url = '/api/tarefas/bulk/'
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='raiz')
+        self.filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao='filha')
+        self.neta = Tarefa.objects.create(tarefa_pai=self.filha, descricao='neta')
+        self.avulsa = Tarefa.objects.create(projeto=self.projeto, descricao='avulsa')
+
+    def enviar(self, operacoes):
+        return self.api.post(self.url, {'operacoes': operacoes}, format='json')
+
+    def test_operacoes_mistas(self):
+        response = self.enviar([
+            {'op': 'create', 'tarefa_pai': self.raiz.pk, 'descricao': 'nova'},
+            {'op': 'update', 'id': self.avulsa.pk, 'descricao': 'renomeada'},
+            {'op': 'toggle', 'id': self.raiz.pk, 'concluida': True},
+            {'op': 'toggle', 'id': self.neta.pk, 'concluida': False},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        nova = Tarefa.objects.get(pk=response.json()['resultados'][0]['id'])
+        self.assertEqual(nova.projeto, self.projeto)
+        self.assertTrue(nova.caminho.startswith(self.raiz.caminho))
+        self.assertEqual(Tarefa.objects.get(pk=self.avulsa.pk).descricao, 'renomeada')
+        # A cascata do pai vale para a filha, mas a neta alterada no lote prevalece
+        self.assertTrue(Tarefa.objects.get(pk=self.filha.pk).concluida)
+        self.assertFalse(Tarefa.objects.get(pk=self.neta.pk).concluida)
+
+    def test_remocao_e_mudanca_de_pai(self):
+        response = self.enviar([
+            {'op': 'update', 'id': self.neta.pk, 'tarefa_pai': self.raiz.pk},
+            {'op': 'delete', 'id': self.avulsa.pk},
+        ])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse(Tarefa.objects.filter(pk=self.avulsa.pk).exists())
+        self.assertEqual(Tarefa.objects.get(pk=self.neta.pk).caminho, self.raiz.caminho + Tarefa.segmento(self.neta.pk))
+
+        # Tarefas dentro de uma subárvore removida no mesmo lote são rejeitadas
+        response = self.enviar([
+            {'op': 'update', 'id': self.neta.pk, 'descricao': 'x'},
+            {'op': 'delete', 'id': self.raiz.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+
+    def test_lote_invalido_nao_aplica_nada(self):
+        outro = Projeto.objects.create(cliente=self.projeto.cliente, codigo_tag='ALHEIO')
+        response = self.enviar([
+            {'op': 'update', 'id': self.avulsa.pk, 'descricao': 'renomeada'},
+            {'op': 'create', 'projeto': outro.pk, 'descricao': 'x'},
+            {'op': 'update', 'id': self.filha.pk, 'descricao': 'x'},
+            {'op': 'delete', 'id': self.raiz.pk},
+            {'op': 'update', 'id': self.raiz.pk, 'tarefa_pai': self.neta.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+        erros = response.json()['operacoes']
+        self.assertEqual(erros[0], {})
+        self.assertIn('projeto', erros[1])
+        self.assertIn('id', erros[2])
+        self.assertIn('tarefa_pai', erros[4])
+        self.assertEqual(Tarefa.objects.get(pk=self.avulsa.pk).descricao, 'avulsa')
+
+        response = self.enviar([{'op': 'toggle', 'id': self.avulsa.pk}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_numero_de_consultas_quase_constante(self):
+        contagens = []
+        for n in (10, 1000):
+            tarefas = Tarefa.objects.bulk_create([Tarefa(projeto=self.projeto, descricao=str(i)) for i in range(n)])
+            Tarefa.preencher_caminhos(tarefas)
+            operacoes = []
+            for i, tarefa in enumerate(tarefas):
+                if i % 4 == 0:
+                    operacoes.append({'op': 'create', 'tarefa_pai': tarefa.pk, 'descricao': 'sub'})
+                elif i % 4 == 1:
+                    operacoes.append({'op': 'update', 'id': tarefa.pk, 'descricao': 'x'})
+                elif i % 4 == 2:
+                    operacoes.append({'op': 'toggle', 'id': tarefa.pk, 'concluida': True})
+                else:
+                    operacoes.append({'op': 'delete', 'id': tarefa.pk})
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.enviar(operacoes).status_code, 200)
+            contagens.append(len(consultas))
+        self.assertLessEqual(contagens[1], 35, contagens)
+
+    def test_remocao_de_arvore_profunda(self):
+        contagens = []
+        # A primeira requisição carrega o mapa de papéis
+        for profundidade in (1, 3, 30):
+            topo = pai = Tarefa.objects.create(projeto=self.projeto, descricao='topo')
+            for i in range(profundidade):
+                pai = Tarefa.objects.create(tarefa_pai=pai, descricao=str(i))
+            exclusoes = Exclusao.objects.count()
+            with CaptureQueriesContext(connection) as consultas:
+                self.assertEqual(self.enviar([{'op': 'delete', 'id': topo.pk}]).status_code, 200)
+            contagens.append(len(consultas))
+            self.assertFalse(Tarefa.objects.filter(caminho__startswith=topo.caminho).exists())
+            self.assertEqual(Exclusao.objects.count() - exclusoes, profundidade + 1)
+        # Sem a cascata do Collector, que faria uma consulta por nível
+        self.assertEqual(contagens[1], contagens[2])
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def test_subarvore_concluida_entre_projetos(self):
+        outro = Projeto.objects.create(cliente=self.projeto.cliente, codigo_tag='OUTRO')
+        outro.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        destino = Tarefa.objects.create(projeto=outro, descricao='destino')
+        self.api.patch(f'/api/tarefas/{self.filha.pk}/', {'concluida': True}, format='json')
+
+        def contadores():
+            return {p.codigo_tag: (p.total_tarefas, p.tarefas_concluidas) for p in Projeto.objects.all()}
+
+        # Sem a recontagem do fim do lote: os contadores vêm só do mover() e do save()
+        with mock.patch.object(Projeto, 'recalcular_contadores'), mock.patch.object(Tarefa, 'recalcular_contadores'):
+            response = self.enviar([{'op': 'update', 'id': self.neta.pk, 'tarefa_pai': destino.pk, 'concluida': False}])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(contadores(), {'PRJ': (3, 1), 'OUTRO': (2, 0)})
+
+        self.assertEqual(self.enviar([{'op': 'update', 'id': self.filha.pk, 'tarefa_pai': destino.pk}]).status_code, 200)
+        self.assertEqual(contadores(), {'PRJ': (2, 0), 'OUTRO': (3, 1)})
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+
+class SincronizacaoTest(APITestBase):
+    """GET /api/sync/ devolve só o que mudou depois de 'since', com exclusões."""
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.tarefa = Tarefa.objects.create(projeto=self.projeto, descricao='tarefa')
+        alheio = Projeto.objects.create(cliente=self.cliente, codigo_tag='ALHEIO')
+        Tarefa.objects.create(projeto=alheio, descricao='invisível')
+
+    def sincronizar(self, since):
+        response = self.api.get('/api/sync/', {'since': since})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_sincronizacao_completa_e_incremental(self):
+        tudo = self.sincronizar(0)
+        self.assertEqual([p['id'] for p in tudo['projetos']], [self.projeto.pk])
+        self.assertEqual([t['descricao'] for t in tudo['tarefas']], ['tarefa'])
+        self.assertEqual(len(tudo['membros']), 1)
+
+        vazio = self.sincronizar(tudo['seq'])
+        self.assertEqual(vazio['tarefas'] + vazio['projetos'] + vazio['exclusoes'], [])
+
+        self.api.patch(f'/api/tarefas/{self.tarefa.pk}/', {'concluida': True}, format='json')
+        nova = Tarefa.objects.create(tarefa_pai=self.tarefa, descricao='nova')
+        delta = self.sincronizar(tudo['seq'])
+        self.assertEqual([t['id'] for t in delta['tarefas']], [self.tarefa.pk, nova.pk])
+        self.assertEqual(delta['projetos'], [])
+
+        nova_id = nova.pk
+        nova.delete()
+        delta = self.sincronizar(delta['seq'])
+        self.assertEqual(delta['tarefas'], [])
+        self.assertEqual(delta['exclusoes'], [
+            {'tipo': 'tarefa', 'id': nova_id, 'projeto': self.projeto.pk, 'seq': delta['seq']}
+        ])
+
+    def test_cascata_e_lote_numerados(self):
+        filha = Tarefa.objects.create(tarefa_pai=self.tarefa, descricao='filha')
+        seq = self.sincronizar(0)['seq']
+        self.api.patch(f'/api/tarefas/{self.tarefa.pk}/', {'concluida': True}, format='json')
+        self.assertEqual({t['id'] for t in self.sincronizar(seq)['tarefas']}, {self.tarefa.pk, filha.pk})
+
+        seq = self.sincronizar(0)['seq']
+        self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'create', 'projeto': self.projeto.pk, 'descricao': 'lote'},
+            {'op': 'delete', 'id': self.tarefa.pk},
+        ]}, format='json')
+        delta = self.sincronizar(seq)
+        self.assertEqual([t['descricao'] for t in delta['tarefas']], ['lote'])
+        self.assertEqual({e['id'] for e in delta['exclusoes']}, {self.tarefa.pk, filha.pk})
+
+    def test_projeto_excluido_ou_acesso_perdido(self):
+        seq = self.sincronizar(0)['seq']
+        projeto_id = self.projeto.pk
+        self.projeto.delete()
+        exclusoes = self.sincronizar(seq)['exclusoes']
+        # Apenas o projeto e a adesão do usuário; as tarefas vão junto com o projeto
+        self.assertEqual({(e['tipo'], e['projeto']) for e in exclusoes}, {
+            ('projeto', projeto_id), ('membro', projeto_id),
+        })
+
+        outro = User.objects.create_user('bia', password='senha')
+        self.api.force_authenticate(outro)
+        self.assertEqual(self.sincronizar(seq)['exclusoes'], [])
+
+
+class ContadoresDeProgressoTest(APITestBase):
+    """Contadores de Projeto e Tarefa mantidos a cada escrita e conferidos pelo comando."""
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='raiz')
+        self.filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao='filha')
+        self.neta = Tarefa.objects.create(tarefa_pai=self.filha, descricao='neta', concluida=True)
+        self.avulsa = Tarefa.objects.create(projeto=self.projeto, descricao='avulsa')
+
+    def assertContadores(self, projeto, **tarefas):
+        self.projeto.refresh_from_db()
+        self.assertEqual((self.projeto.total_tarefas, self.projeto.tarefas_concluidas), projeto)
+        for nome, esperado in tarefas.items():
+            tarefa = Tarefa.objects.get(pk=getattr(self, nome).pk)
+            self.assertEqual((tarefa.total_descendentes, tarefa.descendentes_concluidas), esperado, nome)
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def test_criacao_e_conclusao(self):
+        self.assertContadores((4, 1), raiz=(2, 1), filha=(1, 1))
+        self.api.patch(f'/api/tarefas/{self.filha.pk}/', {'concluida': True}, format='json')
+        self.assertContadores((4, 2), raiz=(2, 2), filha=(1, 1))
+        self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'concluida': False}, format='json')
+        self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'concluida': True}, format='json')
+        self.assertContadores((4, 3), raiz=(2, 2), filha=(1, 1))
+        self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'concluida': False}, format='json')
+        self.assertContadores((4, 0), raiz=(2, 0), filha=(1, 0))
+
+    def test_mudanca_de_pai_e_exclusao(self):
+        self.filha.tarefa_pai = self.avulsa
+        self.filha.save()
+        self.assertContadores((4, 1), raiz=(0, 0), avulsa=(2, 1))
+        self.api.delete(f'/api/tarefas/{self.filha.pk}/')
+        self.assertContadores((2, 0), raiz=(0, 0), avulsa=(0, 0))
+        Tarefa.objects.filter(pk=self.avulsa.pk).delete()
+        self.assertContadores((1, 0))
+
+    def test_lote(self):
+        response = self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'create', 'tarefa_pai': self.avulsa.pk, 'descricao': 'nova', 'concluida': True},
+            {'op': 'toggle', 'id': self.avulsa.pk, 'concluida': True},
+            {'op': 'delete', 'id': self.filha.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertContadores((3, 2), raiz=(0, 0), avulsa=(1, 1))
+
+    def test_comando_reconstroi(self):
+        Tarefa.objects.update(total_descendentes=0, descendentes_concluidas=0)
+        Projeto.objects.update(total_tarefas=0)
+        with self.assertRaises(CommandError):
+            call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+        call_command('recalcular_contadores', stdout=StringIO())
+        self.assertContadores((4, 1), raiz=(2, 1), filha=(1, 1))
+
+    def test_listagem_com_progresso(self):
+        projeto = self.api.get('/api/projetos/?paginate=false').json()[0]
+        self.assertEqual((projeto['total_tarefas'], projeto['tarefas_concluidas']), (4, 1))
+
+
+class TarefasUrgentesTest(APITestBase):
+    """Classificação de prazos no servidor e /api/tarefas/urgentes/."""
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        hoje = timezone.localdate()
+        self.prazos = {}
+        for nome, dias in [('atrasada', -2), ('hoje', 0), ('semana', 6), ('mes', 30), ('sem_prazo', None)]:
+            prazo = hoje + timedelta(days=dias) if dias is not None else None
+            self.prazos[nome] = Tarefa.objects.create(projeto=self.projeto, descricao=nome, data_prazo=prazo)
+        Tarefa.objects.create(projeto=self.projeto, descricao='feita', concluida=True, data_prazo=hoje)
+        alheio = Projeto.objects.create(cliente=cliente, codigo_tag='ALHEIO')
+        Tarefa.objects.create(projeto=alheio, descricao='alheia', data_prazo=hoje)
+
+    def test_classificacao(self):
+        hoje = timezone.localdate()
+        niveis = [classificar_prazo(hoje + timedelta(days=d))['nivel'] for d in (-1, 0, 3, 4, 7, 8, 15, 16)]
+        self.assertEqual(niveis, ['atrasado', 'critico', 'critico', 'atencao', 'atencao', 'normal', 'normal', 'ok'])
+        self.assertEqual(classificar_prazo(hoje - timedelta(days=2))['rotulo'], 'Atrasado 2d')
+        self.assertIsNone(classificar_prazo(None))
+
+    def test_urgentes(self):
+        pagina = self.api.get('/api/tarefas/urgentes/').json()
+        self.assertEqual([t['descricao'] for t in pagina['results']], ['atrasada', 'hoje', 'semana'])
+        self.assertEqual(pagina['results'][0]['prioridade']['nivel'], 'atrasado')
+        self.assertEqual(pagina['results'][0]['codigo_tag'], 'PRJ')
+
+        pagina = self.api.get('/api/tarefas/urgentes/', {'dias': 60, 'page_size': 2}).json()
+        self.assertEqual([t['descricao'] for t in pagina['results']], ['atrasada', 'hoje'])
+        pagina = self.api.get(pagina['next']).json()
+        self.assertEqual([t['descricao'] for t in pagina['results']], ['semana', 'mes'])
+
+    def test_prioridade_nos_serializers(self):
+        tarefa = self.api.get(f'/api/tarefas/{self.prazos["atrasada"].pk}/').json()
+        self.assertEqual(tarefa['prioridade']['cor'], 'error')
+        self.assertIsNone(self.api.get(f'/api/tarefas/{self.prazos["sem_prazo"].pk}/').json()['prioridade'])
+
+
+class BuscaTest(APITestBase):
+    """GET /api/busca/ e o índice FTS5 mantido pelas escritas."""
+
+    url = '/api/busca/'
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Padaria Estrela', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(
+            cliente=cliente, codigo_tag='SITE', nome_detalhado='Relatórios do site novo'
+        )
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='Relatório mensal de vendas')
+        self.filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao='Revisar relatório')
+        self.outra = Tarefa.objects.create(projeto=self.projeto, descricao='Publicar o site')
+        alheio = Cliente.objects.create(nome='Relatórios Alheios', criado_por=self.usuario)
+        projeto_alheio = Projeto.objects.create(cliente=alheio, codigo_tag='ALHEIO')
+        Tarefa.objects.create(projeto=projeto_alheio, descricao='Relatório secreto')
+
+    def buscar(self, q, **params):
+        response = self.api.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def encontrados(self, q, **params):
+        return [(r['tipo'], r['id']) for r in self.buscar(q, **params)['results']]
+
+    def assertIndiceConsistente(self):
+        def linhas():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid, titulo, detalhe, projeto_id FROM {busca.TABELA} ORDER BY rowid')
+                return cursor.fetchall()
+        atual = linhas()
+        call_command('reindexar_busca', stdout=StringIO())
+        self.assertEqual(atual, linhas())
+
+    def test_prefixo_acentos_e_acesso(self):
+        self.assertEqual(
+            set(self.encontrados('relat')),
+            {('tarefa', self.raiz.pk), ('tarefa', self.filha.pk), ('projeto', self.projeto.pk)},
+        )
+        self.assertEqual(self.encontrados('RELATORIO mensal'), [('tarefa', self.raiz.pk)])
+        self.assertEqual(self.encontrados('padaria'), [('cliente', self.projeto.cliente_id)])
+        self.assertEqual(self.encontrados('site', tipo='tarefa'), [('tarefa', self.outra.pk)])
+        # Operadores do FTS5 são tratados como palavras comuns
+        self.assertEqual(self.encontrados('site OR NOT "vendas'), [])
+        self.assertIndiceConsistente()
+
+    def test_paginacao(self):
+        todos = self.encontrados('relat')
+        pagina = self.buscar('relat', limit=2)
+        self.assertIsNone(pagina['previous'])
+        proxima = self.api.get(pagina['next']).json()
+        self.assertIsNone(proxima['next'])
+        self.assertEqual([(r['tipo'], r['id']) for r in pagina['results'] + proxima['results']], todos)
+        self.assertEqual(len(todos), 3)
+
+    def test_indice_acompanha_escritas(self):
+        self.api.patch(f'/api/tarefas/{self.outra.pk}/', {'descricao': 'Lançar campanha'}, format='json')
+        self.assertEqual(self.encontrados('publicar'), [])
+        self.assertEqual(self.encontrados('lancar'), [('tarefa', self.outra.pk)])
+
+        response = self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'create', 'projeto': self.projeto.pk, 'descricao': 'Orçamento anual'},
+            {'op': 'update', 'id': self.outra.pk, 'descricao': 'Campanha de inverno'},
+            {'op': 'delete', 'id': self.raiz.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        nova = response.json()['resultados'][0]['id']
+        self.assertEqual(self.encontrados('orcamento'), [('tarefa', nova)])
+        self.assertEqual(self.encontrados('inverno'), [('tarefa', self.outra.pk)])
+        self.assertEqual(self.encontrados('relat', tipo='tarefa'), [])
+        self.assertIndiceConsistente()
+
+        self.api.delete(f'/api/projetos/{self.projeto.pk}/')
+        self.assertEqual(self.encontrados('campanha'), [])
+        self.assertIndiceConsistente()
+
+    def test_validacao(self):
+        self.assertEqual(self.api.get(self.url).status_code, 400)
+        self.assertEqual(self.api.get(self.url, {'q': 'site', 'tipo': 'usuario'}).status_code, 400)
+        self.assertEqual(self.buscar('!!!')['results'], [])
+
+
+class PerfilDoBancoTest(TestCase):
+    """Perfil de produção do SQLite e roteamento das leituras para a réplica (core/banco.py)."""
+
+    def test_perfil_de_producao(self):
+        bancos = perfil_producao('/tmp/primario.sqlite3', replica='/tmp/replica.sqlite3')
+        primario, replica = bancos['default'], bancos[REPLICA]
+        self.assertIn('PRAGMA journal_mode = WAL;', primario['OPTIONS']['init_command'])
+        self.assertEqual(primario['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertGreater(primario['CONN_MAX_AGE'], 0)
+        self.assertIn('PRAGMA query_only = ON;', replica['OPTIONS']['init_command'])
+        self.assertNotIn('journal_mode', replica['OPTIONS']['init_command'])
+        self.assertEqual(list(perfil_producao('/tmp/primario.sqlite3')), ['default'])
+
+    def test_leituras_de_get_vao_para_a_replica(self):
+        roteador = RoteadorDeReplica()
+        bancos = {}
+
+        def view(request):
+            bancos[request.method] = roteador.db_for_read(Tarefa)
+            return HttpResponse()
+
+        middleware = LeituraNaReplicaMiddleware(view)
+        with mock.patch.dict(settings.DATABASES, {REPLICA: {}}):
+            for metodo in ('GET', 'HEAD', 'POST', 'PATCH'):
+                middleware(RequestFactory().generic(metodo, '/api/tarefas/'))
+            # Fora de uma requisição (comandos, signals de startup...)
+            self.assertEqual(roteador.db_for_read(Tarefa), 'default')
+        self.assertEqual(bancos, {'GET': REPLICA, 'HEAD': REPLICA, 'POST': 'default', 'PATCH': 'default'})
+
+        # Sem réplica configurada, tudo fica no primário
+        middleware(RequestFactory().get('/api/tarefas/'))
+        self.assertEqual(bancos['GET'], 'default')
+        self.assertEqual(roteador.db_for_write(Tarefa), 'default')
+        self.assertFalse(roteador.allow_migrate(REPLICA, 'api'))
+
+
+class ReplicaAtrasadaTest(TransactionTestCase):
+    """
+    Com uma réplica de verdade (um segundo alias, cópia do banco de teste
+    feita só quando o teste pede), o que vai para cache vem do primário.
+    Sem a transação do TestCase, que impediria a cópia.
+    """
+
+    def setUp(self):
+        APITestBase.setUp(self)
+        self.cliente = Cliente.objects.create(nome='Acme', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='SITE')
+        self.api.force_authenticate(None)
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+
+        descritor, self.arquivo = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descritor)
+        self.addCleanup(os.remove, self.arquivo)
+        # Só para completar a configuração do alias (TEST, OPTIONS...)
+        replica = connections.configure_settings({
+            'default': {}, REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': self.arquivo},
+        })[REPLICA]
+        for patcher in (
+            mock.patch.dict(settings.DATABASES, {REPLICA: replica}),
+            # Liberado para o teste só depois da validação do setUpClass
+            mock.patch.object(type(self), 'databases', self.databases | {REPLICA}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.fechar_replica)
+        self.copiar_para_a_replica()
+
+    def copiar_para_a_replica(self):
+        connection.ensure_connection()
+        destino = sqlite3.connect(self.arquivo)
+        try:
+            connection.connection.backup(destino)
+        finally:
+            destino.close()
+
+    def fechar_replica(self):
+        if hasattr(connections._connections, REPLICA):
+            connections[REPLICA].close()
+            del connections[REPLICA]
+
+    def test_caches_preenchidos_pelo_primario(self):
+        url = f'/api/projetos/{self.projeto.pk}/'
+        self.assertEqual(self.api.get(url).status_code, 404)
+        # Só no primário: a réplica ainda não tem a adesão nem a tarefa
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'VIEWER'})
+        Tarefa.objects.create(projeto=self.projeto, descricao='Contrato')
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_tarefas'], 1)
+        self.assertEqual(len(self.api.get('/api/tarefas/').json()['results']), 1)
+
+        # Com a réplica em dia, o que ficou em cache continua valendo
+        self.copiar_para_a_replica()
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.api.patch(url, {'nome_detalhado': 'x'}, format='json').status_code, 403)
+
+    def test_usuario_novo_e_sincronizacao(self):
+        bia = User.objects.create_user('bia')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        Tarefa.objects.create(projeto=self.projeto, descricao='Contrato')
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(bia)}')
+        self.assertEqual(self.api.get('/api/projetos/').status_code, 200)
+        # O 'seq' e as alterações vêm do mesmo banco: nada fica para trás
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        dados = self.api.get('/api/sync/').json()
+        self.assertEqual(dados['seq'], Sequencia.atual())
+        self.assertEqual([t['descricao'] for t in dados['tarefas']], ['Contrato'])
+
+    def test_leituras_sem_cache_continuam_na_replica(self):
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.copiar_para_a_replica()
+        with CaptureQueriesContext(connections[REPLICA]) as consultas:
+            self.assertEqual(self.api.get('/api/tarefas/urgentes/').status_code, 200)
+        self.assertTrue(consultas.captured_queries)
+
+
+@override_settings(LEITURAS_ASSINCRONAS=True)
+class LeiturasAssincronasTest(APITestBase):
+    """Sob ASGI, com LEITURAS_ASSINCRONAS, os GETs de api/views_async.py respondem como os ViewSets."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.projetos = criar_dados(self.usuario, 12)
+        self.assincrono = AsyncClient()
+        self.token = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+
+    async def get_assincrono(self, url, **headers):
+        return await self.assincrono.get(url, headers={**self.token, **headers})
+
+    async def test_mesma_resposta_do_caminho_sincrono(self):
+        urls = [
+            '/api/clientes/',
+            '/api/clientes/?paginate=false',
+            f'/api/clientes/?{GRAFO_COMPLETO}',
+            '/api/clientes/?fields=nome,projetos.codigo_tag&expand=projetos.tarefas',
+            f'/api/projetos/{self.projetos[0].pk}/',
+            f'/api/projetos/{self.projetos[0].pk}/?expand=tarefas,membros',
+            '/api/tarefas/?page_size=5',
+            '/api/tarefas/?page_size=5&ordering=-data_criacao',
+        ]
+        while urls:
+            url = urls.pop(0)
+            response = await self.get_assincrono(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(response.resolver_match.func, (
+                views_async.listar_clientes, views_async.detalhar_projeto, views_async.listar_tarefas,
+            ))
+            # Sem a resposta em cache, o caminho síncrono monta a sua do zero
+            await caches['respostas'].aclear()
+            sincrona = await sync_to_async(self.api.get)(url)
+            self.assertEqual(response.json(), sincrona.json())
+            self.assertEqual(response['ETag'], sincrona['ETag'])
+            # As páginas seguintes (cursor) também
+            if isinstance(sincrona.json(), dict) and sincrona.json().get('next') and 'cursor=' not in url:
+                urls.append(sincrona.json()['next'].removeprefix('http://testserver'))
+
+    async def test_etag(self):
+        url = f'/api/projetos/{self.projetos[0].pk}/'
+        response = await self.get_assincrono(url)
+        self.assertEqual((await self.get_assincrono(url, **{'If-None-Match': response['ETag']})).status_code, 304)
+        await sync_to_async(self.api.patch)(url, {'nome_detalhado': 'Novo'}, format='json')
+        atualizada = await self.get_assincrono(url, **{'If-None-Match': response['ETag']})
+        self.assertEqual(atualizada.status_code, 200)
+        self.assertEqual(atualizada.json()['nome_detalhado'], 'Novo')
+
+    async def test_autenticacao_e_permissoes(self):
+        response = await self.assincrono.get('/api/tarefas/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        response = await self.assincrono.get('/api/tarefas/', headers={'Authorization': 'Bearer invalido'})
+        self.assertEqual(response.status_code, 401)
+
+        outro = await User.objects.acreate(username='bia')
+        projeto = await Projeto.objects.acreate(
+            cliente=await Cliente.objects.acreate(nome='Outro', criado_por=outro), codigo_tag='OUTRO',
+        )
+        self.assertEqual((await self.get_assincrono(f'/api/projetos/{projeto.pk}/')).status_code, 404)
+        self.assertEqual((await self.get_assincrono('/api/projetos/abc/')).status_code, 404)
+
+    async def test_escritas_vao_para_o_viewset(self):
+        response = await self.assincrono.post(
+            '/api/clientes/', {'nome': 'Novo'}, content_type='application/json', headers=self.token,
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Cliente.objects.filter(nome='Novo', criado_por=self.usuario).aexists())
+
+    async def test_formato_e_limites_como_no_viewset(self):
+        # A API navegável fica com o ViewSet; formatos desconhecidos, 406
+        response = await self.get_assincrono('/api/tarefas/?format=api')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        self.assertEqual((await self.get_assincrono('/api/tarefas/', Accept='text/csv')).status_code, 406)
+        self.assertEqual((await self.get_assincrono('/api/tarefas/?format=xml')).status_code, 404)
+        response = await self.get_assincrono('/api/tarefas/', Accept='application/json; indent=2')
+        self.assertIn(b'\n  ', response.content)
+
+        class Bloqueio(BaseThrottle):
+            def allow_request(self, request, view):
+                return False
+
+        with mock.patch.object(views.TarefaViewSet, 'throttle_classes', [Bloqueio]):
+            self.assertEqual((await self.get_assincrono('/api/tarefas/')).status_code, 429)
+
+    @override_settings(LEITURAS_ASSINCRONAS=False)
+    async def test_desligado_por_padrao(self):
+        response = await self.get_assincrono('/api/tarefas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.resolver_match.func, views_async.listar_tarefas)
+        # O /api/eventos/ continua assíncrono sob ASGI
+        self.assertEqual(resolve('/api/eventos/', 'core.urls_asgi').func, views_async.eventos)
+
+
+class NotificacoesTest(APITestBase):
+    """Alterações publicadas no difusor em memória e entregues por /api/eventos/."""
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome='Cliente', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='PRJ')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.outro = User.objects.create_user('bia', password='senha')
+        self.assinaturas = []
+
+    def tearDown(self):
+        for assinatura in self.assinaturas:
+            notificacoes.difusor.cancelar(assinatura)
+
+    def assinar(self, usuario):
+        assinatura = notificacoes.difusor.assinar(usuario.pk, carregar_papeis(usuario))
+        self.assinaturas.append(assinatura)
+        return assinatura
+
+    def recebidos(self, assinatura):
+        eventos, _ = assinatura.retirar()
+        return [(nome, item['id']) for nome, item in eventos]
+
+    def test_cada_usuario_recebe_o_que_pode_ver(self):
+        ana, bia = self.assinar(self.usuario), self.assinar(self.outro)
+        with self.captureOnCommitCallbacks(execute=True):
+            tarefa = self.api.post('/api/tarefas/', {'projeto': self.projeto.pk, 'descricao': 'Nova'}).json()
+        self.assertEqual(self.recebidos(ana), [('tarefas', tarefa['id'])])
+        self.assertEqual(self.recebidos(bia), [])
+
+        # Os clientes vão para todos, como no /api/sync/
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.patch(f'/api/clientes/{self.cliente.pk}/', {'nome': 'Renomeado'}, format='json')
+        self.assertEqual(self.recebidos(ana), [('clientes', self.cliente.pk)])
+        self.assertEqual(self.recebidos(bia), [('clientes', self.cliente.pk)])
+
+        # Ao entrar no projeto, bia passa a receber o que acontece nele
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projeto.membros.add(self.outro, through_defaults={'papel': 'MEMBRO'})
+            Tarefa.objects.filter(pk=tarefa['id']).get().save()
+        adesao = MembroProjeto.objects.get(projeto=self.projeto, usuario=self.outro).pk
+        self.assertEqual(self.recebidos(bia), [('membros', adesao), ('tarefas', tarefa['id'])])
+
+        # ... e para de receber ao sair
+        with self.captureOnCommitCallbacks(execute=True):
+            self.projeto.membros.remove(self.outro)
+            self.api.delete(f'/api/tarefas/{tarefa["id"]}/')
+        self.assertEqual(self.recebidos(bia), [('exclusoes', adesao)])
+        self.assertIn(('exclusoes', tarefa['id']), self.recebidos(ana))
+
+    def test_escritas_em_lote(self):
+        raiz = Tarefa.objects.create(projeto=self.projeto, descricao='raiz')
+        filha = Tarefa.objects.create(tarefa_pai=raiz, descricao='filha')
+        ana = self.assinar(self.usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.patch(f'/api/tarefas/{raiz.pk}/', {'concluida': True}, format='json')
+        self.assertCountEqual(self.recebidos(ana), [('tarefas', raiz.pk), ('tarefas', filha.pk)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resultados = self.api.post('/api/tarefas/bulk/', {'operacoes': [
+                {'op': 'create', 'projeto': self.projeto.pk, 'descricao': 'nova'},
+                {'op': 'toggle', 'id': raiz.pk, 'concluida': False},
+            ]}, format='json').json()['resultados']
+        self.assertCountEqual(
+            self.recebidos(ana), [('tarefas', resultados[0]['id']), ('tarefas', raiz.pk), ('tarefas', filha.pk)]
+        )
+
+        # Nada é publicado se a transação não for confirmada
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.post('/api/tarefas/bulk/', {'operacoes': [{'op': 'delete', 'id': 999}]}, format='json')
+        self.assertEqual(self.recebidos(ana), [])
+
+    def test_fila_cheia_pede_sincronizacao(self):
+        ana = self.assinar(self.usuario)
+        with mock.patch.object(notificacoes.Assinatura, 'LIMITE', 2):
+            for i in range(3):
+                ana.entregar('tarefas', [{'id': i, 'projeto': self.projeto.pk, 'seq': i}])
+            mensagens = b''.join(notificacoes._mensagens_pendentes(ana))
+            self.assertEqual(mensagens, b'event: sincronizar\ndata: {}\n\n')
+            # Depois do pedido de sincronização, a entrega volta ao normal
+            ana.entregar('tarefas', [{'id': 3, 'projeto': self.projeto.pk, 'seq': 3}])
+            self.assertIn(b'"id":3', b''.join(notificacoes._mensagens_pendentes(ana)))
+
+    def test_fluxo_sse(self):
+        self.assertEqual(self.api.get('/api/eventos/', HTTP_ACCEPT='text/event-stream').status_code, 200)
+        self.assertFalse(notificacoes.difusor)
+
+        response = APIClient().get(
+            f'/api/eventos/?token={AccessToken.for_user(self.usuario)}', HTTP_ACCEPT='text/event-stream'
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        conteudo = iter(response.streaming_content)
+        self.assertIn(b'event: conectado', next(conteudo))
+        with self.captureOnCommitCallbacks(execute=True):
+            Tarefa.objects.create(projeto=self.projeto, descricao='Nova')
+            Tarefa.objects.create(projeto=self.projeto, descricao='Outra')
+        mensagem = next(conteudo).decode()
+        self.assertEqual(mensagem.count('event: alteracoes'), 1)
+        dados = json.loads(mensagem.split('data: ', 1)[1])
+        self.assertEqual([tarefa['descricao'] for tarefa in dados['tarefas']], ['Nova', 'Outra'])
+        self.assertIn(f'id: {dados["seq"]}', mensagem)
+
+        with mock.patch.object(notificacoes, 'INTERVALO_PING', 0):
+            self.assertEqual(next(conteudo), b': ping\n\n')
+        response.close()
+        self.assertFalse(notificacoes.difusor)
+
+        self.assertEqual(APIClient().get('/api/eventos/').status_code, 401)
+
+    async def test_fluxo_sse_assincrono(self):
+        response = await AsyncClient().get(f'/api/eventos/?token={AccessToken.for_user(self.usuario)}')
+        self.assertIs(response.resolver_match.func, views_async.eventos)
+        conteudo = aiter(response.streaming_content)
+        self.assertIn(b'event: conectado', await anext(conteudo))
+
+        # A publicação vem de outra thread, como a de uma requisição de escrita
+        await sync_to_async(notificacoes.difusor.publicar, thread_sensitive=False)(
+            'tarefas', [{'id': 1, 'projeto': self.projeto.pk, 'seq': 1}]
+        )
+        self.assertIn(b'event: alteracoes', await anext(conteudo))
+
+        # Quando o cliente desconecta, o servidor cancela a espera do próximo evento
+        espera = asyncio.ensure_future(anext(conteudo))
+        await asyncio.sleep(0)
+        espera.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await espera
+        self.assertFalse(notificacoes.difusor)
+        self.assertEqual((await AsyncClient().get('/api/eventos/?token=invalido')).status_code, 401)
+
+
+class DadosSinteticosTest(TestCase):
+    """Gerador de dados sintéticos (gerar_dados) e benchmark de todas as rotas (benchmark_api)."""
+
+    def test_formato_da_arvore(self):
+        niveis, pais = dados_sinteticos.formato_da_arvore(10, largura=2, profundidade=3)
+        self.assertEqual(pais, [None, None, 0, 0, 1, 1, 2, 2, 3, 3])
+        self.assertEqual(niveis, [0, 0, 1, 1, 1, 1, 2, 2, 2, 2])
+        # Uma única cadeia: ao chegar à profundidade máxima, começa outra árvore
+        niveis, pais = dados_sinteticos.formato_da_arvore(5, largura=1, profundidade=3)
+        self.assertEqual(niveis, [0, 1, 2, 0, 1])
+
+    def test_gerar_e_remover(self):
+        saida = StringIO()
+        call_command(
+            'gerar_dados', usuarios=4, clientes=2, projetos=3, tarefas_por_projeto=15, membros_por_projeto=3,
+            largura=2, profundidade=3, stdout=saida,
+        )
+        self.assertIn('4 usuarios, 2 clientes, 3 projetos, 9 membros, 45 tarefas', saida.getvalue())
+        for projeto in Projeto.objects.filter(codigo_tag__startswith='SINTETICO-'):
+            papeis = list(projeto.adesoes.values_list('papel', flat=True))
+            self.assertEqual(papeis.count(MembroProjeto.Papel.ADMIN), 1)
+            self.assertEqual(projeto.total_tarefas, 15)
+        caminhos = Tarefa.objects.values_list('caminho', flat=True)
+        self.assertEqual(max(len(Tarefa.ids_do_caminho(caminho)) for caminho in caminhos), 3)
+        # Contadores, papéis e busca como se cada objeto tivesse passado pelos signals
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+        admin = MembroProjeto.objects.filter(papel=MembroProjeto.Papel.ADMIN).first()
+        self.assertEqual(carregar_papeis(admin.usuario)[admin.projeto_id], MembroProjeto.Papel.ADMIN)
+        self.assertTrue(busca.ResultadosDaBusca('sintetico', carregar_papeis(admin.usuario))[0:10])
+
+        with self.assertRaises(CommandError):
+            call_command('gerar_dados', usuarios=1, clientes=1, projetos=1, stdout=StringIO())
+        call_command('gerar_dados', remover=True, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='sintetico-').exists())
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_benchmark_cobre_todas_as_rotas(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'relatorio.json')
+            call_command(
+                'benchmark_api', repeticoes=1, usuarios=3, clientes=1, projetos=2, tarefas_por_projeto=6,
+                membros_por_projeto=2, saida=caminho, stdout=StringIO(),
+            )
+            with open(caminho, encoding='utf-8') as arquivo:
+                relatorio = json.load(arquivo)
+        self.assertEqual(
+            {resultado['rota'] for resultado in relatorio['cenarios'].values()},
+            set(benchmark_api.nomes_das_rotas(urls.urlpatterns)),
+        )
+        for resultado in relatorio['cenarios'].values():
+            self.assertLess(resultado['status'], 400)
+            self.assertEqual(set(resultado['latencia_ms']), {'p50', 'p90', 'p99', 'max'})
+        # Os dados gerados são descartados
+        self.assertFalse(User.objects.filter(username__startswith=f'{benchmark_api.PREFIXO}-').exists())
+
+
+class MetricasTest(APITestBase):
+    """Server-Timing, histogramas por rota em /api/metrics/ e log de requisições lentas."""
+
+    def setUp(self):
+        super().setUp()
+        metricas.registro.limpar()
+        clientes, self.projetos = criar_dados(self.usuario, 3)
+
+    def fases(self, response):
+        fases = {}
+        for parte in response['Server-Timing'].split(', '):
+            nome, dur, *desc = parte.split(';')
+            fases[nome] = float(dur.removeprefix('dur='))
+        return fases
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.api.get(f'/api/clientes/?{GRAFO_COMPLETO}')
+        self.assertIn(f'db;dur=', response['Server-Timing'])
+        self.assertIn(f'desc="{len(consultas)} consulta(s)"', response['Server-Timing'])
+        fases = self.fases(response)
+        self.assertEqual(set(fases), {'db', 'autenticacao', 'serializacao', 'renderizacao', 'total'})
+        self.assertGreater(fases['serializacao'], 0)
+        self.assertGreater(fases['renderizacao'], 0)
+        self.assertLessEqual(sum(fases.values()) - fases['total'], fases['total'] + 0.5)
+
+        # Leitura rápida (Montador) e leituras assíncronas também medem a serialização
+        self.assertGreater(self.fases(self.api.get('/api/tarefas/'))['serializacao'], 0)
+
+    @override_settings(LEITURAS_ASSINCRONAS=True)
+    async def test_server_timing_assincrono(self):
+        response = await AsyncClient().get(
+            '/api/tarefas/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIs(response.resolver_match.func, views_async.listar_tarefas)
+        fases = self.fases(response)
+        self.assertGreater(fases['db'], 0)
+        self.assertGreater(fases['autenticacao'], 0)
+        self.assertGreater(fases['serializacao'], 0)
+
+    def test_endpoint_prometheus(self):
+        self.api.get('/api/tarefas/')
+        self.api.get('/api/tarefas/')
+        self.api.get('/api/projetos/0/')
+        self.assertEqual(self.api.get('/api/metrics/').status_code, 403)
+
+        self.usuario.is_staff = True
+        self.usuario.save()
+        response = self.api.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        texto = response.content.decode()
+        self.assertIn('api_requisicoes_total{rota="tarefa-list",metodo="GET",status="200"} 2', texto)
+        self.assertIn('api_requisicoes_total{rota="projeto-detail",metodo="GET",status="404"} 1', texto)
+        self.assertIn('api_requisicao_segundos_bucket{rota="tarefa-list",metodo="GET",fase="db",le="+Inf"} 2', texto)
+        self.assertIn('api_requisicao_segundos_count{rota="tarefa-list",metodo="GET",fase="total"} 2', texto)
+        self.assertIn('api_requisicao_consultas_count{rota="tarefa-list",metodo="GET"} 2', texto)
+
+        # O Prometheus, com o token e sem usuário
+        anonimo = APIClient()
+        with self.settings(METRICAS_TOKEN='segredo'):
+            self.assertEqual(anonimo.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+            self.assertEqual(anonimo.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer outro').status_code, 401)
+        self.assertEqual(anonimo.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer segredo').status_code, 401)
+
+    def test_log_de_lentas(self):
+        with self.assertNoLogs('api.lentas'):
+            self.api.get('/api/tarefas/')
+        with self.settings(METRICAS_LENTAS_MS=0), self.assertLogs('api.lentas', 'WARNING') as logs:
+            self.api.get(f'/api/tarefas/?expand=subtarefas')
+        mensagem = logs.output[0]
+        self.assertIn('GET /api/tarefas/?expand=subtarefas (tarefa-list) -> 200', mensagem)
+        self.assertIn('FROM "api_tarefa"', mensagem)
+        with self.settings(METRICAS_LENTAS_MS=60_000), self.assertNoLogs('api.lentas'):
+            self.api.get('/api/tarefas/')
+
+
+class AutenticacaoEmCacheTest(APITestBase):
+    """JWT com o token validado e o usuário em cache (api/autenticacao.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.jwt = APIClient()
+        self.jwt.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        self.requisicao = RequestFactory().get(
+            '/api/users/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}',
+        )
+
+    def test_sem_consultas_com_cache(self):
+        autenticador = JWTAuthenticationComCache()
+        with self.assertNumQueries(1):
+            usuario, token = autenticador.authenticate(self.requisicao)
+        self.assertEqual((usuario, token['user_id']), (self.usuario, self.usuario.pk))
+        with self.assertNumQueries(0), mock.patch.object(JWTAuthentication, 'get_validated_token') as validar:
+            usuario, token = autenticador.authenticate(self.requisicao)
+        validar.assert_not_called()
+        self.assertEqual((usuario, token['user_id']), (self.usuario, self.usuario.pk))
+
+        # A requisição inteira: só as consultas da view
+        self.assertEqual(self.jwt.get(f'/api/users/{self.usuario.pk}/').status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.jwt.get(f'/api/users/{self.usuario.pk}/').status_code, 200)
+
+    def test_alteracao_desativacao_e_exclusao(self):
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 200)
+        self.usuario.first_name = 'Ana Maria'
+        self.usuario.save()
+        usuario, _ = JWTAuthenticationComCache().authenticate(self.requisicao)
+        self.assertEqual(usuario.first_name, 'Ana Maria')
+
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 401)
+        self.usuario.is_active = True
+        self.usuario.save()
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 200)
+
+        self.usuario.delete()
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 401)
+
+    def test_token_invalido_ou_expirado(self):
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 200)
+        # O token em cache expira como o token validado
+        depois = timezone.now() + timedelta(days=1)
+        with mock.patch('api.autenticacao.aware_utcnow', return_value=depois):
+            self.assertEqual(self.jwt.get('/api/users/').status_code, 401)
+        # Um token adulterado não é confundido com o que está no cache
+        token = str(AccessToken.for_user(self.usuario))
+        self.jwt.credentials(HTTP_AUTHORIZATION=f'Bearer {token[:-2]}xx')
+        self.assertEqual(self.jwt.get('/api/users/').status_code, 401)
+
+    async def test_leitura_assincrona(self):
+        token = {'Authorization': f'Bearer {AccessToken.for_user(self.usuario)}'}
+        self.assertEqual((await AsyncClient().get('/api/tarefas/', headers=token)).status_code, 200)
+        autenticador = JWTAuthenticationComCache()
+        usuario, _ = await autenticador.aauthenticate(self.requisicao)
+        self.assertEqual(usuario, self.usuario)
+        # O usuário e o token já estão no cache
+        with mock.patch.object(User.objects, 'aget') as aget, \
+                mock.patch.object(JWTAuthentication, 'get_validated_token') as validar:
+            usuario, _ = await autenticador.aauthenticate(self.requisicao)
+        aget.assert_not_called()
+        validar.assert_not_called()
+
+
+class DashboardTest(APITestBase):
+    """/api/dashboard/: resumo da página inicial em poucas consultas."""
+
+    def setUp(self):
+        super().setUp()
+        hoje = timezone.localdate()
+        self.acme = Cliente.objects.create(nome='Acme', criado_por=self.usuario)
+        self.bravo = Cliente.objects.create(nome='Bravo', criado_por=self.usuario)
+        outro = User.objects.create_user('bia', password='senha')
+        self.alheio = Cliente.objects.create(nome='Alheio', criado_por=outro)
+        self.site = Projeto.objects.create(cliente=self.acme, codigo_tag='SITE', data_prazo=hoje)
+        self.app = Projeto.objects.create(cliente=self.acme, codigo_tag='APP')
+        self.erp = Projeto.objects.create(cliente=self.bravo, codigo_tag='ERP')
+        for projeto in (self.site, self.app, self.erp):
+            projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        Projeto.objects.create(cliente=self.alheio, codigo_tag='OCULTO')
+        raiz = Tarefa.objects.create(projeto=self.site, descricao='Raiz', data_prazo=hoje + timedelta(days=5))
+        self.sub = Tarefa.objects.create(tarefa_pai=raiz, descricao='Sub', data_prazo=hoje + timedelta(days=2))
+        # Concluída: não conta como próximo prazo
+        Tarefa.objects.create(projeto=self.site, descricao='Feita', concluida=True, data_prazo=hoje)
+        self.hoje = hoje
+
+    def test_projetos_agrupados_por_cliente(self):
+        response = self.api.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        dados = response.json()
+        self.assertEqual(dados['todos_os_clientes'], [
+            {'id': self.acme.pk, 'nome': 'Acme'},
+            {'id': self.alheio.pk, 'nome': 'Alheio'},
+            {'id': self.bravo.pk, 'nome': 'Bravo'},
+        ])
+        self.assertEqual([(c['nome'], [p['codigo_tag'] for p in c['projetos']]) for c in dados['clientes']], [
+            ('Acme', ['SITE', 'APP']), ('Bravo', ['ERP']),
+        ])
+        self.assertEqual(dados['clientes'][0]['projetos'][0], {
+            'id': self.site.pk, 'codigo_tag': 'SITE', 'nome_detalhado': '', 'data_prazo': self.hoje.isoformat(),
+            'total_tarefas': 3, 'tarefas_concluidas': 1,
+            'proximo_prazo': (self.hoje + timedelta(days=2)).isoformat(),
+        })
+        self.assertIsNone(dados['clientes'][0]['projetos'][1]['proximo_prazo'])
+
+    def test_consultas_e_cache(self):
+        with self.assertNumQueries(3):
+            response = self.api.get('/api/dashboard/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.api.get('/api/dashboard/').json(), response.json())
+        self.assertEqual(self.api.get('/api/dashboard/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Concluir a tarefa muda o próximo prazo do projeto
+        self.sub.concluida = True
+        self.sub.save()
+        response = self.api.get('/api/dashboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['clientes'][0]['projetos'][0]['proximo_prazo'], (self.hoje + timedelta(days=5)).isoformat()
+        )
+        # Um cliente novo de outro usuário entra na lista de todos os clientes
+        etag = response['ETag']
+        Cliente.objects.create(nome='Zulu', criado_por=self.usuario)
+        response = self.api.get('/api/dashboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['todos_os_clientes'][-1]['nome'], 'Zulu')
+
+    def test_resposta_menor_que_a_dos_clientes(self):
+        dados_sinteticos.gerar(usuarios=3, clientes=3, projetos=10, tarefas_por_projeto=20, membros_por_projeto=3)
+        self.api.force_authenticate(User.objects.get(username='sintetico-0'))
+        dashboard = self.api.get('/api/dashboard/').content
+        # O que a página inicial buscava antes
+        clientes = self.api.get('/api/clientes/?paginate=false&expand=projetos.tarefas').content
+        todos = self.api.get('/api/clientes/?all=true&paginate=false&expand=projetos.tarefas').content
+        self.assertLess(len(dashboard) * 10, len(clientes) + len(todos))
+
+
+class PlanosDeConsultaTest(APITestBase):
+    """
+    EXPLAIN QUERY PLAN das consultas das rotas mais usadas: nenhuma pode
+    varrer uma tabela (ou um índice) inteira, e as principais devem usar os
+    índices feitos para elas (migração 0008).
+    """
+
+    ROTAS = (
+        '/api/projetos/',
+        '/api/projetos/?expand=tarefas.subtarefas,membros',
+        '/api/tarefas/',
+        '/api/tarefas/?expand=subtarefas',
+        '/api/tarefas/urgentes/',
+        '/api/clientes/',
+        '/api/clientes/?expand=projetos',
+        '/api/sync/?since=0',
+        '/api/dashboard/',
+        '/api/trabalhos/',
+    )
+    # Leituras que são da tabela inteira por definição, só pelo índice
+    LEITURAS_COMPLETAS = (
+        # Lista de todos os clientes do /api/dashboard/ (id e nome, na ordem do nome)
+        'SCAN api_cliente USING COVERING INDEX sqlite_autoindex_api_cliente_1',
+    )
+
+    def setUp(self):
+        super().setUp()
+        _, self.projetos = criar_dados(self.usuario, 20)
+        # Dados de outro usuário, para que os filtros por usuário e projeto importem
+        outro = User.objects.create_user('bia', password='senha')
+        cliente = Cliente.objects.create(nome='Alheio', criado_por=outro)
+        for i in range(20):
+            alheio = Projeto.objects.create(cliente=cliente, codigo_tag=f'ALHEIO-{i}')
+            alheio.membros.add(outro, through_defaults={'papel': 'ADMIN'})
+            Tarefa.objects.create(projeto=alheio, descricao='Alheia')
+
+    def plano(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [linha[-1] for linha in cursor.fetchall()]
+
+    def plano_do_queryset(self, queryset):
+        return self.assertSemVarredura(*queryset.query.sql_with_params())
+
+    def assertSemVarredura(self, sql, params=()):
+        plano = self.plano(sql, params)
+        varreduras = [
+            passo for passo in plano
+            if passo.startswith('SCAN ') and 'CONSTANT ROW' not in passo and passo not in self.LEITURAS_COMPLETAS
+        ]
+        self.assertFalse(varreduras, f'Varredura completa em:\n{sql}\n' + '\n'.join(plano))
+        return plano
+
+    def consultas_da_rota(self, url):
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [consulta['sql'] for consulta in consultas if consulta['sql'].startswith('SELECT')]
+
+    def test_rotas_sem_varredura(self):
+        projeto = self.projetos[0]
+        rotas = (
+            *self.ROTAS,
+            f'/api/projetos/{projeto.pk}/',
+            f'/api/projetos/{projeto.pk}/arvore/',
+            f'/api/projetos/{projeto.pk}/membros/',
+            f'/api/tarefas/{projeto.tarefas.first().pk}/',
+            f"/api/sync/?since={Tarefa.objects.order_by('-seq').values_list('seq', flat=True).first()}",
+            '/api/busca/?q=tarefa',
+        )
+        for url in rotas:
+            for sql in self.consultas_da_rota(url):
+                with self.subTest(url=url, sql=sql):
+                    self.assertSemVarredura(sql)
+
+    def test_papeis_so_pelo_indice(self):
+        plano = self.plano_do_queryset(
+            MembroProjeto.objects.filter(usuario=self.usuario).values_list('projeto_id', 'papel')
+        )
+        self.assertEqual(plano, ['SEARCH api_membroprojeto USING COVERING INDEX membro_usuario_idx (usuario_id=?)'])
+        # Projetos do usuário (ProjetoViewSet, TarefaViewSet e ClienteViewSet)
+        plano = self.plano_do_queryset(Tarefa.objects.filter(projeto__in=self.usuario.projetos_participados.all()))
+        self.assertIn('SEARCH U1 USING COVERING INDEX membro_usuario_idx (usuario_id=?)', plano)
+
+    def test_arvore_na_ordem_do_indice(self):
+        plano = self.plano_do_queryset(Tarefa.objects.filter(projeto=self.projetos[0]).order_by('caminho'))
+        self.assertEqual(plano, ['SEARCH api_tarefa USING INDEX tarefa_projeto_caminho_idx (projeto_id=?)'])
+
+    def test_sync_pelo_projeto_e_seq(self):
+        ids = [projeto.pk for projeto in self.projetos]
+        plano = self.plano_do_queryset(
+            Tarefa.objects.filter(seq__gt=10, seq__lte=20, projeto_id__in=ids).order_by('seq')
+        )
+        self.assertIn('SEARCH api_tarefa USING INDEX tarefa_projeto_seq_idx (projeto_id=? AND seq>? AND seq<?)', plano)
+
+    def test_subarvore_e_exclusoes_em_cascata(self):
+        subtarefa = self.projetos[0].tarefas.exclude(tarefa_pai=None).get()
+        self.plano_do_queryset(subtarefa.tarefa_pai.descendentes())
+        self.plano_do_queryset(subtarefa.ancestrais())
+        # O que o Collector consulta ao excluir um usuário e um projeto
+        self.plano_do_queryset(MembroProjeto.objects.filter(usuario_id__in=[self.usuario.pk]))
+        self.plano_do_queryset(Tarefa.objects.filter(projeto_id__in=[self.projetos[0].pk]))
+
+
+class AdminTest(TestCase):
+    """O admin com um número de consultas que não cresce com as tabelas."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='senha')
+        self.client.force_login(self.admin)
+        self.cliente = Cliente.objects.create(nome='Acme', criado_por=self.admin)
+        self.projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='SITE')
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='Revisar contrato')
+
+    def criar(self, n):
+        """Mais n clientes, projetos, membros, tarefas e subtarefas (do projeto e da tarefa raiz)."""
+        inicio = Cliente.objects.count()
+        for i in range(inicio, inicio + n):
+            cliente = Cliente.objects.create(nome=f'Cliente {i}', criado_por=self.admin)
+            Projeto.objects.create(cliente=cliente, codigo_tag=f'PRJ-{i}')
+            usuario = User.objects.create_user(f'membro-{i}')
+            self.projeto.membros.add(usuario, through_defaults={'papel': 'EDITOR'})
+            pai = Tarefa.objects.create(tarefa_pai=self.raiz, descricao=f'Sub {i}')
+            Tarefa.objects.create(tarefa_pai=pai, descricao=f'Neta {i}')
+
+    def assertConsultasConstantes(self, url):
+        # A primeira requisição carrega caches do processo (ContentType...)
+        self.client.get(url)
+        contagens = []
+        for n in (2, 20):
+            self.criar(n)
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            contagens.append(len(consultas))
+        self.assertEqual(contagens[0], contagens[1], url)
+
+    def test_listagens(self):
+        for url in (
+            '/admin/api/tarefa/', f'/admin/api/tarefa/?projeto={self.projeto.pk}', '/admin/api/tarefa/?q=sub',
+            '/admin/api/projeto/', f'/admin/api/projeto/?cliente={self.cliente.pk}',
+            '/admin/api/cliente/',
+        ):
+            with self.subTest(url=url):
+                self.assertConsultasConstantes(url)
+
+    def test_formularios(self):
+        for url in (
+            f'/admin/api/tarefa/{self.raiz.pk}/change/', '/admin/api/tarefa/add/',
+            f'/admin/api/projeto/{self.projeto.pk}/change/', '/admin/api/projeto/add/',
+            f'/admin/api/cliente/{self.cliente.pk}/change/', '/admin/api/cliente/add/',
+        ):
+            with self.subTest(url=url):
+                self.assertConsultasConstantes(url)
+
+    def test_contagem_limitada_e_estimada(self):
+        self.criar(10)
+        with mock.patch.object(PaginadorEstimado, 'LIMITE', 5):
+            # Sem filtros: a estimativa pelo maior ID (sem estatísticas)
+            response = self.client.get('/admin/api/tarefa/')
+            self.assertEqual(response.context['cl'].result_count, Tarefa.objects.order_by('-pk')[0].pk)
+            # Filtrada: até o limite
+            response = self.client.get('/admin/api/tarefa/?q=sub')
+            self.assertEqual(response.context['cl'].result_count, 5)
+            # Com as estatísticas do ANALYZE
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            response = self.client.get('/admin/api/tarefa/')
+            self.assertEqual(response.context['cl'].result_count, Tarefa.objects.count())
+        response = self.client.get('/admin/api/tarefa/?q=sub')
+        self.assertEqual(response.context['cl'].result_count, 10)
+
+    def test_busca_e_autocomplete_pelo_indice(self):
+        self.criar(3)
+        response = self.client.get('/admin/api/tarefa/?q=neta')
+        self.assertEqual(sorted(t.descricao for t in response.context['cl'].result_list), ['Neta 1', 'Neta 2', 'Neta 3'])
+        # Pelo código do projeto: todas as tarefas dele
+        response = self.client.get('/admin/api/tarefa/?q=site')
+        self.assertEqual(response.context['cl'].result_count, Tarefa.objects.filter(projeto=self.projeto).count())
+        with warnings.catch_warnings():
+            # Paginado sem ordenação, o autocomplete avisa (e pode repetir ou pular linhas)
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            response = self.client.get('/admin/autocomplete/', {
+                'app_label': 'api', 'model_name': 'tarefa', 'field_name': 'tarefa_pai', 'term': 'contrato',
+            })
+        self.assertEqual([r['id'] for r in response.json()['results']], [str(self.raiz.pk)])
+
+    def test_novo_membro(self):
+        usuario = User.objects.create_user('novo')
+        url = f'/admin/api/projeto/{self.projeto.pk}/change/'
+        formulario = self.client.get(url).context['adminform'].form
+        dados = {
+            'cliente': self.cliente.pk, 'codigo_tag': 'SITE', 'nome_detalhado': '',
+            'adesoes-TOTAL_FORMS': 0, 'adesoes-INITIAL_FORMS': 0,
+            'adesoes-2-TOTAL_FORMS': 1, 'adesoes-2-INITIAL_FORMS': 0,
+            'adesoes-2-0-usuario': usuario.pk, 'adesoes-2-0-papel': 'VIEWER',
+        }
+        self.assertIn('cliente', formulario.fields)
+        response = self.client.post(url, dados)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.projeto.adesoes.get().usuario, usuario)
+
+
+class TransferenciaTest(APITestBase):
+    """Exportação em fluxo e importação em lote de clientes (api/transferencia.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.bia = User.objects.create_user('bia')
+        self.cliente = Cliente.objects.create(nome='Acme', criado_por=self.usuario)
+        self.site = Projeto.objects.create(cliente=self.cliente, codigo_tag='SITE', data_prazo=timezone.localdate())
+        self.site.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.site.membros.add(self.bia, through_defaults={'papel': 'VIEWER'})
+        # Sem o usuário: fica fora da exportação pela API
+        Projeto.objects.create(cliente=self.cliente, codigo_tag='OCULTO')
+        raiz = Tarefa.objects.create(projeto=self.site, descricao='Contrato')
+        filha = Tarefa.objects.create(tarefa_pai=raiz, descricao='Revisar cláusulas', concluida=True)
+        Tarefa.objects.create(tarefa_pai=filha, descricao='Assinar, "com" aspas')
+        Tarefa.objects.create(projeto=self.site, descricao='Layout')
+
+    def exportar(self, formato='ndjson'):
+        response = self.api.get(f'/api/clientes/{self.cliente.pk}/exportar/?formato={formato}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def renomear(self):
+        # O cliente e os projetos importados não podem repetir nomes nem códigos
+        self.cliente.nome = 'Acme antiga'
+        self.cliente.save()
+        Projeto.objects.filter(cliente=self.cliente).update(codigo_tag=Concat('codigo_tag', Value('-ANTIGO')))
+
+    def assertImportado(self, resumo):
+        self.assertEqual(
+            {k: v for k, v in resumo.items() if k != 'cliente'},
+            {'clientes': 1, 'projetos': 1, 'membros': 2, 'tarefas': 4, 'usuarios_nao_encontrados': []},
+        )
+        cliente = Cliente.objects.get(pk=resumo['cliente'])
+        self.assertEqual(cliente.nome, 'Acme')
+        projeto = cliente.projetos.get()
+        self.assertEqual((projeto.codigo_tag, projeto.data_prazo), ('SITE', self.site.data_prazo))
+        self.assertEqual(dict(projeto.adesoes.values_list('usuario__username', 'papel')), {'ana': 'ADMIN', 'bia': 'VIEWER'})
+        self.assertEqual((projeto.total_tarefas, projeto.tarefas_concluidas), (4, 1))
+        neta = Tarefa.objects.get(projeto=projeto, descricao='Assinar, "com" aspas')
+        self.assertEqual([t.descricao for t in neta.ancestrais()], ['Contrato', 'Revisar cláusulas'])
+        self.assertEqual(Tarefa.ids_do_caminho(neta.caminho)[-1], neta.pk)
+        # Como se cada objeto tivesse passado pelos signals
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+        self.assertEqual(carregar_papeis(self.bia)[projeto.pk], 'VIEWER')
+        resultados = busca.ResultadosDaBusca('cláusulas', carregar_papeis(self.usuario))[0:10]
+        self.assertIn(neta.tarefa_pai_id, [r['id'] for r in resultados])
+
+    def test_exporta_so_os_projetos_do_usuario(self):
+        linhas = [json.loads(linha) for linha in self.exportar().splitlines()]
+        self.assertEqual([linha['tipo'] for linha in linhas], ['cliente', 'projeto', 'membro', 'membro'] + ['tarefa'] * 4)
+        self.assertEqual(linhas[1]['codigo_tag'], 'SITE')
+        # Na ordem do caminho: cada pai antes dos filhos
+        vistas = set()
+        for tarefa in linhas[4:]:
+            self.assertTrue(tarefa['tarefa_pai'] is None or tarefa['tarefa_pai'] in vistas)
+            vistas.add(tarefa['id'])
+
+    def test_ida_e_volta_em_ndjson(self):
+        arquivo = self.exportar()
+        self.renomear()
+        response = self.api.post('/api/clientes/importar/', arquivo, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertImportado(response.json())
+
+    def test_ida_e_volta_em_csv(self):
+        arquivo = self.exportar('csv')
+        self.assertTrue(arquivo.startswith(b'tipo,id,nome,'))
+        self.renomear()
+        response = self.api.post('/api/clientes/importar/?formato=csv', arquivo, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertImportado(response.json())
+
+    def test_filhas_antes_do_pai_e_membros_inexistentes(self):
+        registros = [
+            {'tipo': 'cliente', 'id': 9, 'nome': 'Nova'},
+            {'tipo': 'projeto', 'id': 5, 'codigo_tag': 'NOVO'},
+            {'tipo': 'membro', 'projeto': 5, 'usuario': 'ninguem', 'papel': 'EDITOR'},
+            {'tipo': 'tarefa', 'id': 3, 'tarefa_pai': 2, 'descricao': 'Neta'},
+            {'tipo': 'tarefa', 'id': 2, 'tarefa_pai': 1, 'descricao': 'Filha'},
+            {'tipo': 'tarefa', 'id': 1, 'projeto': 5, 'descricao': 'Raiz'},
+        ]
+        with mock.patch.object(transferencia, 'LOTE', 1):
+            resumo = transferencia.importar([json.dumps(r) for r in registros], self.usuario).como_dict()
+        self.assertEqual((resumo['tarefas'], resumo['membros']), (3, 1))
+        self.assertEqual(resumo['usuarios_nao_encontrados'], ['ninguem'])
+        neta = Tarefa.objects.get(descricao='Neta')
+        self.assertEqual([t.descricao for t in neta.ancestrais()], ['Raiz', 'Filha'])
+        self.assertEqual(neta.projeto.codigo_tag, 'NOVO')
+
+    def test_erro_desfaz_a_importacao(self):
+        linhas = self.exportar().splitlines()
+        self.renomear()
+        pai_ausente = {'tipo': 'tarefa', 'id': 999, 'tarefa_pai': 998, 'descricao': 'Órfã'}
+        corpo = b'\n'.join(linhas + [json.dumps(pai_ausente).encode()])
+        antes = (Cliente.objects.count(), Projeto.objects.count(), Tarefa.objects.count())
+        response = self.api.post('/api/clientes/importar/', corpo, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tarefa_pai 998', response.json()['detail'])
+        self.assertEqual((Cliente.objects.count(), Projeto.objects.count(), Tarefa.objects.count()), antes)
+        # Nomes já existentes
+        self.cliente.nome = 'Acme'
+        self.cliente.save()
+        response = self.api.post('/api/clientes/importar/', b'\n'.join(linhas), content_type='application/x-ndjson')
+        self.assertEqual(response.json(), {'detail': "Linha 1: já existe um cliente com o nome 'Acme'."})
+
+    def test_exportacao_le_as_tarefas_em_fluxo(self):
+        with mock.patch.object(transferencia, 'LOTE', 2), CaptureQueriesContext(connection) as consultas:
+            linhas = list(transferencia.exportar(self.cliente))
+        self.assertEqual(len(linhas), 1 + 2 + 2 + 4)
+        # Uma consulta por projeto (com as tarefas em blocos do cursor), não por tarefa
+        self.assertEqual(sum('api_tarefa' in consulta['sql'] for consulta in consultas), 2)
+
+    def test_comandos(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            caminho = os.path.join(pasta, 'acme.csv')
+            call_command('exportar_cliente', self.cliente.pk, formato='csv', saida=caminho, stdout=StringIO())
+            self.renomear()
+            saida = StringIO()
+            call_command('importar_cliente', caminho, usuario='bia', formato='csv', stdout=saida)
+            self.assertIn('1 clientes, 2 projetos', saida.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('importar_cliente', caminho, usuario='bia', formato='csv', stdout=StringIO())
+        importado = Cliente.objects.get(nome='Acme')
+        self.assertEqual(importado.criado_por, self.bia)
+        # Quem importa passa a ser ADMIN dos projetos de que não era membro
+        self.assertEqual(importado.projetos.get(codigo_tag='OCULTO').adesoes.get().papel, 'ADMIN')
+        saida = StringIO()
+        call_command('exportar_cliente', importado.pk, stdout=saida)
+        self.assertEqual(len(saida.getvalue().splitlines()), 1 + 2 + 3 + 4)
+
+
+@mock.patch.object(trabalhos, 'LOTE', 2)
+@mock.patch.object(trabalhos, 'LIMITE_SINCRONO', 3)
+class TrabalhosTest(APITestBase):
+    """Exclusões e cascatas grandes enfileiradas e executadas em lotes (api/trabalhos.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome='Acme', criado_por=self.usuario)
+        self.projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='SITE')
+        self.projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        # Raiz > 2 filhas > 2 netas cada, e uma tarefa solta
+        self.raiz = Tarefa.objects.create(projeto=self.projeto, descricao='Contrato')
+        for i in range(2):
+            filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao=f'Filha {i}')
+            for j in range(2):
+                Tarefa.objects.create(tarefa_pai=filha, descricao=f'Neta {i}.{j}', concluida=j == 0)
+        self.solta = Tarefa.objects.create(projeto=self.projeto, descricao='Layout')
+
+    def assertContadoresCorretos(self):
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def assertEnfileirado(self, response, tipo, objeto_id):
+        self.assertEqual(response.status_code, 202)
+        dados = response.json()
+        dados = dados.get('trabalho', dados)
+        self.assertEqual((dados['tipo'], dados['objeto_id'], dados['status']), (tipo, objeto_id, 'pendente'))
+        self.assertEqual(response['Location'], f"/api/trabalhos/{dados['id']}/")
+        return dados['id']
+
+    def executar(self, trabalho_id):
+        self.assertEqual(trabalhos.processar_pendentes(), 1)
+        return self.api.get(f'/api/trabalhos/{trabalho_id}/').json()
+
+    def test_exclusao_pequena_continua_na_requisicao(self):
+        filha = self.raiz.subtarefas.first()
+        self.assertEqual(self.api.delete(f'/api/tarefas/{filha.pk}/').status_code, 204)
+        self.assertFalse(Trabalho.objects.exists())
+        self.assertEqual(Tarefa.objects.count(), 5)
+
+    def test_excluir_subarvore(self):
+        response = self.api.delete(f'/api/tarefas/{self.raiz.pk}/')
+        trabalho_id = self.assertEnfileirado(response, 'excluir_tarefa', self.raiz.pk)
+        # Nada muda até o worker executar
+        self.assertEqual(Tarefa.objects.count(), 8)
+        trabalho = self.executar(trabalho_id)
+        self.assertEqual((trabalho['status'], trabalho['processados'], trabalho['total']), ('concluido', 7, 7))
+        self.assertEqual(list(Tarefa.objects.values_list('descricao', flat=True)), ['Layout'])
+        self.assertContadoresCorretos()
+        self.projeto.refresh_from_db()
+        self.assertEqual((self.projeto.total_tarefas, self.projeto.tarefas_concluidas), (1, 0))
+        # Cada tarefa com o seu registro para o /api/sync/, e fora da busca
+        self.assertEqual(Exclusao.objects.filter(tipo=Exclusao.Tipo.TAREFA).count(), 7)
+        self.assertFalse(busca.ResultadosDaBusca('neta', carregar_papeis(self.usuario))[0:10])
+
+    def test_excluir_projeto_e_cliente(self):
+        trabalho_id = self.assertEnfileirado(self.api.delete(f'/api/projetos/{self.projeto.pk}/'), 'excluir_projeto', self.projeto.pk)
+        self.assertEqual(self.executar(trabalho_id)['processados'], 8)
+        self.assertFalse(Projeto.objects.exists())
+        self.assertFalse(Tarefa.objects.exists())
+        # Um registro só, do projeto (o /api/sync/ descarta as tarefas dele)
+        self.assertEqual(list(Exclusao.objects.exclude(tipo=Exclusao.Tipo.MEMBRO).values_list('tipo', flat=True)), ['projeto'])
+        self.assertFalse(busca.ResultadosDaBusca('contrato', {self.projeto.pk: 'ADMIN'})[0:10])
+
+        projeto = Projeto.objects.create(cliente=self.cliente, codigo_tag='APP')
+        projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        for i in range(4):
+            Tarefa.objects.create(projeto=projeto, descricao=f'Tarefa {i}')
+        trabalho_id = self.assertEnfileirado(self.api.delete(f'/api/clientes/{self.cliente.pk}/'), 'excluir_cliente', self.cliente.pk)
+        self.assertEqual(self.executar(trabalho_id)['status'], 'concluido')
+        self.assertFalse(Cliente.objects.exists())
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_oculto_ate_o_fim_do_trabalho(self):
+        filha = self.raiz.subtarefas.first()
+        self.assertEqual(len(self.api.get('/api/tarefas/').json()['results']), 8)
+        self.assertEnfileirado(self.api.delete(f'/api/tarefas/{self.raiz.pk}/'), 'excluir_tarefa', self.raiz.pk)
+        # A subárvore some na hora (inclusive das respostas em cache), sem encolher a cada lote
+        self.assertEqual([t['id'] for t in self.api.get('/api/tarefas/').json()['results']], [self.solta.pk])
+        self.assertEqual(self.api.get(f'/api/tarefas/{filha.pk}/').status_code, 404)
+        self.assertEqual(self.api.delete(f'/api/tarefas/{self.raiz.pk}/').status_code, 404)
+        arvore = self.api.get(f'/api/projetos/{self.projeto.pk}/arvore/').json()
+        self.assertEqual([no['id'] for no in arvore], [self.solta.pk])
+
+        self.assertEnfileirado(self.api.delete(f'/api/clientes/{self.cliente.pk}/'), 'excluir_cliente', self.cliente.pk)
+        self.assertEqual(self.api.get(f'/api/projetos/{self.projeto.pk}/').status_code, 404)
+        self.assertEqual(self.api.get('/api/clientes/').json()['results'], [])
+        self.assertEqual(self.api.get('/api/tarefas/').json()['results'], [])
+
+    def test_viewset_sem_declaracoes(self):
+        with self.assertRaises(TypeError):
+            class SemContagem(trabalhos.ExclusaoEmSegundoPlanoMixin):
+                tipo_de_exclusao = Trabalho.Tipo.EXCLUIR_TAREFA
+        with self.assertRaises(TypeError):
+            class SemTipo(trabalhos.ExclusaoEmSegundoPlanoMixin):
+                def tarefas_excluidas(self, instance):
+                    return 0
+
+    def test_conclusao_em_cascata(self):
+        seq_antes = Tarefa.objects.get(descricao='Neta 1.1').seq
+        response = self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'concluida': True}, format='json')
+        trabalho_id = self.assertEnfileirado(response, 'propagar_conclusao', self.raiz.pk)
+        # A própria tarefa já vem alterada na resposta
+        self.assertTrue(response.json()['concluida'])
+        self.assertEqual(Tarefa.objects.filter(concluida=True).count(), 3)
+        self.assertEqual(self.executar(trabalho_id)['processados'], 6)
+        self.assertEqual(list(Tarefa.objects.filter(concluida=False).values_list('descricao', flat=True)), ['Layout'])
+        self.assertGreater(Tarefa.objects.get(descricao='Neta 1.1').seq, seq_antes)
+        self.assertContadoresCorretos()
+        self.raiz.refresh_from_db()
+        self.assertEqual(self.raiz.descendentes_concluidas, 6)
+
+    def test_falha_retomada_e_visibilidade(self):
+        trabalho = trabalhos.enfileirar(Trabalho.Tipo.EXCLUIR_PROJETO, self.projeto.pk, self.usuario)
+        with mock.patch.dict(trabalhos.EXECUTORES, {Trabalho.Tipo.EXCLUIR_PROJETO: mock.Mock(side_effect=ValueError('falhou'))}):
+            with self.assertLogs('api.trabalhos', 'ERROR'):
+                trabalhos.processar_pendentes()
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.erro, trabalho.tentativas), ('falhou', 'ValueError: falhou', 1))
+        # Em execução e parado há muito tempo (o worker caiu): volta para a fila
+        Trabalho.objects.filter(pk=trabalho.pk).update(
+            status=Trabalho.Status.EXECUTANDO, data_atualizacao=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(trabalhos.processar_pendentes(), 1)
+        trabalho.refresh_from_db()
+        self.assertEqual((trabalho.status, trabalho.tentativas), ('concluido', 2))
+        self.assertFalse(Projeto.objects.exists())
+        # Cada usuário só vê os seus
+        self.assertEqual([t['id'] for t in self.api.get('/api/trabalhos/').json()['results']], [trabalho.pk])
+        self.api.force_authenticate(User.objects.create_user('bia'))
+        self.assertEqual(self.api.get(f'/api/trabalhos/{trabalho.pk}/').status_code, 404)
+
+    def test_comando(self):
+        trabalhos.enfileirar(Trabalho.Tipo.PROPAGAR_CONCLUSAO, self.raiz.pk, self.usuario)
+        trabalhos.enfileirar(Trabalho.Tipo.EXCLUIR_TAREFA, self.solta.pk, self.usuario)
+        # Objeto já excluído: nada a fazer
+        trabalhos.enfileirar(Trabalho.Tipo.EXCLUIR_CLIENTE, 999, self.usuario)
+        saida = StringIO()
+        call_command('processar_trabalhos', uma_vez=True, stdout=saida)
+        self.assertIn('3 trabalho(s) executado(s).', saida.getvalue())
+        self.assertEqual(set(Trabalho.objects.values_list('status', flat=True)), {'concluido'})
+        self.assertFalse(Tarefa.objects.filter(pk=self.solta.pk).exists())
+
+
+class MoverTarefaTest(APITestBase):
+    """POST /api/tarefas/<id>/mover/ e o PATCH de tarefa_pai: a subárvore inteira muda de lugar (api/movimentacao.py)."""
+
+    def setUp(self):
+        super().setUp()
+        cliente = Cliente.objects.create(nome='Acme', criado_por=self.usuario)
+        self.origem = Projeto.objects.create(cliente=cliente, codigo_tag='SITE')
+        self.destino = Projeto.objects.create(cliente=cliente, codigo_tag='APP')
+        for projeto in (self.origem, self.destino):
+            projeto.membros.add(self.usuario, through_defaults={'papel': 'ADMIN'})
+        self.raiz = Tarefa.objects.create(projeto=self.origem, descricao='raiz')
+        self.filha = Tarefa.objects.create(tarefa_pai=self.raiz, descricao='filha')
+        self.neta = Tarefa.objects.create(tarefa_pai=self.filha, descricao='neta', concluida=True)
+        self.alvo = Tarefa.objects.create(projeto=self.destino, descricao='alvo')
+
+    def mover(self, tarefa, **destino):
+        return self.api.post(f'/api/tarefas/{tarefa.pk}/mover/', destino, format='json')
+
+    def assertSubarvore(self, tarefa, projeto, caminho_do_pai=''):
+        movidas = {t.pk: t for t in Tarefa.objects.filter(pk__in=[tarefa.pk, self.neta.pk])}
+        self.assertEqual({t.projeto_id for t in movidas.values()}, {projeto.pk})
+        self.assertEqual(movidas[tarefa.pk].caminho, caminho_do_pai + Tarefa.segmento(tarefa.pk))
+        self.assertTrue(movidas[self.neta.pk].caminho.startswith(movidas[tarefa.pk].caminho))
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def test_para_outro_projeto(self):
+        seq = self.api.get('/api/sync/', {'since': 0}).json()['seq']
+        response = self.mover(self.filha, tarefa_pai=self.alvo.pk)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual((response.json()['tarefa_pai'], response.json()['projeto']), (self.alvo.pk, self.destino.pk))
+        self.assertSubarvore(self.filha, self.destino, self.alvo.caminho)
+        self.assertEqual(Tarefa.objects.get(pk=self.alvo.pk).total_descendentes, 2)
+        self.assertEqual(Projeto.objects.get(pk=self.origem.pk).total_tarefas, 1)
+        # Quem sincroniza só o projeto de origem descarta a subárvore
+        delta = self.api.get('/api/sync/', {'since': seq}).json()
+        self.assertEqual({t['id'] for t in delta['tarefas']}, {self.filha.pk, self.neta.pk})
+        self.assertEqual(
+            {(e['id'], e['projeto']) for e in delta['exclusoes']},
+            {(self.filha.pk, self.origem.pk), (self.neta.pk, self.origem.pk)},
+        )
+        # O índice de busca acompanha o projeto
+        self.assertEqual(
+            [r['projeto'] for r in self.api.get('/api/busca/', {'q': 'neta'}).json()['results']], [self.destino.pk],
+        )
+
+    def test_para_a_raiz(self):
+        self.assertEqual(self.mover(self.filha, projeto=self.destino.pk).status_code, 200)
+        self.assertIsNone(Tarefa.objects.get(pk=self.filha.pk).tarefa_pai_id)
+        self.assertSubarvore(self.filha, self.destino)
+        # Sem projeto: a raiz do próprio projeto
+        self.assertEqual(self.mover(self.neta).status_code, 200)
+        self.assertEqual(Tarefa.objects.get(pk=self.neta.pk).caminho, Tarefa.segmento(self.neta.pk))
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def test_subtarefa_nunca_em_outro_projeto(self):
+        # Pai no projeto de origem, projeto de destino informado: recusado pela API...
+        response = self.api.post('/api/tarefas/', {
+            'projeto': self.destino.pk, 'tarefa_pai': self.raiz.pk, 'descricao': 'intrusa',
+        }, format='json')
+        self.assertEqual(response.json(), {'tarefa_pai': ['A tarefa pai é de outro projeto.']})
+        response = self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'create', 'projeto': self.destino.pk, 'tarefa_pai': self.raiz.pk, 'descricao': 'intrusa'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['operacoes'][0]['tarefa_pai'], 'A tarefa pai é de outro projeto.')
+        self.assertFalse(Tarefa.objects.filter(descricao='intrusa').exists())
+        # ... e, pelo ORM, a subtarefa fica no projeto do pai
+        intrusa = Tarefa.objects.create(projeto=self.destino, tarefa_pai=self.raiz, descricao='intrusa')
+        self.assertEqual(Tarefa.objects.get(pk=intrusa.pk).projeto_id, self.origem.pk)
+
+        # Mover o pai leva a subárvore inteira, com os contadores dos dois projetos corretos
+        self.assertEqual(self.mover(self.raiz, projeto=self.destino.pk).status_code, 200)
+        self.assertEqual(set(Tarefa.objects.filter(caminho__startswith=self.raiz.caminho).values_list('projeto_id', flat=True)), {self.destino.pk})
+        self.assertEqual(Projeto.objects.get(pk=self.origem.pk).total_tarefas, 0)
+        self.assertEqual(Projeto.objects.get(pk=self.destino.pk).total_tarefas, 5)
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
+
+    def test_ciclo_e_acesso(self):
+        response = self.mover(self.raiz, tarefa_pai=self.neta.pk)
+        self.assertEqual(response.json(), {'tarefa_pai': 'Uma tarefa não pode ficar abaixo dela mesma.'})
+        response = self.api.patch(f'/api/tarefas/{self.raiz.pk}/', {'tarefa_pai': self.raiz.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'update', 'id': self.raiz.pk, 'tarefa_pai': self.alvo.pk},
+            {'op': 'update', 'id': self.alvo.pk, 'tarefa_pai': self.neta.pk},
+        ]}, format='json').status_code, 400)
+
+        alheio = Projeto.objects.create(cliente=self.origem.cliente, codigo_tag='ALHEIO')
+        tarefa_alheia = Tarefa.objects.create(projeto=alheio, descricao='alheia')
+        self.assertEqual(self.mover(self.filha, tarefa_pai=tarefa_alheia.pk).status_code, 400)
+        self.assertEqual(self.mover(self.filha, projeto=alheio.pk).status_code, 400)
+        self.assertEqual(self.mover(self.filha, tarefa_pai=self.alvo.pk, projeto=self.origem.pk).status_code, 400)
+        self.assertSubarvore(self.raiz, self.origem)
+
+    def test_patch_e_lote_levam_a_subarvore(self):
+        response = self.api.patch(
+            f'/api/tarefas/{self.filha.pk}/', {'tarefa_pai': self.alvo.pk, 'descricao': 'movida'}, format='json',
+        )
+        self.assertEqual((response.json()['projeto'], response.json()['descricao']), (self.destino.pk, 'movida'))
+        self.assertSubarvore(self.filha, self.destino, self.alvo.caminho)
+        # Só o projeto, numa subtarefa: vai para a raiz dele
+        self.api.patch(f'/api/tarefas/{self.filha.pk}/', {'projeto': self.origem.pk}, format='json')
+        self.assertSubarvore(self.filha, self.origem)
+
+        response = self.api.post('/api/tarefas/bulk/', {'operacoes': [
+            {'op': 'update', 'id': self.filha.pk, 'tarefa_pai': self.alvo.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertSubarvore(self.filha, self.destino, self.alvo.caminho)
+
+    def test_consultas_independem_do_tamanho_da_subarvore(self):
+        def consultas(tarefa, projeto):
+            with CaptureQueriesContext(connection) as contexto:
+                self.assertEqual(self.mover(tarefa, projeto=projeto.pk).status_code, 200)
+            return len(contexto)
+
+        consultas(self.filha, self.destino)
+        pequena = consultas(self.filha, self.origem)
+        # Mais 200 tarefas, em vários níveis, abaixo da neta
+        pais = [Tarefa.objects.get(pk=self.neta.pk)]
+        for i in range(200):
+            pais.append(Tarefa.objects.create(tarefa_pai=pais[i // 3], descricao=f'descendente {i}'))
+        self.assertEqual(consultas(self.filha, self.destino), pequena)
+        self.assertEqual(Tarefa.objects.filter(projeto=self.destino).count(), 203)
+        call_command('recalcular_contadores', verificar=True, stdout=StringIO())
@@ -0,0 +1,293 @@
+# backend/api/trabalhos.py
+
+"""
+Fila de trabalhos em segundo plano, no próprio banco (modelo Trabalho),
+sem broker externo.
+
+Excluir um cliente, um projeto ou uma subárvore com milhares de tarefas, ou
+propagar a conclusão de uma tarefa a milhares de subtarefas, levaria
+segundos dentro da requisição, segurando o lock de escrita do SQLite o
+tempo todo. Acima de LIMITE_SINCRONO tarefas, as views enfileiram a
+operação e respondem na hora com 202 e o trabalho, que o frontend
+acompanha em /api/trabalhos/<id>/.
+
+O comando processar_trabalhos executa a fila: cada trabalho é feito em
+lotes de LOTE tarefas, cada lote na sua própria transação, e os demais
+escritores entram entre um lote e outro. Os lotes são idempotentes: um
+trabalho interrompido (o worker caiu) é retomado do ponto em que parou
+depois de TEMPO_PARADO sem avançar.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Sum, Value
+from django.db.models.functions import Length, Substr
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import busca, notificacoes
+from .cache_respostas import incrementar_versao, incrementar_versao_colecao
+from .models import Cliente, Projeto, Sequencia, Tarefa, Trabalho
+from .serializers import TrabalhoSerializer
+from .signals import exclusoes_em_lote
+
+logger = logging.getLogger('api.trabalhos')
+
+# Até quantas tarefas afetadas a operação ainda roda na própria requisição
+LIMITE_SINCRONO = 1000
+
+# Tarefas por lote (e por transação)
+LOTE = 1000
+
+# Um trabalho em execução que não avança há mais que isso é retomado
+TEMPO_PARADO = timedelta(minutes=5)
+
+EXECUTORES = {}
+
+
+def executor(tipo):
+    def registrar(funcao):
+        EXECUTORES[tipo] = funcao
+        return funcao
+    return registrar
+
+
+def enfileirar(tipo, objeto_id, usuario, total=0):
+    return Trabalho.objects.create(tipo=tipo, objeto_id=objeto_id, usuario=usuario, total=total)
+
+
+def resposta_do_trabalho(trabalho, dados=None):
+    """
+    202 Accepted, com o trabalho e o endereço para acompanhá-lo. Com 'dados'
+    (o objeto já alterado), o trabalho vai no campo 'trabalho'.
+    """
+    corpo = TrabalhoSerializer(trabalho).data
+    if dados is not None:
+        corpo = {**dados, 'trabalho': corpo}
+    return Response(corpo, status=status.HTTP_202_ACCEPTED, headers={'Location': f'/api/trabalhos/{trabalho.pk}/'})
+
+
+# Execução
+
+def reservar():
+    """Marca o próximo trabalho da fila como em execução e o retorna (None com a fila vazia)."""
+    agora = timezone.now()
+    with transaction.atomic():
+        Trabalho.objects.filter(
+            status=Trabalho.Status.EXECUTANDO, data_atualizacao__lt=agora - TEMPO_PARADO,
+        ).update(status=Trabalho.Status.PENDENTE)
+        pk = Trabalho.objects.filter(status=Trabalho.Status.PENDENTE).order_by('pk').values_list('pk', flat=True).first()
+        # Com outro worker, só um dos dois consegue mudar o status
+        if pk is None or not Trabalho.objects.filter(pk=pk, status=Trabalho.Status.PENDENTE).update(
+            status=Trabalho.Status.EXECUTANDO, data_inicio=agora, data_atualizacao=agora,
+            tentativas=F('tentativas') + 1,
+        ):
+            return None
+    return Trabalho.objects.get(pk=pk)
+
+
+def executar(trabalho):
+    """Executa um trabalho reservado e grava o resultado (concluído ou falhou)."""
+    try:
+        EXECUTORES[trabalho.tipo](trabalho)
+    except Exception as erro:
+        logger.exception('Trabalho %s falhou', trabalho.pk)
+        resultado = {'status': Trabalho.Status.FALHOU, 'erro': f'{type(erro).__name__}: {erro}'}
+    else:
+        resultado = {'status': Trabalho.Status.CONCLUIDO}
+    Trabalho.objects.filter(pk=trabalho.pk).update(data_conclusao=timezone.now(), **resultado)
+
+
+def processar_pendentes(limite=None):
+    """Executa os trabalhos da fila até ela esvaziar (ou até 'limite' trabalhos). Retorna quantos executou."""
+    executados = 0
+    while limite is None or executados < limite:
+        trabalho = reservar()
+        if trabalho is None:
+            break
+        executar(trabalho)
+        executados += 1
+    return executados
+
+
+def _avancar(trabalho, quantidade):
+    Trabalho.objects.filter(pk=trabalho.pk).update(
+        processados=F('processados') + quantidade, data_atualizacao=timezone.now(),
+    )
+
+
+def _excluir_tarefas(trabalho, tarefas, registrar):
+    """
+    Exclui as tarefas do queryset em lotes, das folhas para as raízes (caminho
+    decrescente): cada lote não tem subtarefas fora dele. Com 'registrar', as
+    exclusões passam pelos signals (registro para o /api/sync/ e busca), em
+    lote; sem, só saem da busca (o projeto ou cliente excluído depois já
+    cobre as tarefas no /api/sync/).
+    """
+    while True:
+        with transaction.atomic():
+            linhas = list(tarefas.order_by('-caminho').values_list('pk', 'projeto_id')[:LOTE])
+            if not linhas:
+                return
+            lote = Tarefa.objects.filter(pk__in=[pk for pk, _ in linhas])
+            if registrar:
+                with exclusoes_em_lote():
+                    lote.delete()
+            else:
+                busca.remover(lote)
+                # DELETE direto, sem o Collector nem os signals de cada tarefa
+                lote._raw_delete(lote.db)
+                incrementar_versao('projeto', *{projeto_id for _, projeto_id in linhas})
+        _avancar(trabalho, len(linhas))
+
+
+@executor(Trabalho.Tipo.EXCLUIR_TAREFA)
+def excluir_tarefa(trabalho):
+    tarefa = Tarefa.objects.filter(pk=trabalho.objeto_id).first()
+    if tarefa is None:
+        return
+    ancestrais = Tarefa.ids_do_caminho(tarefa.caminho)[:-1]
+    try:
+        _excluir_tarefas(trabalho, tarefa.subarvore(), registrar=True)
+    finally:
+        # Em lote, os contadores não são ajustados a cada exclusão
+        with transaction.atomic():
+            Tarefa.recalcular_contadores(Tarefa.objects.filter(pk__in=ancestrais))
+            Projeto.recalcular_contadores(Projeto.objects.filter(pk=tarefa.projeto_id))
+
+
+@executor(Trabalho.Tipo.EXCLUIR_PROJETO)
+def excluir_projeto(trabalho):
+    projeto = Projeto.objects.filter(pk=trabalho.objeto_id).first()
+    if projeto is None:
+        return
+    try:
+        _excluir_tarefas(trabalho, Tarefa.objects.filter(projeto=projeto), registrar=False)
+    except Exception:
+        Projeto.recalcular_contadores(Projeto.objects.filter(pk=projeto.pk))
+        raise
+    with transaction.atomic():
+        projeto.delete()
+
+
+@executor(Trabalho.Tipo.EXCLUIR_CLIENTE)
+def excluir_cliente(trabalho):
+    cliente = Cliente.objects.filter(pk=trabalho.objeto_id).first()
+    if cliente is None:
+        return
+    projetos = Projeto.objects.filter(cliente=cliente)
+    try:
+        for projeto_id in projetos.values_list('pk', flat=True):
+            _excluir_tarefas(trabalho, Tarefa.objects.filter(projeto_id=projeto_id), registrar=False)
+    except Exception:
+        Projeto.recalcular_contadores(projetos)
+        raise
+    with transaction.atomic():
+        cliente.delete()
+
+
+@executor(Trabalho.Tipo.PROPAGAR_CONCLUSAO)
+def propagar_conclusao(trabalho):
+    """Tarefa.propagar_conclusao() em lotes, na ordem do caminho, com o 'concluida' atual da tarefa."""
+    tarefa = Tarefa.objects.filter(pk=trabalho.objeto_id).first()
+    if tarefa is None:
+        return
+    concluidas = F('total_descendentes') if tarefa.concluida else Value(0)
+    ultimo = tarefa.caminho
+    try:
+        while ultimo is not None:
+            with transaction.atomic():
+                seq = Sequencia.proximo()
+                restantes = tarefa.descendentes().filter(caminho__gt=ultimo)
+                ultimo = restantes.order_by('caminho').values_list('caminho', flat=True)[LOTE - 1:LOTE].first()
+                lote = restantes if ultimo is None else restantes.filter(caminho__lte=ultimo)
+                alteradas = lote.update(concluida=tarefa.concluida, descendentes_concluidas=concluidas, seq=seq)
+                notificacoes.publicar_alteracoes(lote.filter(seq=seq))
+                incrementar_versao('projeto', tarefa.projeto_id)
+            _avancar(trabalho, alteradas)
+    finally:
+        # A própria tarefa, os ancestrais e o projeto, recontados pelo caminho
+        with transaction.atomic():
+            Tarefa.recalcular_contadores(Tarefa.objects.filter(pk__in=Tarefa.ids_do_caminho(tarefa.caminho)))
+            Projeto.recalcular_contadores(Projeto.objects.filter(pk=tarefa.projeto_id))
+
+
+# Views
+
+def tarefas_do_cliente(cliente):
+    return Projeto.objects.filter(cliente=cliente).aggregate(total=Sum('total_tarefas'))['total'] or 0
+
+
+def exclusoes_pendentes(tipo):
+    """IDs (subconsulta) dos objetos com a exclusão na fila ou em execução."""
+    return Trabalho.objects.filter(
+        tipo=tipo, status__in=(Trabalho.Status.PENDENTE, Trabalho.Status.EXECUTANDO),
+    ).values('objeto_id')
+
+
+def sem_exclusoes_pendentes(queryset):
+    """
+    O queryset de clientes, projetos ou tarefas sem os objetos cuja exclusão
+    está na fila ou em execução, nem o que está abaixo deles: em vez de
+    aparecerem encolhendo a cada lote, eles somem até o trabalho terminar
+    (e voltam, com o que restou, se ele falhar).
+    """
+    clientes = exclusoes_pendentes(Trabalho.Tipo.EXCLUIR_CLIENTE)
+    if queryset.model is Cliente:
+        return queryset.exclude(pk__in=clientes)
+    projetos = exclusoes_pendentes(Trabalho.Tipo.EXCLUIR_PROJETO)
+    if queryset.model is Projeto:
+        return queryset.exclude(pk__in=projetos).exclude(cliente_id__in=clientes)
+    # Tarefas: as das raízes com exclusão pendente e as suas descendentes, pelo caminho
+    raizes = Tarefa.objects.filter(
+        pk__in=exclusoes_pendentes(Trabalho.Tipo.EXCLUIR_TAREFA),
+        caminho=Substr(OuterRef('caminho'), 1, Length('caminho')),
+    )
+    return queryset.exclude(projeto_id__in=projetos).exclude(
+        projeto_id__in=Projeto.objects.filter(cliente_id__in=clientes).values('pk'),
+    ).exclude(Exists(raizes))
+
+
+def _versionar_exclusao_pendente(instance):
+    # As respostas em cache deixam de mostrar o objeto (ver sem_exclusoes_pendentes)
+    if isinstance(instance, Cliente):
+        incrementar_versao('cliente', instance.pk)
+        incrementar_versao_colecao('clientes')
+        incrementar_versao('projeto', *instance.projetos.values_list('pk', flat=True))
+    else:
+        incrementar_versao('projeto', instance.pk if isinstance(instance, Projeto) else instance.projeto_id)
+
+
+class ExclusaoEmSegundoPlanoMixin:
+    """
+    destroy() que enfileira a exclusão (202 com o trabalho) quando ela
+    afeta mais que LIMITE_SINCRONO tarefas; abaixo disso, exclui na hora.
+    Enquanto o trabalho não termina, o objeto e o que está abaixo dele
+    ficam fora do get_queryset() do ViewSet (sem_exclusoes_pendentes).
+
+    As subclasses definem tipo_de_exclusao e tarefas_excluidas(); a falta
+    de um deles é acusada ao importar o ViewSet.
+    """
+    tipo_de_exclusao = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.tipo_de_exclusao is None or cls.tarefas_excluidas is ExclusaoEmSegundoPlanoMixin.tarefas_excluidas:
+            raise TypeError(f'{cls.__name__} deve definir tipo_de_exclusao e tarefas_excluidas().')
+
+    def tarefas_excluidas(self, instance):
+        """Quantas tarefas a exclusão de 'instance' remove."""
+        raise NotImplementedError
+
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        total = self.tarefas_excluidas(instance)
+        if total <= LIMITE_SINCRONO:
+            self.perform_destroy(instance)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        trabalho = enfileirar(self.tipo_de_exclusao, instance.pk, request.user, total)
+        _versionar_exclusao_pendente(instance)
+        return resposta_do_trabalho(trabalho)
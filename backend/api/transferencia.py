@@ -0,0 +1,408 @@
+# backend/api/transferencia.py
+
+"""
+Exportação e importação em massa de um cliente, com seus projetos, membros
+e árvores de tarefas (GET /api/clientes/<id>/exportar/, POST
+/api/clientes/importar/ e os comandos exportar_cliente e importar_cliente).
+
+O arquivo tem um registro por linha, em NDJSON ou CSV, com o campo 'tipo':
+primeiro o cliente, depois os projetos, os membros (pelo username) e as
+tarefas, cada projeto com as suas na ordem do caminho (os pais antes dos
+filhos). Os IDs do arquivo são os do ambiente de origem: na importação,
+tudo recebe IDs novos e 'projeto' e 'tarefa_pai' são traduzidos.
+
+As duas pontas têm memória constante: a exportação lê as tarefas com
+.iterator() e gera as linhas à medida que a resposta é enviada; a
+importação lê o arquivo linha a linha e grava as tarefas em lotes
+(bulk_create), guardando a tradução dos IDs (e o caminho de cada tarefa)
+numa tabela temporária do SQLite em vez da memória. Tarefas que chegam
+antes do pai ficam pendentes até ele aparecer.
+"""
+
+import csv
+import json
+from datetime import date
+
+import orjson
+from django.contrib.auth.models import User
+from django.db import connection
+
+from . import busca
+from .cache_respostas import incrementar_versao_colecao
+from .models import Cliente, MembroProjeto, Projeto, Sequencia, Tarefa
+from .papeis import invalidar_papeis
+
+FORMATOS = ('ndjson', 'csv')
+TIPOS_DE_CONTEUDO = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Campos de cada tipo de registro; no CSV, todas as colunas juntas
+CAMPOS = {
+    'cliente': ('id', 'nome'),
+    'projeto': ('id', 'codigo_tag', 'nome_detalhado', 'data_prazo'),
+    'membro': ('projeto', 'usuario', 'papel'),
+    'tarefa': ('id', 'projeto', 'tarefa_pai', 'descricao', 'concluida', 'data_prazo'),
+}
+COLUNAS_CSV = ('tipo', *dict.fromkeys(campo for campos in CAMPOS.values() for campo in campos))
+INTEIROS = {'id', 'projeto', 'tarefa_pai'}
+
+# Tarefas lidas e gravadas por vez
+LOTE = 1000
+
+TABELA_DE_IDS = 'importacao_ids'
+
+
+class ErroDeImportacao(Exception):
+    """Arquivo inválido ou em conflito com os dados existentes (a importação é desfeita)."""
+
+    def __init__(self, mensagem, linha=None):
+        super().__init__(f'Linha {linha}: {mensagem}' if linha else mensagem)
+
+
+# Exportação
+
+def registros(cliente, projetos_ids=None):
+    """Registros (dicts) do cliente, na ordem do arquivo. Sem projetos_ids, todos os projetos do cliente."""
+    yield {'tipo': 'cliente', 'id': cliente.pk, 'nome': cliente.nome}
+    projetos = cliente.projetos.order_by('pk')
+    if projetos_ids is not None:
+        projetos = projetos.filter(pk__in=projetos_ids)
+    ids = []
+    for projeto in projetos.values(*CAMPOS['projeto']).iterator(chunk_size=LOTE):
+        ids.append(projeto['id'])
+        yield {'tipo': 'projeto', **projeto}
+    membros = MembroProjeto.objects.filter(projeto_id__in=ids).order_by('projeto_id', 'pk')
+    for projeto, usuario, papel in membros.values_list('projeto_id', 'usuario__username', 'papel').iterator(LOTE):
+        yield {'tipo': 'membro', 'projeto': projeto, 'usuario': usuario, 'papel': papel}
+    for projeto_id in ids:
+        # Pelo índice (projeto, caminho): os pais sempre antes dos filhos
+        tarefas = Tarefa.objects.filter(projeto_id=projeto_id).order_by('caminho').values(
+            'id', 'projeto_id', 'tarefa_pai_id', 'descricao', 'concluida', 'data_prazo',
+        )
+        for tarefa in tarefas.iterator(chunk_size=LOTE):
+            yield {
+                'tipo': 'tarefa', 'id': tarefa['id'], 'projeto': tarefa['projeto_id'],
+                'tarefa_pai': tarefa['tarefa_pai_id'], 'descricao': tarefa['descricao'],
+                'concluida': tarefa['concluida'], 'data_prazo': tarefa['data_prazo'],
+            }
+
+
+class _Linha:
+    """Destino do csv.writer que devolve a linha escrita em vez de guardá-la."""
+
+    def write(self, texto):
+        return texto
+
+
+def exportar(cliente, formato='ndjson', projetos_ids=None):
+    """Linhas (bytes) do arquivo de exportação, geradas sob demanda."""
+    if formato == 'csv':
+        escritor = csv.writer(_Linha())
+        yield escritor.writerow(COLUNAS_CSV).encode()
+        for registro in registros(cliente, projetos_ids):
+            yield escritor.writerow([_celula(registro.get(coluna)) for coluna in COLUNAS_CSV]).encode()
+    else:
+        for registro in registros(cliente, projetos_ids):
+            yield orjson.dumps(registro) + b'\n'
+
+
+def _celula(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    return valor
+
+
+# Importação
+
+def ler(linhas, formato='ndjson'):
+    """Registros (número da linha, dict) de um arquivo lido linha a linha (bytes ou texto)."""
+    linhas = (linha.decode('utf-8') if isinstance(linha, bytes) else linha for linha in linhas)
+    if formato == 'csv':
+        leitor = csv.DictReader(linhas)
+        for registro in leitor:
+            yield leitor.line_num, {
+                coluna: _valor_csv(coluna, valor) for coluna, valor in registro.items() if coluna is not None
+            }
+        return
+    for numero, linha in enumerate(linhas, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            raise ErroDeImportacao('JSON inválido.', numero)
+        if not isinstance(registro, dict):
+            raise ErroDeImportacao('cada linha deve ser um objeto JSON.', numero)
+        yield numero, registro
+
+
+def _valor_csv(coluna, valor):
+    if valor == '' or valor is None:
+        return None
+    if coluna == 'concluida':
+        return valor.lower() in ('true', '1')
+    return valor
+
+
+def _inteiro(registro, campo, numero, obrigatorio=True):
+    valor = registro.get(campo)
+    if valor is None and not obrigatorio:
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroDeImportacao(f"'{campo}' deve ser um número inteiro.", numero)
+
+
+def _data(registro, numero):
+    valor = registro.get('data_prazo')
+    if valor is None:
+        return None
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ErroDeImportacao("'data_prazo' deve ser uma data (AAAA-MM-DD).", numero)
+
+
+def _texto(registro, campo, numero, padrao=None):
+    valor = registro.get(campo)
+    if valor is None:
+        valor = padrao
+    if not isinstance(valor, str) or (padrao is None and not valor):
+        raise ErroDeImportacao(f"'{campo}' é obrigatório.", numero)
+    return valor
+
+
+class Resumo:
+    """O que foi criado, e os usernames de membros que não existem neste ambiente."""
+
+    def __init__(self):
+        self.cliente = None
+        self.contagens = {'clientes': 0, 'projetos': 0, 'membros': 0, 'tarefas': 0}
+        self.usuarios_nao_encontrados = set()
+
+    def como_dict(self):
+        return {
+            'cliente': self.cliente.pk if self.cliente else None,
+            **self.contagens,
+            'usuarios_nao_encontrados': sorted(self.usuarios_nao_encontrados),
+        }
+
+
+class _TabelaDeIds:
+    """Tradução dos IDs de tarefas do arquivo (origem -> destino, projeto e caminho), fora da memória."""
+
+    def __enter__(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{TABELA_DE_IDS}')
+            cursor.execute(
+                f'CREATE TEMP TABLE {TABELA_DE_IDS} '
+                '(origem INTEGER PRIMARY KEY, destino INTEGER, projeto INTEGER, caminho TEXT)'
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS temp.{TABELA_DE_IDS}')
+
+    def buscar(self, origens):
+        """{origem: (destino, projeto, caminho)} das origens já importadas."""
+        if not origens:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT origem, destino, projeto, caminho FROM {TABELA_DE_IDS} '
+                'WHERE origem IN (SELECT value FROM json_each(%s))',
+                [json.dumps(list(origens))],
+            )
+            return {origem: resto for origem, *resto in cursor.fetchall()}
+
+    def guardar(self, linhas):
+        with connection.cursor() as cursor:
+            cursor.executemany(f'INSERT INTO {TABELA_DE_IDS} VALUES (%s, %s, %s, %s)', linhas)
+
+
+class Importacao:
+    """
+    Importa um arquivo de exportação. Deve rodar dentro de uma transação: em
+    caso de erro (ErroDeImportacao), nada fica gravado.
+    """
+
+    def __init__(self, usuario):
+        self.usuario = usuario
+        self.resumo = Resumo()
+        self.projetos = {}
+        # username -> ID (None se não existe); (projeto, usuário) -> papel
+        self.usuarios = {}
+        self.membros = {}
+        self.pendentes = []
+        self.lote = []
+
+    def executar(self, registros):
+        # A primeira escrita da transação: com ela, nenhuma outra conexão
+        # grava até o fim, e os IDs reservados para as tarefas ficam livres
+        self.seq = Sequencia.proximo()
+        self.proximo_id = _maior_id(Tarefa) + 1
+        with _TabelaDeIds() as self.ids:
+            for numero, registro in registros:
+                tipo = registro.get('tipo')
+                if tipo not in CAMPOS:
+                    raise ErroDeImportacao(f"tipo desconhecido: {tipo!r}.", numero)
+                if tipo != 'cliente' and self.resumo.cliente is None:
+                    raise ErroDeImportacao('o cliente deve ser o primeiro registro.', numero)
+                getattr(self, f'_{tipo}')(registro, numero)
+            self._gravar_lote()
+            if self.pendentes:
+                numero, registro = self.pendentes[0]
+                raise ErroDeImportacao(f"tarefa_pai {registro['tarefa_pai']} não está no arquivo.", numero)
+        if self.resumo.cliente is None:
+            raise ErroDeImportacao('arquivo vazio.')
+        self._finalizar()
+        return self.resumo
+
+    def _cliente(self, registro, numero):
+        if self.resumo.cliente is not None:
+            raise ErroDeImportacao('o arquivo deve ter um único cliente.', numero)
+        nome = _texto(registro, 'nome', numero)
+        if Cliente.objects.filter(nome=nome).exists():
+            raise ErroDeImportacao(f"já existe um cliente com o nome '{nome}'.", numero)
+        self.resumo.cliente = Cliente.objects.bulk_create([
+            Cliente(nome=nome, criado_por=self.usuario, seq=self.seq),
+        ])[0]
+        self.resumo.contagens['clientes'] = 1
+
+    def _projeto(self, registro, numero):
+        origem = _inteiro(registro, 'id', numero)
+        codigo_tag = _texto(registro, 'codigo_tag', numero)
+        if origem in self.projetos:
+            raise ErroDeImportacao(f'projeto {origem} repetido.', numero)
+        if Projeto.objects.filter(codigo_tag=codigo_tag).exists():
+            raise ErroDeImportacao(f"já existe um projeto com o código '{codigo_tag}'.", numero)
+        projeto = Projeto.objects.bulk_create([Projeto(
+            cliente=self.resumo.cliente, codigo_tag=codigo_tag, seq=self.seq,
+            nome_detalhado=_texto(registro, 'nome_detalhado', numero, padrao=''),
+            data_prazo=_data(registro, numero),
+        )])[0]
+        self.projetos[origem] = projeto.pk
+        self.resumo.contagens['projetos'] += 1
+
+    def _membro(self, registro, numero):
+        projeto_id = self._projeto_importado(registro, numero)
+        username = _texto(registro, 'usuario', numero)
+        papel = registro.get('papel') or MembroProjeto.Papel.EDITOR
+        if papel not in MembroProjeto.Papel.values:
+            raise ErroDeImportacao(f'papel inválido: {papel!r}.', numero)
+        if username not in self.usuarios:
+            self.usuarios[username] = User.objects.filter(username=username).values_list('pk', flat=True).first()
+        usuario_id = self.usuarios[username]
+        if usuario_id is None:
+            self.resumo.usuarios_nao_encontrados.add(username)
+        elif (projeto_id, usuario_id) not in self.membros:
+            self.membros[projeto_id, usuario_id] = papel
+
+    def _projeto_importado(self, registro, numero, obrigatorio=True):
+        origem = _inteiro(registro, 'projeto', numero, obrigatorio)
+        if origem is None:
+            return None
+        if origem not in self.projetos:
+            raise ErroDeImportacao(f'projeto {origem} não está no arquivo.', numero)
+        return self.projetos[origem]
+
+    def _tarefa(self, registro, numero):
+        # Validada já na leitura; gravada quando o lote enche
+        registro['id'] = _inteiro(registro, 'id', numero)
+        registro['tarefa_pai'] = _inteiro(registro, 'tarefa_pai', numero, obrigatorio=False)
+        registro['projeto'] = self._projeto_importado(registro, numero, obrigatorio=registro['tarefa_pai'] is None)
+        registro['descricao'] = _texto(registro, 'descricao', numero)
+        registro['data_prazo'] = _data(registro, numero)
+        self.lote.append((numero, registro))
+        if len(self.lote) >= LOTE:
+            self._gravar_lote()
+
+    def _gravar_lote(self):
+        """
+        Grava as tarefas do lote cujos pais já são conhecidos (no banco ou no
+        próprio lote), em ordem; as demais ficam pendentes para o próximo lote.
+        """
+        lote, self.lote = self.pendentes + self.lote, []
+        if not lote:
+            return
+        origens = {registro['id'] for _, registro in lote}
+        pais = self.ids.buscar(origens | {registro['tarefa_pai'] for _, registro in lote if registro['tarefa_pai']})
+        repetidas = set(pais) & origens
+        novas, traducoes = [], []
+        while True:
+            pendentes = []
+            for numero, registro in lote:
+                origem, pai = registro['id'], registro['tarefa_pai']
+                if origem in repetidas:
+                    raise ErroDeImportacao(f'tarefa {origem} repetida.', numero)
+                if pai is not None and pai not in pais:
+                    pendentes.append((numero, registro))
+                    continue
+                destino = self.proximo_id
+                self.proximo_id += 1
+                if pai is None:
+                    projeto, pai_destino, caminho = registro['projeto'], None, Tarefa.segmento(destino)
+                else:
+                    pai_destino, projeto, caminho_do_pai = pais[pai]
+                    if registro['projeto'] not in (None, projeto):
+                        raise ErroDeImportacao('a tarefa deve estar no mesmo projeto da tarefa_pai.', numero)
+                    caminho = caminho_do_pai + Tarefa.segmento(destino)
+                novas.append(Tarefa(
+                    pk=destino, projeto_id=projeto, tarefa_pai_id=pai_destino,
+                    descricao=registro['descricao'], concluida=bool(registro.get('concluida')),
+                    data_prazo=registro['data_prazo'], caminho=caminho, seq=self.seq,
+                ))
+                # As filhas no mesmo lote encontram o pai aqui
+                pais[origem] = (destino, projeto, caminho)
+                repetidas.add(origem)
+                traducoes.append((origem, destino, projeto, caminho))
+            # Filhas que vieram antes do pai, no mesmo lote: mais uma volta
+            if len(pendentes) == len(lote):
+                break
+            lote = pendentes
+        Tarefa.objects.bulk_create(novas, batch_size=LOTE)
+        self.ids.guardar(traducoes)
+        self.resumo.contagens['tarefas'] += len(novas)
+        self.pendentes = pendentes
+
+    def _finalizar(self):
+        # Quem importa enxerga os projetos importados
+        for projeto_id in self.projetos.values():
+            self.membros.setdefault((projeto_id, self.usuario.pk), MembroProjeto.Papel.ADMIN)
+        MembroProjeto.objects.bulk_create([
+            MembroProjeto(projeto_id=projeto_id, usuario_id=usuario_id, papel=papel, seq=self.seq)
+            for (projeto_id, usuario_id), papel in self.membros.items()
+        ], batch_size=LOTE)
+        self.resumo.contagens['membros'] = len(self.membros)
+
+        # O que os signals fariam, de uma vez (como em api/dados_sinteticos.py)
+        cliente = self.resumo.cliente
+        projetos = Projeto.objects.filter(cliente=cliente)
+        tarefas = Tarefa.objects.filter(projeto__in=projetos)
+        Tarefa.recalcular_contadores(tarefas)
+        Projeto.recalcular_contadores(projetos)
+        busca.indexar(Cliente.objects.filter(pk=cliente.pk))
+        busca.indexar(projetos)
+        busca.indexar(tarefas)
+        invalidar_papeis(*{usuario_id for _, usuario_id in self.membros})
+        incrementar_versao_colecao('clientes')
+
+
+def _maior_id(modelo):
+    # Com AUTOINCREMENT, o SQLite não reutiliza IDs de linhas excluídas
+    tabela = modelo._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT MAX(COALESCE((SELECT MAX(id) FROM {tabela}), 0), '
+            'COALESCE((SELECT seq FROM sqlite_sequence WHERE name = %s), 0))',
+            [tabela],
+        )
+        return cursor.fetchone()[0]
+
+
+def importar(linhas, usuario, formato='ndjson'):
+    """Importa o arquivo (linhas em bytes ou texto) para o usuário. Deve rodar dentro de uma transação."""
+    return Importacao(usuario).executar(ler(linhas, formato))
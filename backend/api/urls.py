@@ -4,7 +4,8 @@ from django.urls import path, include
 from rest_framework_nested import routers
 from .views import (
     ClienteViewSet, ProjetoViewSet, TarefaViewSet, 
-    UserViewSet, MembroProjetoViewSet
+    UserViewSet, MembroProjetoViewSet, SincronizacaoView, BuscaView, EventosView, MetricasView,
+    DashboardView, TrabalhoViewSet,
 )
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
@@ -16,6 +17,7 @@ router.register(r'clientes', ClienteViewSet, basename='cliente')
 router.register(r'projetos', ProjetoViewSet, basename='projeto')
 router.register(r'tarefas', TarefaViewSet, basename='tarefa')
 router.register(r'users', UserViewSet, basename='user')
+router.register(r'trabalhos', TrabalhoViewSet, basename='trabalho')
 
 # Rota aninhada para membros dentro de projetos
 projetos_membros_router = routers.NestedDefaultRouter(router, r'projetos', lookup='projeto')
@@ -24,6 +26,11 @@ projetos_membros_router.register(r'membros', MembroProjetoViewSet, basename='pro
 urlpatterns = [
     path('', include(router.urls)),
     path('', include(projetos_membros_router.urls)),
+    path('sync/', SincronizacaoView.as_view(), name='sync'),
+    path('busca/', BuscaView.as_view(), name='busca'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('eventos/', EventosView.as_view(), name='eventos'),
+    path('metrics/', MetricasView.as_view(), name='metricas'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
\ No newline at end of file
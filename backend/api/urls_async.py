@@ -0,0 +1,19 @@
+# backend/api/urls_async.py
+
+# Rotas atendidas pelas views assíncronas (api/views_async.py) quando o
+# servidor é ASGI. Têm precedência sobre as mesmas rotas do router
+# (core/urls_asgi.py); as leituras só com LEITURAS_ASSINCRONAS ligado
+# (core/urls_asgi_leituras.py).
+
+from django.urls import path
+from .views_async import listar_clientes, detalhar_projeto, listar_tarefas, eventos
+
+urlpatterns = [
+    path('eventos/', eventos, name='eventos'),
+]
+
+leituras = [
+    path('clientes/', listar_clientes, name='cliente-list'),
+    path('projetos/<pk>/', detalhar_projeto, name='projeto-detail'),
+    path('tarefas/', listar_tarefas, name='tarefa-list'),
+]
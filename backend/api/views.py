@@ -1,83 +1,809 @@
 # backend/api/views.py
 
-from rest_framework import viewsets, permissions
+from datetime import timedelta
+from functools import reduce
+from itertools import groupby
+from operator import itemgetter, or_
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.contrib.auth.models import User
 from django.db import transaction
-from django.db.models import Q
-from .models import Cliente, Projeto, Tarefa, MembroProjeto
+from django.db.models import OuterRef, Q, Prefetch, Subquery
+from django.db.models.functions import Length
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from core.banco import leituras_no_primario
+from .autenticacao import JWTAuthenticationComCache
+from .models import Cliente, Projeto, Tarefa, MembroProjeto, Sequencia, Exclusao, Trabalho
+from .campos import SelecaoNaViewMixin, selecionar_colunas
+from .leitura_rapida import LeituraRapidaMixin, RendererJSONRapido
 from .serializers import (
-    ClienteSerializer, ProjetoSerializer, TarefaSerializer, UserSerializer,
-    MembroProjetoCreateUpdateSerializer
+    ClienteSerializer, ProjetoSerializer, TarefaSerializer, SubtarefaSerializer, UserSerializer,
+    MembroProjetoCreateUpdateSerializer, OperacaoTarefaSerializer, MoverTarefaSerializer, TarefaUrgenteSerializer,
+    TrabalhoSerializer
 )
-from .permissions import IsOwnerOrReadOnly, IsProjectAdminOrReadOnly, IsProjectAdmin
+from .permissions import IsOwnerOrReadOnly, IsProjectAdminOrReadOnly, IsProjectAdmin, PodeVerMetricas
+from .papeis import carregar_papeis, papeis_da_requisicao
+from .pagination import CursorPaginacaoPorPrazo, PaginacaoPorPosicao
+from .signals import excluir_subarvores
+from .trabalhos import ExclusaoEmSegundoPlanoMixin
+from . import busca, metricas, movimentacao, notificacoes, trabalhos, transferencia
+from .cache_respostas import RespostaVersionadaMixin, chave_versao, incrementar_versao
+from .metricas import MedicaoNaViewMixin
+
+
+def prefetch_projetos(queryset, selecao, colunas=False):
+    """
+    Carrega as relações pedidas dos projetos (tarefas, com ou sem subtarefas,
+    e membros) em consultas fixas, independente da quantidade de projetos.
+    Com colunas=True (leituras), só as colunas usadas na resposta. As
+    relações vêm em ordem de id, a mesma do Montador (api/leitura_rapida.py).
+    """
+    prefetches = []
+    tarefas = selecao.relacao('tarefas')
+    if tarefas is not None:
+        queryset_tarefas = Tarefa.objects.order_by('id')
+        subtarefas = tarefas.relacao('subtarefas')
+        if subtarefas is not None:
+            queryset_subtarefas = Tarefa.objects.order_by('id')
+            if colunas:
+                queryset_subtarefas = selecionar_colunas(
+                    queryset_subtarefas, SubtarefaSerializer, subtarefas, 'tarefa_pai'
+                )
+            queryset_tarefas = queryset_tarefas.prefetch_related(Prefetch('subtarefas', queryset=queryset_subtarefas))
+        if colunas:
+            queryset_tarefas = selecionar_colunas(queryset_tarefas, TarefaSerializer, tarefas, 'projeto')
+        prefetches.append(Prefetch('tarefas', queryset=queryset_tarefas))
+    if selecao.relacao('membros') is not None:
+        prefetches.append(Prefetch('adesoes', queryset=MembroProjeto.objects.select_related('usuario').order_by('id')))
+    return queryset.prefetch_related(*prefetches)
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = User.objects.all().order_by('username')
+class UserViewSet(MedicaoNaViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering_fields = ['username', 'id']
+    ordering = 'username'
 
-class MembroProjetoViewSet(viewsets.ModelViewSet):
+class MembroProjetoViewSet(MedicaoNaViewMixin, viewsets.ModelViewSet):
     serializer_class = MembroProjetoCreateUpdateSerializer
     permission_classes = [IsProjectAdmin]
+    ordering_fields = ['id']
+    ordering = 'id'
     def get_queryset(self):
         return MembroProjeto.objects.filter(projeto_id=self.kwargs['projeto_pk'])
     def perform_create(self, serializer):
         serializer.save(projeto_id=self.kwargs['projeto_pk'])
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(MedicaoNaViewMixin, SelecaoNaViewMixin, RespostaVersionadaMixin, ExclusaoEmSegundoPlanoMixin, viewsets.ModelViewSet):
     serializer_class = ClienteSerializer
     permission_classes = [IsOwnerOrReadOnly]
+    ordering_fields = ['nome', 'data_criacao', 'id']
+    ordering = 'nome'
+    tipo_de_exclusao = Trabalho.Tipo.EXCLUIR_CLIENTE
 
     def get_queryset(self):
         usuario = self.request.user
         show_all = self.request.query_params.get('all', 'false').lower() == 'true'
         if show_all:
-            return Cliente.objects.all().order_by('nome')
+            queryset = Cliente.objects.all()
         else:
             projetos_do_usuario = usuario.projetos_participados.all()
             ids_clientes = projetos_do_usuario.values_list('cliente_id', flat=True).distinct()
-            return Cliente.objects.filter(id__in=ids_clientes)
+            queryset = Cliente.objects.filter(id__in=ids_clientes)
+        queryset = trabalhos.sem_exclusoes_pendentes(queryset)
+        if self.somente_leitura:
+            queryset = selecionar_colunas(queryset, ClienteSerializer, self.selecao)
+
+        projetos = self.selecao.relacao('projetos')
+        if projetos is None:
+            return queryset
+        # Apenas os projetos dos quais o usuário é membro, com as relações pedidas
+        projetos_acessiveis = prefetch_projetos(Projeto.objects.filter(membros=usuario), projetos, self.somente_leitura)
+        if self.somente_leitura:
+            projetos_acessiveis = selecionar_colunas(projetos_acessiveis, ProjetoSerializer, projetos, 'cliente')
+        return queryset.prefetch_related(
+            Prefetch('projetos', queryset=projetos_acessiveis, to_attr='projetos_acessiveis')
+        )
 
     def perform_create(self, serializer):
         serializer.save(criado_por=self.request.user)
+    def tarefas_excluidas(self, instance):
+        return trabalhos.tarefas_do_cliente(instance)
+
+    def get_chaves_de_versao(self):
+        # Os clientes dos projetos do usuário mudam junto com as versões
+        # desses projetos (o signal do cliente as incrementa); o detalhe
+        # depende também da versão do próprio cliente, e ?all=true de todos
+        chaves = super().get_chaves_de_versao()
+        if 'pk' in self.kwargs:
+            return chaves + [chave_versao('cliente', self.kwargs['pk'])]
+        if self.request.query_params.get('all', 'false').lower() == 'true':
+            return chaves + [chave_versao('clientes')]
+        return chaves
     def get_serializer_context(self):
-        return {'request': self.request}
+        return {
+            **super().get_serializer_context(),
+            'projetos_do_usuario': papeis_da_requisicao(self.request),
+        }
+
+    def _formato(self):
+        formato = self.request.query_params.get('formato', 'ndjson')
+        if formato not in transferencia.FORMATOS:
+            raise ValidationError({'formato': f'Deve ser um de: {", ".join(transferencia.FORMATOS)}.'})
+        return formato
 
-class ProjetoViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def exportar(self, request, pk=None):
+        """
+        Exporta o cliente com os projetos do usuário, seus membros e tarefas,
+        um registro por linha (?formato=ndjson, o padrão, ou csv; ver
+        api/transferencia.py). A resposta é gerada enquanto é enviada.
+        """
+        formato = self._formato()
+        cliente = self.get_object()
+        linhas = transferencia.exportar(cliente, formato, projetos_ids=list(papeis_da_requisicao(request)))
+        response = StreamingHttpResponse(linhas, content_type=transferencia.TIPOS_DE_CONTEUDO[formato])
+        response['Content-Disposition'] = f'attachment; filename="cliente-{cliente.pk}.{formato}"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def importar(self, request):
+        """
+        Importa um arquivo de exportação (o corpo da requisição, ?formato=ndjson
+        ou csv) como um novo cliente do usuário, que passa a ser ADMIN dos
+        projetos. O corpo é lido linha a linha, sem carregá-lo inteiro; com
+        qualquer erro, nada é gravado.
+        """
+        formato = self._formato()
+        try:
+            with transaction.atomic():
+                resumo = transferencia.importar(request.stream or (), request.user, formato)
+        except transferencia.ErroDeImportacao as erro:
+            return Response({'detail': str(erro)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumo.como_dict(), status=status.HTTP_201_CREATED)
+
+class ProjetoViewSet(MedicaoNaViewMixin, SelecaoNaViewMixin, RespostaVersionadaMixin, LeituraRapidaMixin, ExclusaoEmSegundoPlanoMixin, viewsets.ModelViewSet):
     serializer_class = ProjetoSerializer
     permission_classes = [IsProjectAdminOrReadOnly]
+    ordering_fields = ['data_criacao', 'codigo_tag', 'id']
+    # Com o ID para desempate: projetos criados no mesmo instante não se
+    # repetem nem somem entre uma página e outra do cursor
+    ordering = ('data_criacao', 'id')
+    tipo_de_exclusao = Trabalho.Tipo.EXCLUIR_PROJETO
     def get_queryset(self):
-        return self.request.user.projetos_participados.all().distinct()
+        queryset = trabalhos.sem_exclusoes_pendentes(self.request.user.projetos_participados.all().distinct())
+        if self.action == 'arvore':
+            # A árvore busca as tarefas por conta própria
+            return queryset
+        queryset = prefetch_projetos(queryset, self.selecao, self.somente_leitura)
+        if self.somente_leitura:
+            queryset = selecionar_colunas(queryset, ProjetoSerializer, self.selecao)
+        return queryset
     def perform_create(self, serializer):
         projeto = serializer.save()
         projeto.membros.add(self.request.user, through_defaults={'papel': 'ADMIN'})
+    def tarefas_excluidas(self, instance):
+        return instance.total_tarefas
     def get_serializer_context(self):
-        return {'request': self.request}
+        return {
+            **super().get_serializer_context(),
+            'projetos_do_usuario': papeis_da_requisicao(self.request),
+        }
+
+    def get_chaves_de_versao(self):
+        if 'pk' not in self.kwargs:
+            return super().get_chaves_de_versao()
+        # Detalhe de um projeto: depende apenas da versão dele
+        try:
+            pk = int(self.kwargs['pk'])
+        except ValueError:
+            return None
+        if pk not in papeis_da_requisicao(self.request):
+            return None
+        return [chave_versao('projeto', pk)]
+
+    @action(detail=True, methods=['get'])
+    def arvore(self, request, pk=None):
+        """
+        Retorna as tarefas do projeto já montadas em árvore, cada uma aparecendo
+        uma única vez. Parâmetros opcionais:
+        - root: ID da tarefa a partir da qual a árvore é montada.
+        - depth: quantos níveis abaixo da raiz incluir (0 = só a raiz).
+        Nós cortados pelo 'depth' trazem 'tem_subtarefas' para expansão sob demanda.
+        """
+        return self.resposta_versionada(self._montar_arvore)
+
+    def _montar_arvore(self):
+        projeto = self.get_object()
+        root = self._parametro_inteiro('root')
+        depth = self._parametro_inteiro('depth')
 
-class TarefaViewSet(viewsets.ModelViewSet):
+        tarefas = trabalhos.sem_exclusoes_pendentes(Tarefa.objects.filter(projeto=projeto))
+        prefixo = ''
+        if root is not None:
+            raiz = tarefas.filter(pk=root).only('caminho').first()
+            if raiz is None:
+                raise NotFound('Tarefa raiz não encontrada neste projeto.')
+            prefixo = raiz.caminho
+            tarefas = tarefas & raiz.subarvore()
+        limite_caminho = None
+        if depth is not None:
+            tamanho_segmento = len(Tarefa.segmento(0))
+            caminho_base = prefixo or Tarefa.segmento(0)
+            limite_caminho = len(caminho_base) + depth * tamanho_segmento
+            # Busca um nível a mais, apenas para saber quais nós têm subtarefas
+            tarefas = tarefas.alias(tamanho=Length('caminho')).filter(
+                tamanho__lte=limite_caminho + tamanho_segmento
+            )
+
+        linhas = tarefas.order_by('caminho').values(*CAMPOS_ARVORE)
+        return Response(montar_arvore(linhas, limite_caminho))
+
+    def _parametro_inteiro(self, nome):
+        valor = self.request.query_params.get(nome)
+        if valor is None:
+            return None
+        try:
+            valor = int(valor)
+        except ValueError:
+            raise ValidationError({nome: 'Deve ser um número inteiro.'})
+        if valor < 0:
+            raise ValidationError({nome: 'Deve ser maior ou igual a zero.'})
+        return valor
+
+
+CAMPOS_ARVORE = (
+    'id', 'tarefa_pai', 'descricao', 'concluida', 'data_prazo', 'data_criacao',
+    'total_descendentes', 'descendentes_concluidas', 'caminho',
+)
+
+
+def montar_arvore(linhas, limite_caminho=None):
+    """
+    Monta a árvore em uma única passada. As linhas devem vir ordenadas pelo
+    caminho, o que garante que cada pai aparece antes de seus filhos.
+    Linhas além de 'limite_caminho' apenas marcam o pai com 'tem_subtarefas'.
+    """
+    nos = {}
+    raizes = []
+    for linha in linhas:
+        caminho = linha.pop('caminho')
+        pai = nos.get(linha['tarefa_pai'])
+        if limite_caminho is not None and len(caminho) > limite_caminho:
+            if pai is not None:
+                pai['tem_subtarefas'] = True
+            continue
+        no = {**linha, 'tem_subtarefas': False, 'subtarefas': []}
+        nos[no['id']] = no
+        if pai is None:
+            raizes.append(no)
+        else:
+            pai['tem_subtarefas'] = True
+            pai['subtarefas'].append(no)
+    return raizes
+
+class TarefaViewSet(MedicaoNaViewMixin, SelecaoNaViewMixin, RespostaVersionadaMixin, LeituraRapidaMixin, ExclusaoEmSegundoPlanoMixin, viewsets.ModelViewSet):
     serializer_class = TarefaSerializer
     permission_classes = [permissions.IsAuthenticated]
+    ordering_fields = ['id', 'data_criacao']
+    ordering = 'id'
+    tipo_de_exclusao = Trabalho.Tipo.EXCLUIR_TAREFA
+    # Prazo padrão (em dias) de /api/tarefas/urgentes/
+    HORIZONTE_URGENTES = 7
+    # Máximo de operações aceitas em /api/tarefas/bulk/
+    LIMITE_LOTE = 1000
+    # Quantas subárvores entram em cada UPDATE da cascata (limita o tamanho do SQL)
+    SUBARVORES_POR_CONSULTA = 100
 
     def get_queryset(self):
         usuario = self.request.user
         projetos_acessiveis = usuario.projetos_participados.all()
-        return Tarefa.objects.filter(projeto__in=projetos_acessiveis)
+        queryset = trabalhos.sem_exclusoes_pendentes(Tarefa.objects.filter(projeto__in=projetos_acessiveis))
+        subtarefas = self.selecao.relacao('subtarefas')
+        if subtarefas is not None:
+            queryset_subtarefas = Tarefa.objects.order_by('id')
+            if self.somente_leitura:
+                queryset_subtarefas = selecionar_colunas(
+                    queryset_subtarefas, SubtarefaSerializer, subtarefas, 'tarefa_pai'
+                )
+            queryset = queryset.prefetch_related(Prefetch('subtarefas', queryset=queryset_subtarefas))
+        if self.somente_leitura:
+            queryset = selecionar_colunas(queryset, TarefaSerializer, self.selecao)
+        return queryset
 
     @transaction.atomic
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
         if response.status_code < 400 and 'concluida' in request.data:
             instance = self.get_object()
-            novo_status = request.data.get('concluida')
-            descendentes = self.get_descendentes(instance)
-            if descendentes:
-                descendentes.update(concluida=novo_status)
+            if instance.total_descendentes > trabalhos.LIMITE_SINCRONO:
+                # Subárvore grande: a cascata vai para a fila (202, com o trabalho)
+                trabalho = trabalhos.enfileirar(
+                    Trabalho.Tipo.PROPAGAR_CONCLUSAO, instance.pk, request.user, instance.total_descendentes,
+                )
+                return trabalhos.resposta_do_trabalho(trabalho, response.data)
+            # Cascata para a subárvore, mantendo os contadores de progresso
+            seq = Sequencia.proximo()
+            instance.propagar_conclusao(seq=seq)
+            notificacoes.publicar_alteracoes(instance.descendentes().filter(seq=seq))
         return response
 
+    def perform_update(self, serializer):
+        tarefa, dados = serializer.instance, serializer.validated_data
+        projeto = dados.get('projeto', tarefa.projeto)
+        if 'tarefa_pai' in dados or projeto != tarefa.projeto:
+            # Mudança de pai ou de projeto: a subárvore inteira vai junto
+            pai = dados.pop('tarefa_pai', tarefa.tarefa_pai if projeto == tarefa.projeto else None)
+            projeto = dados.pop('projeto', None)
+            self._mover(tarefa, pai, projeto.pk if projeto else None)
+        serializer.save()
+
+    @action(detail=True, methods=['post'])
+    @transaction.atomic
+    def mover(self, request, pk=None):
+        """
+        Move a tarefa, com toda a subárvore, para baixo de outra tarefa
+        ({"tarefa_pai": id}) ou para a raiz de um projeto ({"projeto": id};
+        sem ele, o da própria tarefa). As descendentes passam para o projeto
+        de destino junto com a tarefa, num número fixo de consultas
+        (api/movimentacao.py).
+        """
+        tarefa = self.get_object()
+        serializer = MoverTarefaSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+        pai = None
+        if dados.get('tarefa_pai') is not None:
+            pai = Tarefa.objects.filter(
+                pk=dados['tarefa_pai'], projeto_id__in=list(papeis_da_requisicao(request)),
+            ).only('pk', 'projeto_id', 'caminho').first()
+            if pai is None:
+                raise ValidationError({'tarefa_pai': 'Tarefa pai não encontrada.'})
+        self._mover(tarefa, pai, dados.get('projeto'))
+        return Response(self.get_serializer(tarefa).data)
+
+    def _mover(self, tarefa, pai, projeto_id):
+        papeis = papeis_da_requisicao(self.request)
+        if pai is not None:
+            if pai.projeto_id not in papeis:
+                raise ValidationError({'tarefa_pai': 'Tarefa pai não encontrada.'})
+            if projeto_id is not None and projeto_id != pai.projeto_id:
+                raise ValidationError({'projeto': 'A tarefa fica no projeto da tarefa pai.'})
+        else:
+            projeto_id = projeto_id or tarefa.projeto_id
+            if projeto_id not in papeis:
+                raise ValidationError({'projeto': 'Projeto não encontrado.'})
+        try:
+            movimentacao.mover(tarefa, pai, projeto_id)
+        except movimentacao.MovimentoInvalido as erro:
+            raise ValidationError({'tarefa_pai': str(erro)})
+
+    def tarefas_excluidas(self, instance):
+        return instance.total_descendentes + 1
+
+    @action(detail=False, methods=['get'])
+    def urgentes(self, request):
+        """
+        Tarefas abertas, atrasadas ou com prazo nos próximos 'dias' (padrão 7),
+        de todos os projetos do usuário, ordenadas pelo prazo e paginadas.
+        A consulta usa o índice parcial de tarefas abertas (projeto, data_prazo)
+        e não chega a ler tarefas concluídas nem com prazo distante.
+        """
+        try:
+            dias = int(request.query_params.get('dias', self.HORIZONTE_URGENTES))
+        except ValueError:
+            raise ValidationError({'dias': 'Deve ser um número inteiro.'})
+
+        limite = timezone.localdate() + timedelta(days=dias)
+        tarefas = Tarefa.objects.filter(
+            projeto_id__in=list(papeis_da_requisicao(request)),
+            concluida=False,
+            data_prazo__lte=limite,
+        ).select_related('projeto').only(
+            'id', 'projeto_id', 'projeto__codigo_tag', 'tarefa_pai_id', 'descricao', 'data_prazo', 'concluida'
+        )
+
+        paginador = CursorPaginacaoPorPrazo()
+        pagina = paginador.paginate_queryset(tarefas, request)
+        if pagina is None:
+            return Response(TarefaUrgenteSerializer(tarefas.order_by(*paginador.ordering), many=True).data)
+        return paginador.get_paginated_response(TarefaUrgenteSerializer(pagina, many=True).data)
+
     def get_descendentes(self, tarefa):
-        filhas = list(tarefa.subtarefas.all())
-        descendentes = list(filhas)
-        for filha in filhas:
-            descendentes.extend(self.get_descendentes(filha))
-        ids_descendentes = [d.id for d in descendentes]
-        return Tarefa.objects.filter(id__in=ids_descendentes)
\ No newline at end of file
+        # Uma única consulta indexada pelo caminho materializado da tarefa
+        return tarefa.descendentes()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Aplica um lote de operações em tarefas numa única transação.
+        Corpo: {"operacoes": [{"op": "create" | "update" | "toggle" | "delete", ...}]}
+        - create: descricao e projeto e/ou tarefa_pai (+ concluida, data_prazo)
+        - update: id e os campos a alterar
+        - toggle: id e concluida
+        - delete: id
+        O lote é validado por inteiro antes de qualquer escrita, e a conclusão
+        em cascata é aplicada uma única vez para o lote todo.
+        """
+        dados = request.data.get('operacoes') if isinstance(request.data, dict) else None
+        serializer = OperacaoTarefaSerializer(data=dados, many=True, max_length=self.LIMITE_LOTE)
+        serializer.is_valid(raise_exception=True)
+        operacoes = serializer.validated_data
+
+        tarefas = self._carregar_tarefas_do_lote(operacoes)
+        erros = self._validar_lote(operacoes, tarefas)
+        if any(erros):
+            return Response({'operacoes': erros}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            resultados = self._aplicar_lote(operacoes, tarefas)
+        return Response({'resultados': resultados})
+
+    def _carregar_tarefas_do_lote(self, operacoes):
+        ids = {op['id'] for op in operacoes if 'id' in op}
+        ids |= {op['tarefa_pai'] for op in operacoes if op.get('tarefa_pai')}
+        papeis = papeis_da_requisicao(self.request)
+        return Tarefa.objects.filter(projeto_id__in=list(papeis), pk__in=ids).in_bulk()
+
+    def _validar_lote(self, operacoes, tarefas):
+        papeis = papeis_da_requisicao(self.request)
+        removidas = {tarefas[op['id']].caminho for op in operacoes if op['op'] == 'delete' and op['id'] in tarefas}
+        vistas = set()
+        erros = []
+        for op in operacoes:
+            erro = {}
+            tarefa = tarefas.get(op.get('id'))
+            if 'id' in op:
+                if tarefa is None:
+                    erro['id'] = 'Tarefa não encontrada.'
+                elif op['id'] in vistas:
+                    erro['id'] = 'A mesma tarefa aparece em mais de uma operação do lote.'
+                elif op['op'] != 'delete' and removida_no_lote(tarefa.caminho, removidas):
+                    erro['id'] = 'A tarefa é removida por outra operação do lote.'
+                vistas.add(op['id'])
+            if op.get('tarefa_pai'):
+                pai = tarefas.get(op['tarefa_pai'])
+                if pai is None:
+                    erro['tarefa_pai'] = 'Tarefa pai não encontrada.'
+                elif removida_no_lote(pai.caminho, removidas):
+                    erro['tarefa_pai'] = 'A tarefa pai é removida por outra operação do lote.'
+                elif tarefa is not None and pai.caminho.startswith(tarefa.caminho):
+                    erro['tarefa_pai'] = 'Uma tarefa não pode ficar abaixo dela mesma.'
+                elif op.get('projeto') and op['projeto'] != pai.projeto_id:
+                    erro['tarefa_pai'] = 'A tarefa pai é de outro projeto.'
+            if op.get('projeto') and op['projeto'] not in papeis:
+                erro['projeto'] = 'Projeto não encontrado.'
+            erros.append(erro)
+        return erros
+
+    def _aplicar_lote(self, operacoes, tarefas):
+        projetos_afetados = set()
+        # Escritas em lote não passam pelo pre_save: o lote todo recebe uma única sequência
+        seq = Sequencia.proximo()
+        resultados = [{'op': op['op'], 'id': op.get('id')} for op in operacoes]
+
+        # Remoções, com as subárvores inteiras pelo caminho: exclusões
+        # registradas de uma vez; contadores recalculados no fim
+        removidas = [tarefas[op['id']] for op in operacoes if op['op'] == 'delete']
+        projetos_afetados.update(tarefa.projeto_id for tarefa in removidas)
+        if removidas:
+            excluir_subarvores(reduce(or_, [tarefa.subarvore() for tarefa in removidas]))
+
+        # Criações
+        criacoes = [(i, op) for i, op in enumerate(operacoes) if op['op'] == 'create']
+        novas = []
+        for _, op in criacoes:
+            pai = tarefas.get(op.get('tarefa_pai'))
+            novas.append(Tarefa(
+                projeto_id=pai.projeto_id if pai else op.get('projeto'),
+                tarefa_pai=pai,
+                descricao=op['descricao'],
+                concluida=op.get('concluida', False),
+                data_prazo=op.get('data_prazo'),
+                seq=seq,
+            ))
+        if novas:
+            Tarefa.objects.bulk_create(novas)
+            Tarefa.preencher_caminhos(novas)
+            for (i, _), nova in zip(criacoes, novas):
+                resultados[i]['id'] = nova.pk
+                projetos_afetados.add(nova.projeto_id)
+
+        # Alterações (update e toggle)
+        alteradas, movidas, campos = [], [], set()
+        cascatas = []
+        for op in operacoes:
+            if op['op'] not in ('update', 'toggle'):
+                continue
+            tarefa = tarefas[op['id']]
+            tarefa.seq = seq
+            projetos_afetados.add(tarefa.projeto_id)
+            for campo in ('descricao', 'concluida', 'data_prazo'):
+                if campo in op:
+                    setattr(tarefa, campo, op[campo])
+                    campos.add(campo)
+            if 'concluida' in op:
+                cascatas.append(tarefa)
+            projeto = op.get('projeto') or tarefa.projeto_id
+            if 'tarefa_pai' in op and op['tarefa_pai'] != tarefa.tarefa_pai_id or projeto != tarefa.projeto_id:
+                # Mudança de pai ou de projeto (sem pai, para a raiz): a subárvore inteira vai junto
+                movidas.append((tarefa, tarefas.get(op.get('tarefa_pai')), projeto))
+            else:
+                alteradas.append(tarefa)
+        if alteradas and campos:
+            Tarefa.objects.bulk_update(alteradas, list(campos) + ['seq'])
+        for tarefa, pai, projeto in movidas:
+            try:
+                movimentacao.mover(tarefa, pai, projeto)
+            except movimentacao.MovimentoInvalido as erro:
+                # Ciclo formado por duas operações do mesmo lote
+                raise ValidationError({'tarefa_pai': str(erro)})
+            tarefa.save()
+        # bulk_create/bulk_update não disparam os signals que mantêm o índice de busca
+        indexadas = [tarefa.pk for tarefa in novas]
+        if 'descricao' in campos:
+            indexadas += [tarefa.pk for tarefa in alteradas]
+        if indexadas:
+            busca.indexar(Tarefa.objects.filter(pk__in=indexadas))
+        projetos_afetados.update(tarefa.projeto_id for tarefa, _, _ in movidas)
+
+        self._aplicar_cascatas(cascatas, seq)
+        projetos_afetados.discard(None)
+        # Criadas, alteradas e alcançadas pelas cascatas têm a sequência do lote
+        notificacoes.publicar_alteracoes(Tarefa.objects.filter(projeto_id__in=projetos_afetados, seq=seq))
+
+        # Contadores de progresso reconstruídos de uma vez para os projetos afetados
+        Projeto.recalcular_contadores(Projeto.objects.filter(pk__in=projetos_afetados))
+        Tarefa.recalcular_contadores(Tarefa.objects.filter(projeto_id__in=projetos_afetados))
+        incrementar_versao('projeto', *projetos_afetados)
+        return resultados
+
+    def _aplicar_cascatas(self, tarefas, seq):
+        """
+        Propaga 'concluida' para as descendentes, dos níveis mais altos para os
+        mais baixos. No fim, o valor pedido para cada tarefa do lote é
+        reaplicado, para que uma subtarefa alterada no mesmo lote prevaleça
+        sobre a cascata do seu pai.
+        """
+        def ordem(tarefa):
+            return (len(tarefa.caminho), tarefa.concluida)
+
+        for (_, concluida), grupo in groupby(sorted(tarefas, key=ordem), key=ordem):
+            grupo = list(grupo)
+            for inicio in range(0, len(grupo), self.SUBARVORES_POR_CONSULTA):
+                fatia = grupo[inicio:inicio + self.SUBARVORES_POR_CONSULTA]
+                reduce(or_, [tarefa.descendentes() for tarefa in fatia]).update(concluida=concluida, seq=seq)
+
+        if len(tarefas) > 1:
+            for concluida in (True, False):
+                ids = [tarefa.pk for tarefa in tarefas if tarefa.concluida == concluida]
+                if ids:
+                    Tarefa.objects.filter(pk__in=ids).update(concluida=concluida, seq=seq)
+
+
+def removida_no_lote(caminho, caminhos_removidos):
+    """Indica se o caminho está dentro de alguma das subárvores removidas."""
+    tamanho = len(Tarefa.segmento(0))
+    return any(caminho[:fim] in caminhos_removidos for fim in range(tamanho, len(caminho) + 1, tamanho))
+
+
+class SincronizacaoView(MedicaoNaViewMixin, APIView):
+    """
+    GET /api/sync/?since=<seq>
+
+    Retorna apenas o que mudou depois da sequência informada (0 = tudo) e que
+    o usuário pode ver, além das exclusões no mesmo intervalo. O valor de
+    'seq' da resposta deve ser usado como 'since' na próxima chamada.
+    Um projeto listado em 'exclusoes' (ou do qual o usuário deixou de ser
+    membro) deve ser descartado localmente junto com suas tarefas.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # Os mesmos campos dos eventos de /api/eventos/
+    CAMPOS = dict(notificacoes.CAMPOS.values())
+
+    def get(self, request):
+        # No primário, como a Sequencia: alterações lidas de uma réplica
+        # atrasada ficariam para trás do 'seq' devolvido, e nunca chegariam
+        with leituras_no_primario():
+            return self.alteracoes(request)
+
+    def alteracoes(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            raise ValidationError({'since': 'Deve ser um número inteiro.'})
+
+        # Lida antes das consultas: alterações feitas durante a resposta
+        # ficam para a próxima sincronização
+        seq = Sequencia.atual()
+        intervalo = Q(seq__gt=since, seq__lte=seq)
+        projetos = list(papeis_da_requisicao(request))
+        usuario = request.user
+
+        querysets = {
+            'clientes': Cliente.objects.filter(intervalo),
+            'projetos': Projeto.objects.filter(intervalo, id__in=projetos),
+            'tarefas': Tarefa.objects.filter(intervalo, projeto_id__in=projetos),
+            'membros': MembroProjeto.objects.filter(intervalo, projeto_id__in=projetos),
+        }
+        dados = {
+            nome: list(queryset.order_by('seq').values(*self.CAMPOS[nome]))
+            for nome, queryset in querysets.items()
+        }
+
+        # Projetos que o usuário deixou de acessar (saiu ou foram excluídos)
+        saidas = Exclusao.objects.filter(
+            intervalo, tipo=Exclusao.Tipo.MEMBRO, usuario_id=usuario.pk
+        ).values('projeto_id')
+        exclusoes = Exclusao.objects.filter(intervalo).filter(
+            Q(tipo=Exclusao.Tipo.CLIENTE)
+            | Q(projeto_id__in=projetos)
+            | Q(tipo=Exclusao.Tipo.MEMBRO, usuario_id=usuario.pk)
+            | Q(tipo=Exclusao.Tipo.PROJETO, objeto_id__in=saidas)
+        )
+        dados['exclusoes'] = [
+            {'tipo': tipo, 'id': objeto_id, 'projeto': projeto_id, 'seq': seq_exclusao}
+            for tipo, objeto_id, projeto_id, seq_exclusao in exclusoes.order_by('seq').values_list(
+                'tipo', 'objeto_id', 'projeto_id', 'seq'
+            )
+        ]
+        return Response({'seq': seq, **dados})
+
+
+class DashboardView(MedicaoNaViewMixin, RespostaVersionadaMixin, APIView):
+    """
+    GET /api/dashboard/
+
+    Resumo da página inicial: os projetos do usuário agrupados por cliente,
+    cada um com os contadores de tarefas e o prazo de tarefa aberta mais
+    próximo (sem as tarefas, buscadas quando o projeto é aberto), e a lista
+    de todos os clientes (id e nome) para os formulários. Duas consultas,
+    com cache e ETag como as listagens dos ViewSets.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [RendererJSONRapido, BrowsableAPIRenderer]
+    colecoes_versionadas = ('clientes',)
+
+    CAMPOS_PROJETO = (
+        'id', 'codigo_tag', 'nome_detalhado', 'data_prazo', 'total_tarefas', 'tarefas_concluidas', 'proximo_prazo',
+    )
+
+    def get(self, request):
+        return self.resposta_versionada(lambda: Response(self.montar()))
+
+    def montar(self):
+        # Pelo índice parcial de tarefas abertas (projeto, data_prazo)
+        proximo_prazo = Tarefa.objects.filter(
+            projeto=OuterRef('pk'), concluida=False, data_prazo__isnull=False,
+        ).order_by('data_prazo').values('data_prazo')[:1]
+        projetos = Projeto.objects.filter(pk__in=list(papeis_da_requisicao(self.request))).annotate(
+            proximo_prazo=Subquery(proximo_prazo),
+        ).order_by('cliente__nome', 'id').values('cliente_id', 'cliente__nome', *self.CAMPOS_PROJETO)
+
+        clientes = [
+            {
+                'id': cliente_id,
+                'nome': nome,
+                'projetos': [{campo: projeto[campo] for campo in self.CAMPOS_PROJETO} for projeto in grupo],
+            }
+            for (cliente_id, nome), grupo in groupby(projetos, key=itemgetter('cliente_id', 'cliente__nome'))
+        ]
+        return {
+            'clientes': clientes,
+            'todos_os_clientes': list(Cliente.objects.order_by('nome').values('id', 'nome')),
+        }
+
+
+class BuscaView(MedicaoNaViewMixin, APIView):
+    """
+    GET /api/busca/?q=<texto>[&tipo=tarefa|projeto|cliente]
+
+    Busca textual em tarefas, projetos e clientes, pelo índice FTS5
+    (api/busca.py). Todas as palavras precisam aparecer; a última vale
+    como prefixo. Retorna só o que está nos projetos do usuário (e os clientes
+    desses projetos), do mais ao menos relevante, paginado por limit/offset.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        texto = request.query_params.get('q', '').strip()
+        if not texto:
+            raise ValidationError({'q': 'Informe o texto da busca.'})
+        tipo = request.query_params.get('tipo')
+        if tipo is not None and tipo not in busca.TIPOS:
+            raise ValidationError({'tipo': f'Deve ser um de: {", ".join(busca.TIPOS)}.'})
+
+        resultados = busca.ResultadosDaBusca(texto, papeis_da_requisicao(request), tipo)
+        paginador = PaginacaoPorPosicao()
+        pagina = paginador.paginate_queryset(resultados, request, view=self)
+        return paginador.get_paginated_response(pagina)
+
+
+class JWTDoEventSource(JWTAuthenticationComCache):
+    """
+    JWTAuthenticationComCache que aceita também o token em ?token=, já que o
+    EventSource do navegador não envia cabeçalhos. Usado só em /api/eventos/.
+    """
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        token = request.GET.get('token')
+        if header is None and token:
+            return f'{jwt_settings.AUTH_HEADER_TYPES[0]} {token}'.encode()
+        return header
+
+
+class RendererDeEventos(JSONRenderer):
+    """Aceita 'Accept: text/event-stream' (EventSource); erros saem em JSON."""
+    media_type = 'text/event-stream'
+    format = 'eventos'
+
+
+def resposta_de_eventos(conteudo):
+    response = StreamingHttpResponse(conteudo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Sem buffer em proxies (nginx), para os eventos chegarem na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventosView(MedicaoNaViewMixin, APIView):
+    """
+    GET /api/eventos/
+
+    Fluxo de server-sent events com as alterações que o usuário pode ver
+    (api/notificacoes.py). A primeira mensagem ('conectado') traz a
+    sequência atual: se for maior que a última que o cliente conhece, ele
+    deve chamar /api/sync/?since=<última> para buscar o que perdeu. Depois,
+    cada mensagem 'alteracoes' tem o formato da resposta do /api/sync/, e
+    'sincronizar' pede uma nova chamada ao /api/sync/.
+
+    Sob WSGI cada conexão ocupa uma thread; em produção sirva por ASGI
+    (api/views_async.py).
+    """
+    authentication_classes = [JWTDoEventSource]
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [JSONRenderer, RendererDeEventos]
+
+    def get(self, request):
+        return resposta_de_eventos(notificacoes.fluxo(request.user.pk, carregar_papeis(request.user)))
+
+
+class MetricasView(MedicaoNaViewMixin, APIView):
+    """
+    GET /api/metrics/
+
+    Histogramas por rota do tempo das requisições e de cada fase, e do
+    número de consultas SQL (api/metricas.py), no formato de texto do
+    Prometheus. Acesso para usuários staff ou com o METRICAS_TOKEN.
+    """
+    authentication_classes = [metricas.TokenDeMetricas, JWTAuthenticationComCache]
+    permission_classes = [PodeVerMetricas]
+    renderer_classes = [metricas.RendererPrometheus]
+
+    def get(self, request):
+        return Response(metricas.registro.exportar())
+
+
+class TrabalhoViewSet(MedicaoNaViewMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    GET /api/trabalhos/ e /api/trabalhos/<id>/
+
+    Trabalhos em segundo plano do usuário (api/trabalhos.py): as exclusões e
+    cascatas grandes respondem 202 com um deles, e o frontend acompanha o
+    status e o progresso (processados/total) até 'concluido' ou 'falhou'.
+    """
+    serializer_class = TrabalhoSerializer
+    ordering_fields = ['id']
+    ordering = '-id'
+
+    def get_queryset(self):
+        return Trabalho.objects.filter(usuario=self.request.user)
@@ -0,0 +1,179 @@
+# backend/api/views_async.py
+
+"""
+Leituras assíncronas dos endpoints mais acessados (lista de clientes,
+detalhe de projeto e lista de tarefas), servidas sob ASGI no lugar do GET
+dos ViewSets, com LEITURAS_ASSINCRONAS ligado (ver core/urls_asgi_leituras.py).
+
+Consultas, cache e versões são aguardados com as APIs assíncronas do Django
+(aget, aiterator com prefetch, cache.aget...), sem prender uma thread
+durante a requisição inteira. O resto (queryset, ordenação, permissões,
+serializers, negociação do formato e limites de requisições) vem do
+próprio ViewSet, então a resposta é a mesma do caminho síncrono. Os demais
+métodos (POST, PATCH...) e os formatos que não são JSON (a API navegável)
+são repassados para o ViewSet.
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+
+from .autenticacao import JWTAuthenticationComCache
+from .leitura_rapida import LeituraRapidaMixin, RendererJSONRapido
+from .metricas import medir
+from .notificacoes import afluxo
+from .papeis import acarregar_papeis, apapeis_da_requisicao
+from .views import ClienteViewSet, JWTDoEventSource, ProjetoViewSet, TarefaViewSet, resposta_de_eventos
+
+# Linhas buscadas por vez quando a lista não é paginada (?paginate=false)
+LINHAS_POR_LOTE = 2000
+
+# Com os métodos assíncronos (aauthenticate) e o mesmo cache do caminho síncrono
+autenticacao = JWTAuthenticationComCache()
+autenticacao_de_eventos = JWTDoEventSource()
+
+
+def _resposta(dados, status_code=status.HTTP_200_OK, headers=None, renderer=None, media_type=None):
+    # Os mesmos bytes da resposta dos ViewSets (RendererJSONRapido = JSONRenderer com orjson)
+    renderer = renderer or RendererJSONRapido()
+    media_type = media_type or renderer.media_type
+    with medir('renderizacao'):
+        conteudo = b'' if dados is None else renderer.render(dados, media_type, {})
+    return HttpResponse(conteudo, status=status_code, content_type=media_type, headers=headers)
+
+
+def _resposta_de_erro(exc, headers=None):
+    dados = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        # Como o DRF: o 401 vem acompanhado do desafio de autenticação
+        headers = {**(headers or {}), 'WWW-Authenticate': autenticacao.authenticate_header(None)}
+    return _resposta(dados, exc.status_code, headers)
+
+
+async def _autenticar(request, autenticador=autenticacao):
+    # force_authenticate() do APIClient (testes), como faz o Request do DRF
+    usuario = getattr(request, '_force_auth_user', None)
+    if usuario is not None:
+        return usuario
+    with medir('autenticacao'):
+        resultado = await autenticador.aauthenticate(request)
+    if resultado is None:
+        raise NotAuthenticated()
+    return resultado[0]
+
+
+def _leitura_rapida(view):
+    return isinstance(view, LeituraRapidaMixin) and view.usar_leitura_rapida()
+
+
+async def _listar(view):
+    if _leitura_rapida(view):
+        # Linhas de values() montadas pelo Montador (api/leitura_rapida.py)
+        montador = view.get_montador()
+        queryset = view.get_queryset_rapido(montador)
+        montar = montador.amontar
+    else:
+        queryset = view.filter_queryset(view.get_queryset())
+
+        async def montar(objetos):
+            return view.get_serializer(objetos, many=True).data
+    paginador = view.paginator
+    pagina = await paginador.apaginate_queryset(queryset, view.request, view=view)
+    if pagina is None:
+        return await montar([obj async for obj in queryset.aiterator(chunk_size=LINHAS_POR_LOTE)])
+    return paginador.get_paginated_response(await montar(pagina)).data
+
+
+async def _detalhar(view):
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    filtro = {view.lookup_field: view.kwargs[lookup_url_kwarg]}
+    montador = view.get_montador() if _leitura_rapida(view) else None
+    if montador is None:
+        queryset = view.filter_queryset(view.get_queryset())
+    else:
+        queryset = view.get_queryset_rapido(montador)
+    try:
+        # O prefetch_related do queryset é feito na mesma chamada
+        obj = await queryset.aget(**filtro)
+    except (ObjectDoesNotExist, ValueError, TypeError, DjangoValidationError):
+        raise NotFound(f'No {queryset.model._meta.object_name} matches the given query.')
+    if montador is None:
+        view.check_object_permissions(view.request, obj)
+        return view.get_serializer(obj).data
+    view.verificar_permissoes_da_linha(obj)
+    return (await montador.amontar([obj]))[0]
+
+
+LEITURAS = {'list': _listar, 'retrieve': _detalhar}
+
+
+def leitura_assincrona(viewset, acoes):
+    """
+    View assíncrona para uma rota de ViewSet: o GET (acoes['get'], 'list' ou
+    'retrieve') é atendido aqui; os outros métodos vão para o ViewSet.
+    """
+    view_sincrona = sync_to_async(viewset.as_view(acoes))
+    acao = acoes['get']
+    # Como no ViewSet.as_view(): o HEAD usa a ação do GET
+    acoes = {'head': acao, **acoes}
+
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return await view_sincrona(request, *args, **kwargs)
+
+        instancia = viewset(action=acao, action_map=acoes, args=args, kwargs=kwargs, format_kwarg=None)
+        for metodo, nome_da_acao in acoes.items():
+            setattr(instancia, metodo, getattr(instancia, nome_da_acao))
+        drf_request = instancia.request = instancia.initialize_request(request, *args, **kwargs)
+        headers = instancia.default_response_headers
+        try:
+            # Como o initial() do DRF: formato (?format=, Accept), versão, autenticação, permissões e limites
+            instancia.format_kwarg = instancia.get_format_suffix(**kwargs)
+            renderer, media_type = instancia.perform_content_negotiation(drf_request)
+            if not isinstance(renderer, JSONRenderer):
+                # Ex: a API navegável (text/html), renderizada pelo ViewSet
+                return await view_sincrona(request, *args, **kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = renderer, media_type
+            drf_request.version, drf_request.versioning_scheme = instancia.determine_version(drf_request, *args, **kwargs)
+            drf_request.user = await _autenticar(request)
+            instancia.check_permissions(drf_request)
+            if instancia.get_throttles():
+                await sync_to_async(instancia.check_throttles)(drf_request)
+            await apapeis_da_requisicao(drf_request)
+            dados, etag = await instancia.aresposta_versionada(lambda: LEITURAS[acao](instancia))
+        except Http404 as exc:
+            # Ex: ?format= desconhecido; como o exception_handler do DRF
+            return _resposta_de_erro(NotFound(*exc.args), headers)
+        except APIException as exc:
+            return _resposta_de_erro(exc, headers)
+
+        if etag is not None:
+            headers['ETag'] = etag
+        if dados is None:
+            return _resposta(None, status.HTTP_304_NOT_MODIFIED, headers, renderer, media_type)
+        return _resposta(dados, headers=headers, renderer=renderer, media_type=media_type)
+
+    return view
+
+
+listar_clientes = leitura_assincrona(ClienteViewSet, {'get': 'list', 'post': 'create'})
+detalhar_projeto = leitura_assincrona(ProjetoViewSet, {
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+})
+listar_tarefas = leitura_assincrona(TarefaViewSet, {'get': 'list', 'post': 'create'})
+
+
+@require_GET
+async def eventos(request):
+    """O /api/eventos/ (ver EventosView) sob ASGI: as conexões abertas não ocupam threads."""
+    try:
+        usuario = await _autenticar(request, autenticacao_de_eventos)
+    except APIException as exc:
+        return _resposta_de_erro(exc)
+    return resposta_de_eventos(afluxo(usuario.pk, await acarregar_papeis(usuario)))
@@ -0,0 +1,158 @@
+# backend/core/banco.py
+
+"""
+Perfis do banco SQLite e roteamento de leituras para a réplica.
+
+O perfil é escolhido pela variável de ambiente DB_PERFIL (ver settings.py):
+- 'desenvolvimento' (padrão): SQLite sem ajustes, como vem no Django.
+- 'producao': WAL, busy_timeout, synchronous=NORMAL, mmap e cache maiores,
+  transações IMMEDIATE e conexões persistentes. Com DB_REPLICA apontando
+  para uma cópia do arquivo, as leituras de requisições GET/HEAD/OPTIONS
+  vão para a réplica e todo o resto (inclusive leituras de requisições de
+  escrita) continua no primário.
+
+O que vai para um cache (mapa de papéis, usuário autenticado, respostas
+versionadas) é lido do primário, com leituras_no_primario(): as versões
+que chaveiam esses caches mudam no primário, e dados atrasados da réplica
+ficariam guardados sob as versões novas até expirar.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA = 'replica'
+
+# Aplicados a cada nova conexão (OPTIONS['init_command'])
+PRAGMAS_PRODUCAO = {
+    # Leitores não bloqueiam o escritor nem são bloqueados por ele
+    'journal_mode': 'WAL',
+    # Em WAL, NORMAL só sincroniza no checkpoint: seguro contra corrupção,
+    # podendo perder apenas as últimas transações numa queda de energia
+    'synchronous': 'NORMAL',
+    # Espera (ms) pelo lock em vez de falhar com "database is locked"
+    'busy_timeout': 10000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negativo = em KiB (64 MiB por conexão)
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def _init_command(pragmas):
+    return ' '.join(f'PRAGMA {nome} = {valor};' for nome, valor in pragmas.items())
+
+
+def perfil_producao(nome, replica=None):
+    """Configuração de DATABASES para o perfil de produção."""
+    bancos = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': nome,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': _init_command(PRAGMAS_PRODUCAO),
+                # Escritas pegam o lock no BEGIN: sem o erro imediato de
+                # "database is locked" quando duas transações tentam promover
+                # uma leitura a escrita ao mesmo tempo
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': PRAGMAS_PRODUCAO['busy_timeout'] / 1000,
+            },
+        },
+    }
+    if replica:
+        pragmas = {
+            nome: valor for nome, valor in PRAGMAS_PRODUCAO.items()
+            if nome not in ('journal_mode', 'synchronous')
+        }
+        pragmas['query_only'] = 'ON'
+        bancos[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': replica,
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': _init_command(pragmas),
+                'timeout': PRAGMAS_PRODUCAO['busy_timeout'] / 1000,
+            },
+            # Não cria um banco de teste só para a réplica. Os testes devem
+            # rodar sem DB_REPLICA: dentro da transação de um TestCase a
+            # réplica não enxerga o que o teste gravou no primário.
+            'TEST': {'MIRROR': 'default'},
+        }
+    return bancos
+
+
+_leitura_na_replica = ContextVar('leitura_na_replica', default=False)
+
+METODOS_DE_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+@contextmanager
+def leituras_no_primario():
+    """Dentro do bloco, as leituras usam o primário mesmo em requisições de leitura."""
+    token = _leitura_na_replica.set(False)
+    try:
+        yield
+    finally:
+        _leitura_na_replica.reset(token)
+
+
+class RoteadorDeReplica:
+    """
+    Leituras feitas durante requisições de leitura (marcadas pelo
+    LeituraNaReplicaMiddleware) vão para a réplica, se houver uma
+    configurada. Escritas, migrações e qualquer leitura fora dessas
+    requisições (comandos, requisições de escrita) usam o primário.
+
+    A réplica pode estar atrasada em relação ao primário: quem a mantém
+    (cópia periódica, Litestream, LiteFS...) define o quanto. Por isso o
+    que é guardado em cache é lido dentro de leituras_no_primario().
+    """
+
+    def db_for_read(self, model, **hints):
+        if _leitura_na_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class LeituraNaReplicaMiddleware:
+    """Marca as requisições de leitura para o RoteadorDeReplica."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        token = _leitura_na_replica.set(request.method in METODOS_DE_LEITURA)
+        try:
+            return self.get_response(request)
+        finally:
+            _leitura_na_replica.reset(token)
+
+    async def __acall__(self, request):
+        # O ContextVar acompanha as consultas feitas em sync_to_async
+        token = _leitura_na_replica.set(request.method in METODOS_DE_LEITURA)
+        try:
+            return await self.get_response(request)
+        finally:
+            _leitura_na_replica.reset(token)
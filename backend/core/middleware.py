@@ -0,0 +1,34 @@
+# backend/core/middleware.py
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+class UrlsAssincronasMiddleware:
+    """
+    Sob ASGI, resolve as rotas por core/urls_asgi.py (o /api/eventos/
+    assíncrono) ou, com LEITURAS_ASSINCRONAS, por core/urls_asgi_leituras.py,
+    em que os GETs mais acessados são atendidos pelas views assíncronas de
+    api/views_async.py. Sob WSGI não faz nada: as views assíncronas
+    precisariam de um event loop por requisição.
+    """
+    sync_capable = True
+    async_capable = True
+
+    URLCONF = 'core.urls_asgi'
+    URLCONF_LEITURAS = 'core.urls_asgi_leituras'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.urlconf = self.URLCONF_LEITURAS if settings.LEITURAS_ASSINCRONAS else self.URLCONF
+        return await self.get_response(request)
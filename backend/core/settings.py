@@ -1,5 +1,8 @@
+import os
 from pathlib import Path
 
+from .banco import perfil_producao
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-+%b!0oh!%!7(t#qe^l7cz%bpvof$)o)5^j=2l@wxe(!slsmk71'
@@ -10,11 +13,16 @@ ALLOWED_HOSTS = []
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT com o token e o usuário em cache (api/autenticacao.py)
+        'api.autenticacao.JWTAuthenticationComCache',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPaginacao',
+    'DEFAULT_FILTER_BACKENDS': [
+        'rest_framework.filters.OrderingFilter',
+    ],
 }
 
 INSTALLED_APPS = [
@@ -35,9 +43,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro: mede a requisição inteira (api/metricas.py)
+    'api.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'core.banco.LeituraNaReplicaMiddleware',
+    'core.middleware.UrlsAssincronasMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -67,10 +79,55 @@ WSGI_APPLICATION = 'core.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DB_NOME', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Perfil do banco (core/banco.py). DB_PERFIL=producao liga WAL, busy_timeout,
+# transações IMMEDIATE e conexões persistentes; DB_REPLICA (caminho de uma
+# cópia do arquivo) manda as leituras das requisições GET para a réplica.
+# DB_NOME troca o arquivo do primário.
+if os.environ.get('DB_PERFIL') == 'producao':
+    DATABASES = perfil_producao(DATABASES['default']['NAME'], replica=os.environ.get('DB_REPLICA'))
+
+DATABASE_ROUTERS = ['core.banco.RoteadorDeReplica']
+
+# Cache usado pelo mapa de papéis dos usuários (api/papeis.py) e pelas
+# versões de projetos/clientes (api/cache_respostas.py).
+# Em produção com vários processos, use um backend compartilhado
+# (ex: Redis ou FileBasedCache) para que a invalidação valha para todos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Respostas GET já serializadas (api/cache_respostas.py), chaveadas por
+    # usuário e versão. Pode ser trocado por FileBasedCache, Redis etc.
+    'respostas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'respostas',
+    },
+    # Tokens JWT validados e usuários autenticados (api/autenticacao.py).
+    # LRU limitado: cada usuário ativo ocupa uma entrada e cada token outra.
+    'autenticacao': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'autenticacao',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Métricas por requisição (api/metricas.py). METRICAS_TOKEN libera o
+# /api/metrics/ para o Prometheus ('Authorization: Bearer <token>'); sem
+# ele, só usuários staff. METRICAS_LENTAS_MS liga o log (logger
+# 'api.lentas') das requisições que levam pelo menos esse tempo, com o SQL.
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+METRICAS_LENTAS_MS = float(os.environ['METRICAS_LENTAS_MS']) if os.environ.get('METRICAS_LENTAS_MS') else None
+
+# Sob ASGI, atende os GETs de clientes, detalhe de projeto e tarefas pelas
+# views assíncronas de api/views_async.py (core.middleware.UrlsAssincronasMiddleware).
+# Desligado por padrão: no benchmark_asgi, os ViewSets sob o mesmo servidor
+# ASGI tiveram mais vazão e menos latência com o SQLite local.
+LEITURAS_ASSINCRONAS = os.environ.get('LEITURAS_ASSINCRONAS') == '1'
+
 
 # ... (Seção AUTH_PASSWORD_VALIDATORS, Internationalization, Static files sem mudanças) ...
 AUTH_PASSWORD_VALIDATORS = [
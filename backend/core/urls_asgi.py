@@ -0,0 +1,11 @@
+# URLs usadas quando o servidor é ASGI (ver core.middleware.UrlsAssincronasMiddleware):
+# as mesmas de core/urls.py, com o /api/eventos/ assíncrono na frente.
+
+from django.urls import path, include
+
+from .urls import urlpatterns as urlpatterns_sincronas
+
+urlpatterns = [
+    path('api/', include('api.urls_async')),
+    *urlpatterns_sincronas,
+]
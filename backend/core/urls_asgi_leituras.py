@@ -0,0 +1,13 @@
+# URLs usadas sob ASGI com LEITURAS_ASSINCRONAS ligado (ver
+# core.middleware.UrlsAssincronasMiddleware): as de core/urls_asgi.py, com as
+# leituras assíncronas de api/views_async.py na frente.
+
+from django.urls import path, include
+
+from api.urls_async import leituras
+from .urls_asgi import urlpatterns as urlpatterns_asgi
+
+urlpatterns = [
+    path('api/', include(leituras)),
+    *urlpatterns_asgi,
+]
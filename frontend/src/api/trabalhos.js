@@ -0,0 +1,18 @@
+// frontend/src/api/trabalhos.js
+
+import apiClient from './axiosConfig';
+
+// Exclusões e conclusões em cascata grandes respondem 202 com um trabalho em
+// segundo plano (no corpo, ou no campo 'trabalho' junto com a tarefa). A
+// promessa resolve quando ele termina e rejeita se ele falhar; para as
+// demais respostas, resolve na hora.
+export const aguardarTrabalho = async (response, intervaloMs = 1000) => {
+    if (response.status !== 202) return null;
+    const { id } = response.data.trabalho || response.data;
+    for (;;) {
+        const { data } = await apiClient.get(`/trabalhos/${id}/`);
+        if (data.status === 'concluido') return data;
+        if (data.status === 'falhou') throw new Error(data.erro || 'O trabalho falhou.');
+        await new Promise(resolve => setTimeout(resolve, intervaloMs));
+    }
+};
@@ -37,8 +37,8 @@ function ManageMembersDialog({ project, open, onClose }) {
                 setError('');
                 try {
                     const [membersResponse, usersResponse] = await Promise.all([
-                        apiClient.get(`/projetos/${project.id}/membros/`),
-                        apiClient.get('/users/')
+                        apiClient.get(`/projetos/${project.id}/membros/?paginate=false`),
+                        apiClient.get('/users/?paginate=false')
                     ]);
                     
                     const memberDetails = membersResponse.data.map(member => {
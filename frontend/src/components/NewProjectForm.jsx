@@ -23,7 +23,7 @@ function NewProjectForm({ clients = [], onProjectAdded, onCancel }) {
             return;
         }
         try {
-            const response = await apiClient.post('/projetos/', {
+            const response = await apiClient.post('/projetos/?expand=tarefas', {
                 cliente: selectedClient,
                 codigo_tag: codigoTag,
                 nome_detalhado: nomeDetalhado,
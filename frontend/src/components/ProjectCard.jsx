@@ -21,7 +21,7 @@ import ManageMembersDialog from './ManageMembersDialog';
 import { getPriorityInfo } from '../utils/priority';
 
 
-function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle, onTaskEdit, onTaskDelete, onTaskAdd }) {
+function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle, onTaskEdit, onTaskDelete, onTaskAdd, onTasksLoad }) {
     const [isExpanded, setIsExpanded] = useState(false);
     const [replyingTo, setReplyingTo] = useState(null);
     const [isTaskModalOpen, setIsTaskModalOpen] = useState(false);
@@ -34,7 +34,15 @@ function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle,
     const [isMembersModalOpen, setIsMembersModalOpen] = useState(false);
 
     const projectStats = useMemo(() => {
-        if (!project.tarefas || project.tarefas.length === 0) {
+        if (!project.tarefas) {
+            // Resumo do /api/dashboard/: as tarefas ainda não foram carregadas
+            return {
+                completedTasks: project.tarefas_concluidas || 0,
+                totalTasks: project.total_tarefas || 0,
+                nearestDeadline: project.proximo_prazo ? new Date(project.proximo_prazo) : null
+            };
+        }
+        if (project.tarefas.length === 0) {
             return { completedTasks: 0, totalTasks: 0, nearestDeadline: null };
         }
         const completedTasks = project.tarefas.filter(t => t.concluida).length;
@@ -46,7 +54,7 @@ function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle,
             ? new Date(Math.min.apply(null, upcomingDeadlines))
             : null;
         return { completedTasks, totalTasks, nearestDeadline };
-    }, [project.tarefas]);
+    }, [project.tarefas, project.tarefas_concluidas, project.total_tarefas, project.proximo_prazo]);
 
     const projectPriorityInfo = getPriorityInfo(project.data_prazo);
     const nearestTaskDeadlineInfo = getPriorityInfo(projectStats.nearestDeadline);
@@ -73,6 +81,11 @@ function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle,
         setIsTaskModalOpen(false);
     };
 
+    const handleToggleExpanded = () => {
+        if (!isExpanded && !project.tarefas && onTasksLoad) onTasksLoad(project.id);
+        setIsExpanded(!isExpanded);
+    };
+
     const handleMenuOpen = (e) => { e.stopPropagation(); setMenuAnchorEl(e.currentTarget); };
     const handleMenuClose = () => setMenuAnchorEl(null);
     const handleEditClick = () => { setIsEditingProject(true); handleMenuClose(); };
@@ -102,13 +115,13 @@ function ProjectCard({ project, onProjectUpdate, onProjectDelete, onTaskToggle,
     return (
         <>
             <Card sx={{ mb: 2 }}>
-                <Box sx={{ p: 2, position: 'relative', '&:hover .options-button': { opacity: 1 } }} onClick={() => setIsExpanded(!isExpanded)} style={{ cursor: 'pointer' }}>
+                <Box sx={{ p: 2, position: 'relative', '&:hover .options-button': { opacity: 1 } }} onClick={handleToggleExpanded} style={{ cursor: 'pointer' }}>
                     <IconButton className="options-button" aria-label="opções do projeto" onClick={handleMenuOpen} sx={{ position: 'absolute', top: 4, right: 4, opacity: 0, transition: 'opacity 0.2s' }}><MoreVertIcon /></IconButton>
                     <Box sx={{ pr: '40px' }}>
                         <Typography variant="h6">{project.codigo_tag}</Typography>
                         <Typography color="text.secondary" variant="body2">{project.nome_detalhado}</Typography>
                         <Box sx={{ display: 'flex', gap: 1, flexWrap: 'wrap', mt: 1 }}>
-                            {project.tarefas?.length > 0 && (
+                            {projectStats.totalTasks > 0 && (
                                 <Tooltip title="Tarefas Concluídas"><Chip icon={<TaskAltIcon />} label={`${projectStats.completedTasks} / ${projectStats.totalTasks}`} size="small" color={projectStats.completedTasks === projectStats.totalTasks ? 'success' : 'default'} variant="outlined" /></Tooltip>
                             )}
                             {nearestTaskDeadlineInfo && (
@@ -3,6 +3,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
 import apiClient from '../api/axiosConfig';
+import { aguardarTrabalho } from '../api/trabalhos';
 import NewProjectForm from '../components/NewProjectForm';
 import { Button, CircularProgress, Typography, Alert, TextField, Box } from '@mui/material';
 
@@ -22,7 +23,7 @@ function ClientDetailPage() {
       setLoading(true);
       setError(null);
       try {
-        const response = await apiClient.get(`/clientes/${clientId}/`);
+        const response = await apiClient.get(`/clientes/${clientId}/?expand=projetos`);
         setClient(response.data);
         setEditData({ nome: response.data.nome }); 
       } catch (err) {
@@ -47,7 +48,7 @@ function ClientDetailPage() {
   const handleUpdate = async (e) => {
     e.preventDefault();
     try {
-      const response = await apiClient.patch(`/clientes/${clientId}/`, editData);
+      const response = await apiClient.patch(`/clientes/${clientId}/?expand=projetos`, editData);
       setClient(response.data);
       setIsEditing(false);
     } catch (error) {
@@ -59,7 +60,9 @@ function ClientDetailPage() {
   const handleDelete = async () => {
     if (window.confirm(`Tem certeza que deseja deletar o cliente "${client.nome}"?`)) {
       try {
-        await apiClient.delete(`/clientes/${clientId}/`);
+        const response = await apiClient.delete(`/clientes/${clientId}/`);
+        // Clientes com muitas tarefas são excluídos em segundo plano
+        await aguardarTrabalho(response);
         alert('Cliente deletado com sucesso!');
         navigate('/clientes');
       } catch (error) {
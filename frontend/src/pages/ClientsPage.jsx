@@ -15,7 +15,7 @@ function ClientsPage() {
 useEffect(() => {
     const fetchClients = async () => {
       try {
-        const response = await apiClient.get('/clientes/'); 
+        const response = await apiClient.get('/clientes/?paginate=false'); 
         setClients(response.data);
       } catch (error) {
         console.error("Houve um erro ao buscar os clientes!", error);
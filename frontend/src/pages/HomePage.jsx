@@ -2,6 +2,7 @@
 
 import React, { useState, useEffect } from 'react';
 import apiClient from '../api/axiosConfig';
+import { aguardarTrabalho } from '../api/trabalhos';
 import {
     CircularProgress, Typography, Alert, Box, Paper, IconButton,
     Menu, MenuItem, ListItemIcon, Dialog, DialogTitle, DialogContent,
@@ -33,12 +34,10 @@ function HomePage() {
         const fetchData = async () => {
             setLoading(true);
             try {
-                const [dashboardResponse, allClientsResponse] = await Promise.all([
-                    apiClient.get('/clientes/'),
-                    apiClient.get('/clientes/?all=true')
-                ]);
-                setClients(dashboardResponse.data);
-                setAllClientsForForm(allClientsResponse.data);
+                // Projetos com os contadores de tarefas (as tarefas vêm ao abrir cada projeto)
+                const response = await apiClient.get('/dashboard/');
+                setClients(response.data.clientes);
+                setAllClientsForForm(response.data.todos_os_clientes);
             } catch (err) {
                 setError('Não foi possível carregar os dados do dashboard.');
             } finally {
@@ -111,9 +110,10 @@ function HomePage() {
         handleClientMenuClose();
         if (window.confirm(`Tem certeza que deseja deletar "${clientToDelete.nome}" e TODOS os seus projetos?`)) {
             try {
-                await apiClient.delete(`/clientes/${clientToDelete.id}/`);
+                const response = await apiClient.delete(`/clientes/${clientToDelete.id}/`);
                 setClients(current => current.filter(c => c.id !== clientToDelete.id));
                 setAllClientsForForm(current => current.filter(c => c.id !== clientToDelete.id));
+                aguardarTrabalho(response).catch(() => alert("A exclusão do cliente falhou. Recarregue a página."));
             } catch (error) { alert("Não foi possível deletar o cliente."); }
         }
     };
@@ -128,43 +128,55 @@ function HomePage() {
             return [...list, { ...newClientData, projetos: [newProject] }];
         };
         setClients(updateList(clients));
-        setAllClientsForForm(currentList => updateList(currentList));
         setIsProjectModalOpen(false);
         setAddingProjectToClient(null);
     };
 
     const handleUpdateProject = async (projectId, newData, clientId) => {
         try {
-            const response = await apiClient.patch(`/projetos/${projectId}/`, newData);
+            const response = await apiClient.patch(`/projetos/${projectId}/?expand=tarefas`, newData);
             const updateList = (list) => list.map(c => c.id === clientId ? { ...c, projetos: c.projetos.map(p => p.id === projectId ? response.data : p) } : c);
             setClients(updateList);
-            setAllClientsForForm(updateList);
         } catch (error) { alert("Não foi possível atualizar o projeto."); }
     };
 
     const handleDeleteProject = async (projectId, clientId) => {
         if (!window.confirm("Tem certeza que deseja deletar este projeto?")) return;
         try {
-            await apiClient.delete(`/projetos/${projectId}/`);
+            const response = await apiClient.delete(`/projetos/${projectId}/`);
             const updateList = (list) => list.map(c => c.id === clientId ? { ...c, projetos: c.projetos.filter(p => p.id !== projectId) } : c);
             setClients(updateList);
-            setAllClientsForForm(updateList);
+            aguardarTrabalho(response).catch(() => alert("A exclusão do projeto falhou. Recarregue a página."));
         } catch (error) { alert("Não foi possível deletar o projeto."); }
     };
 
+    const handleTasksLoad = async (projectId) => {
+        try {
+            const response = await apiClient.get(`/projetos/${projectId}/?expand=tarefas`);
+            const updateList = (list) => list.map(c => ({
+                ...c,
+                projetos: c.projetos.map(p => p.id === projectId ? { ...p, tarefas: response.data.tarefas } : p)
+            }));
+            setClients(updateList);
+        } catch (error) { alert("Não foi possível carregar as tarefas do projeto."); }
+    };
+
     const handleTaskAdd = (newTask, projectId) => {
+        // Sem as tarefas carregadas, só o contador muda
         const updateList = (list) => list.map(c => ({
             ...c,
-            projetos: c.projetos.map(p => p.id === projectId ? { ...p, tarefas: [...(p.tarefas || []), newTask] } : p)
+            projetos: c.projetos.map(p => p.id !== projectId ? p : (p.tarefas
+                ? { ...p, tarefas: [...p.tarefas, newTask] }
+                : { ...p, total_tarefas: (p.total_tarefas || 0) + 1 }))
         }));
         setClients(updateList);
-        setAllClientsForForm(updateList);
     };
 
     const handleDeleteTask = async (taskId, projectId) => {
         if (!window.confirm("Tem certeza?")) return;
         try {
-            await apiClient.delete(`/tarefas/${taskId}/`);
+            const response = await apiClient.delete(`/tarefas/${taskId}/`);
+            aguardarTrabalho(response).catch(() => alert("A exclusão da tarefa falhou. Recarregue a página."));
             const updateList = (list) => list.map(client => ({
                 ...client,
                 projetos: client.projetos.map(p => {
@@ -175,7 +187,6 @@ function HomePage() {
                 })
             }));
             setClients(updateList);
-            setAllClientsForForm(updateList);
         } catch (error) { alert("Não foi possível deletar a tarefa."); }
     };
 
@@ -188,13 +199,13 @@ function HomePage() {
                 projetos: client.projetos.map(p => p.id === projectId ? { ...p, tarefas: p.tarefas.map(t => t.id === updatedTask.id ? updatedTask : t) } : p)
             }));
             setClients(updateList);
-            setAllClientsForForm(updateList);
         } catch (error) { alert("Não foi possível editar a tarefa."); }
     };
 
     const handleToggleTask = async (taskToToggle) => {
         try {
             const response = await apiClient.patch(`/tarefas/${taskToToggle.id}/`, { concluida: !taskToToggle.concluida });
+            aguardarTrabalho(response).catch(() => alert("Não foi possível atualizar todas as subtarefas. Recarregue a página."));
             const updatedTask = response.data;
             const updateList = (list) => list.map(client => ({
                 ...client,
@@ -215,7 +226,6 @@ function HomePage() {
                 })
             }));
             setClients(updateList);
-            setAllClientsForForm(updateList);
         } catch (error) { console.error("Erro ao dar toggle na tarefa:", error); }
     };
 
@@ -263,6 +273,7 @@ function HomePage() {
                                                                                 onTaskEdit={handleEditTask}
                                                                                 onTaskDelete={handleDeleteTask}
                                                                                 onTaskAdd={handleTaskAdd}
+                                                                                onTasksLoad={handleTasksLoad}
                                                                             />
                                                                         </div>
                                                                     )}
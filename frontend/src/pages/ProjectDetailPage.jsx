@@ -3,6 +3,7 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import apiClient from '../api/axiosConfig';
+import { aguardarTrabalho } from '../api/trabalhos';
 import {
     CircularProgress, Typography, Alert, Box, List,
     ListItem, ListItemIcon, ListItemText, Checkbox, IconButton, Button, TextField
@@ -26,7 +27,7 @@ function ProjectDetailPage() {
         const fetchProjectDetails = async () => {
             setLoading(true);
             try {
-                const response = await apiClient.get(`/projetos/${projectId}/`);
+                const response = await apiClient.get(`/projetos/${projectId}/?expand=tarefas`);
                 setProject(response.data);
             } catch (err) {
                 setError('Não foi possível carregar os dados do projeto.');
@@ -56,7 +57,8 @@ function ProjectDetailPage() {
     const handleDeleteTask = async (taskId) => {
         if (window.confirm("Tem certeza que deseja deletar esta tarefa?")) {
             try {
-                await apiClient.delete(`/tarefas/${taskId}/`);
+                const response = await apiClient.delete(`/tarefas/${taskId}/`);
+                aguardarTrabalho(response).catch(() => alert('A exclusão da tarefa falhou. Recarregue a página.'));
                 setProject(currentProject => ({
                     ...currentProject,
                     tarefas: currentProject.tarefas.filter(task => task.id !== taskId),
@@ -84,9 +86,11 @@ function ProjectDetailPage() {
 
         try {
             // A requisição para a API continua a mesma, apenas para a tarefa pai
-            await apiClient.patch(`/tarefas/${taskToToggle.id}/`, {
+            const response = await apiClient.patch(`/tarefas/${taskToToggle.id}/`, {
                 concluida: novoStatus,
             });
+            // Subárvores grandes são atualizadas em segundo plano
+            aguardarTrabalho(response).catch(() => alert('Não foi possível atualizar todas as subtarefas. Recarregue a página.'));
 
             // ATUALIZA O ESTADO LOCAL EM CASCATA
             setProject(currentProject => {